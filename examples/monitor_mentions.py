@@ -1,24 +1,30 @@
 import logging
-import uuid
 
 from rich.console import Console
 from tornado import gen
 
-from pynostr.event import EventKind
+from pynostr.event import Event, EventKind
 from pynostr.filters import Filters, FiltersList
 from pynostr.message_type import RelayMessageType
 from pynostr.relay_list import RelayList
 from pynostr.relay_manager import RelayManager
+from pynostr.subscription_checkpoint import SubscriptionCheckpoint
 from pynostr.utils import get_public_key, get_relay_list, get_timestamp
 
 log = logging.getLogger(__name__)
 
+# the checkpoint stores the newest received event of each relay, so a restart
+# continues where the last run stopped
+checkpoint = SubscriptionCheckpoint("monitor_mentions.json")
+
 
 @gen.coroutine
 def print_message(message_json, url):
     message_type = message_json[0]
     if message_type == RelayMessageType.EVENT:
-        print(f"{url}: {str(message_json)}")
+        event = Event.from_dict(message_json[2])
+        if checkpoint.is_new(message_json[1], url, event):
+            print(f"{url}: {message_json!s}")
 
 
 if __name__ == "__main__":
@@ -75,6 +81,10 @@ if __name__ == "__main__":
             )
         ]
     )
-    subscription_id = uuid.uuid1().hex
-    relay_manager.add_subscription_on_all_relays(subscription_id, filters)
-    relay_manager.run_sync()
+    # the subscription id must be the same after a restart
+    subscription_id = f"mentions-{identity.hex()[:16]}"
+    checkpoint.add_subscription(relay_manager, subscription_id, filters)
+    try:
+        relay_manager.run_sync()
+    finally:
+        checkpoint.save()
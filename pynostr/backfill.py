@@ -0,0 +1,279 @@
+"""Paginated download of historical events."""
+
+import json
+import logging
+import os
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import timedelta
+from typing import Callable, Optional
+
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.ioloop import IOLoop
+from tornado.locks import Semaphore
+
+from .base_relay import RelayPolicy
+from .filters import Filters, FiltersList
+from .message_pool import EventMessage, EventMessageStore, MessagePool
+from .message_type import ClientMessageType, RelayMessageType
+from .relay import Relay
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class RelayBackfillState:
+    """Progress of the backfill on a single relay.
+
+    :param until: upper bound of the next page, None for the first page
+    :param boundary_ids: ids of received events with created_at == until
+    :param done: True, when the relay has no older events
+    :param count: number of stored events
+    """
+
+    until: Optional[int] = None
+    boundary_ids: list[str] = field(default_factory=list)
+    done: bool = False
+    count: int = 0
+
+
+@dataclass
+class BackfillCheckpoint:
+    """Backfill progress of all relays, which can be saved to a json file."""
+
+    relays: dict[str, RelayBackfillState] = field(default_factory=dict)
+
+    def get(self, url: str) -> RelayBackfillState:
+        if url not in self.relays:
+            self.relays[url] = RelayBackfillState()
+        return self.relays[url]
+
+    def to_dict(self) -> dict:
+        return {"relays": {url: asdict(state) for url, state in self.relays.items()}}
+
+    @classmethod
+    def from_dict(cls, msg: dict) -> "BackfillCheckpoint":
+        return cls(
+            {
+                url: RelayBackfillState(**state)
+                for url, state in msg.get("relays", {}).items()
+            }
+        )
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BackfillCheckpoint":
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+class Backfill:
+    """Pages backwards through the history of each relay.
+
+    Each relay is queried with `until` set to the oldest created_at of the
+    previous page, until a page is empty or contains only known events. As
+    events at the boundary second are requested again, events sharing a
+    created_at across pages are not lost. When more than `page_size` events
+    share one created_at, the backfill continues with the second before it.
+    Relays are crawled concurrently on one IOLoop. The progress is saved to
+    `checkpoint_path` after every page, so a stopped backfill continues where
+    it was interrupted.
+
+    :param urls: relay urls
+    :param filters: filters of the query, since/until/limit are overwritten
+    :param since: oldest created_at to fetch
+    :param until: newest created_at to fetch, None for now
+    :param page_size: limit of each page
+    :param store: object with an add_event(EventMessage) method
+    :param checkpoint_path: json file for the progress
+    :param timeout: connection timeout of a relay
+    :param page_timeout: seconds to wait for the EOSE of a page
+    :param max_connections: number of relays which are crawled at once
+    """
+
+    def __init__(
+        self,
+        urls: list[str],
+        filters: Filters,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        page_size: int = 500,
+        store=None,
+        checkpoint_path: Optional[str] = None,
+        timeout: float = 5,
+        page_timeout: float = 30,
+        max_connections: int = 10,
+        io_loop: Optional[IOLoop] = None,
+    ) -> None:
+        self.urls = urls
+        self.filters = filters
+        self.since = since
+        self.until = until
+        self.page_size = page_size
+        self.store = store if store is not None else EventMessageStore()
+        self.checkpoint_path = checkpoint_path
+        self.timeout = timeout
+        self.page_timeout = page_timeout
+        self.max_connections = max_connections
+        self.io_loop = io_loop if io_loop is not None else IOLoop.current()
+        if checkpoint_path is not None:
+            self.checkpoint = BackfillCheckpoint.load(checkpoint_path)
+        else:
+            self.checkpoint = BackfillCheckpoint()
+        self._stored_ids: set[str] = set()
+        self._waiters: dict[str, tuple[str, Future]] = {}
+
+    @property
+    def done(self) -> bool:
+        return all(self.checkpoint.get(url).done for url in self.urls)
+
+    def run(self):
+        """Runs the backfill until all relays are done or failed."""
+        self.io_loop.run_sync(self.run_async)
+
+    @gen.coroutine
+    def run_async(self):
+        semaphore = Semaphore(self.max_connections)
+        yield gen.multi([self._run_relay(url, semaphore) for url in self.urls])
+
+    def page_filters(self, state: RelayBackfillState) -> Filters:
+        filters = self.filters.copy()
+        filters.since = self.since
+        filters.until = state.until if state.until is not None else self.until
+        filters.limit = self.page_size
+        return filters
+
+    @gen.coroutine
+    def _run_relay(self, url: str, semaphore: Semaphore):
+        if self.checkpoint.get(url).done:
+            return
+        with (yield semaphore.acquire()):
+            relay = Relay(
+                url,
+                MessagePool(),
+                self.io_loop,
+                RelayPolicy(should_read=True, should_write=False),
+                timeout=self.timeout,
+                close_on_eose=False,
+                message_callback=self._on_message,
+                message_callback_url=True,
+            )
+            relay.error_threshold = 0
+            relay.timeout_error_threshold = 0
+            connection = relay.connect()
+            connection.add_done_callback(lambda _: self._cancel_waiter(url))
+            try:
+                yield self._crawl(relay)
+            finally:
+                yield relay.close()
+
+    @gen.coroutine
+    def _crawl(self, relay: Relay):
+        state = self.checkpoint.get(relay.url)
+        seen: set[str] = set(state.boundary_ids)
+        while not state.done:
+            events = yield self._fetch(relay, self.page_filters(state))
+            if events is None:
+                log.info(f"Backfill on {relay.url} stopped at until={state.until}")
+                break
+            self._process_page(relay.url, state, events, seen)
+            if self.checkpoint_path is not None:
+                self.checkpoint.save(self.checkpoint_path)
+
+    @gen.coroutine
+    def _request(self, relay: Relay, subscription_id: str, send: Callable):
+        """Calls send and returns the first answer for subscription_id.
+
+        Returns False on a timeout or when the connection was closed.
+        """
+        waiter = Future()
+        self._waiters[relay.url] = (subscription_id, waiter)
+        send()
+        try:
+            answer = yield gen.with_timeout(
+                timedelta(seconds=self.page_timeout), waiter
+            )
+        except gen.TimeoutError:
+            answer = False
+        finally:
+            self._waiters.pop(relay.url, None)
+        return answer
+
+    @gen.coroutine
+    def _fetch(self, relay: Relay, filters: Filters):
+        """Returns the EventMessages until EOSE, None on a timeout."""
+        subscription_id = uuid.uuid4().hex
+        try:
+            received = yield self._request(
+                relay,
+                subscription_id,
+                lambda: relay.add_subscription(subscription_id, FiltersList([filters])),
+            )
+        finally:
+            relay.close_subscription(subscription_id)
+            if relay.is_connected:
+                relay.publish(json.dumps([ClientMessageType.CLOSE, subscription_id]))
+        events = relay.message_pool.get_all_events()
+        relay.message_pool.get_all()
+        if not received:
+            return None
+        return [e for e in events if e.subscription_id == subscription_id]
+
+    def _process_page(
+        self,
+        url: str,
+        state: RelayBackfillState,
+        events: list[EventMessage],
+        seen: set[str],
+    ):
+        new_events = [e for e in events if e.event.id not in seen]
+        for event_message in new_events:
+            seen.add(event_message.event.id)
+            if event_message.event.id in self._stored_ids:
+                continue
+            self._stored_ids.add(event_message.event.id)
+            self.store.add_event(event_message)
+            state.count += 1
+        if not new_events:
+            if len(events) < self.page_size:
+                # empty page or the relay returned only known events
+                state.done = True
+                return
+            # a full page of known events, which all share one created_at,
+            # the older events are requested with the second before it
+            oldest = min(e.event.created_at for e in events)
+            log.warning(
+                f"Backfill on {url} skips events with created_at={oldest}, "
+                f"there are more than {self.page_size}"
+            )
+            state.until = oldest - 1
+            state.boundary_ids = []
+            return
+        oldest = min(e.event.created_at for e in events)
+        state.until = oldest
+        state.boundary_ids = [
+            e.event.id for e in events if e.event.created_at == oldest
+        ]
+
+    def _on_message(self, message_json, url):
+        if message_json[0] != RelayMessageType.END_OF_STORED_EVENTS:
+            return
+        self._answer(url, message_json[1], message_json)
+
+    def _answer(self, url: str, subscription_id: str, message_json: list):
+        expected_id, waiter = self._waiters.get(url, (None, None))
+        if waiter is not None and expected_id == subscription_id and not waiter.done():
+            waiter.set_result(message_json)
+
+    def _cancel_waiter(self, url: str):
+        _, waiter = self._waiters.get(url, (None, None))
+        if waiter is not None and not waiter.done():
+            waiter.set_result(False)
@@ -1,5 +1,6 @@
 import json
 import logging
+import time
 from dataclasses import dataclass
 from queue import Queue
 from threading import Lock
@@ -9,7 +10,11 @@ from .event import Event
 from .filters import FiltersList
 from .message_pool import MessagePool
 from .message_type import RelayMessageType
+from .metrics import MetricsRegistry, frame_size, frame_type
+from .publish import is_ok
+from .relay_health import RelayHealth
 from .subscription import Subscription
+from .tracing import MessageTrace, Stage, Tracer
 from .utils import get_relay_information
 
 log = logging.getLogger(__name__)
@@ -74,6 +79,11 @@ class BaseRelay:
         self.message_callback = message_callback
         self.message_callback_url = message_callback_url
         self.outgoing_messages = Queue()
+        self.health: RelayHealth = RelayHealth(url)
+        self.metrics: Optional[MetricsRegistry] = None
+        self.tracer: Optional[Tracer] = None
+        self.connected_at: Optional[float] = None
+        self._subscription_times: dict[str, float] = {}
         if self.message_pool is None:
             self.message_pool = MessagePool()
 
@@ -106,6 +116,7 @@ class BaseRelay:
     def add_subscription(self, id, filters: FiltersList):
         with self.lock:
             self.subscriptions[id] = Subscription(id, filters)
+            self._subscription_times[id] = time.monotonic()
             self.publish(self.subscriptions[id].to_message())
             self.eose_threshold += 1
 
@@ -128,16 +139,21 @@ class BaseRelay:
     def close_subscription(self, id: str) -> None:
         with self.lock:
             self.subscriptions.pop(id, None)
+            self._subscription_times.pop(id, None)
 
     def update_subscription(self, id: str, filters: FiltersList) -> None:
         with self.lock:
             subscription = self.subscriptions[id]
             subscription.filters = filters
+            self._subscription_times[id] = time.monotonic()
             self.eose_threshold += 1
             self.publish(self.subscriptions[id].to_message())
 
     def _on_message(self, message):
-        if self._is_valid_message(message):
+        if self.metrics is not None:
+            self._record_received(message)
+        trace = self.tracer.start(self.url) if self.tracer is not None else None
+        if self._is_valid_message(message, trace):
             message_json = json.loads(message)
             if self.message_callback is not None:
                 if self.message_callback_url:
@@ -148,11 +164,14 @@ class BaseRelay:
             if message_type == RelayMessageType.EVENT:
                 # event = Event.from_dict(message_json[2])
                 # print(event.to_message())
-                self.message_pool.add_message(message, self.url)
+                is_new = self.message_pool.add_message(message, self.url, trace)
+                self.health.record_event(duplicate=not is_new)
             elif message_type == RelayMessageType.END_OF_STORED_EVENTS:
+                self._record_eose(message_json[1])
                 self._eose_received()
                 self.message_pool.add_message(message, self.url)
             elif message_type == RelayMessageType.OK:
+                self.health.record_ok(is_ok(message_json[2]))
                 self.message_pool.add_message(message, self.url)
             elif message_type == RelayMessageType.AUTH:
                 # TODO Follow this workflow to see if this is fully implemented
@@ -161,43 +180,74 @@ class BaseRelay:
                 # TODO Handling COUNT similar to others for now.
                 # It might be exploring more as a one-off type of request, however.
                 self.message_pool.add_message(message, self.url)
+        if trace is not None:
+            trace.finish()
 
     def publish(self, message: str):
         self.outgoing_messages.put(message)
 
+    def _on_connected(self, latency: float):
+        """Should be called by subclasses after the websocket was opened."""
+        if self.metrics is not None:
+            self.metrics.connects.inc(self.url)
+            if self.connected_at is not None:
+                self.metrics.reconnects.inc(self.url)
+        self.connected_at = time.monotonic()
+        self.health.record_connect(latency)
+
+    def _record_sent(self, message: str):
+        """Should be called by subclasses after a message was sent."""
+        self.num_sent_events += 1
+        if self.metrics is not None:
+            self.metrics.sent_bytes.inc(self.url, amount=frame_size(message))
+            self.metrics.sent_frames.inc(self.url, frame_type(message))
+
+    def _record_received(self, message: str):
+        if message is None:
+            return
+        self.metrics.received_bytes.inc(self.url, amount=frame_size(message))
+        self.metrics.received_frames.inc(self.url, frame_type(message))
+
+    def _record_eose(self, subscription_id: str):
+        with self.lock:
+            started = self._subscription_times.get(subscription_id)
+        if started is None:
+            return
+        if self.connected_at is not None:
+            started = max(started, self.connected_at)
+        self.health.record_eose(time.monotonic() - started)
+
     def _eose_received(self):
         self.eose_counter += 1
         return
 
-    def _is_valid_message(self, message: str) -> bool:
+    def _is_valid_message(
+        self, message: str, trace: Optional[MessageTrace] = None
+    ) -> bool:
+        valid = self._check_message(message, trace)
+        if not valid:
+            if self.metrics is not None:
+                self.metrics.invalid_frames.inc(self.url)
+            if trace is not None:
+                trace.dropped = True
+        return valid
+
+    def _check_message(self, message: str, trace: Optional[MessageTrace]) -> bool:
         if message is None:
             return False
         message = message.strip("\n")
         if not message or message[0] != "[" or message[-1] != "]":
             return False
 
-        message_json = json.loads(message)
+        message_json = self._parse(message)
         message_type = message_json[0]
+        if trace is not None:
+            trace.mark(Stage.PARSE)
+            trace.message_type = message_type
         if not RelayMessageType.is_valid(message_type):
             return False
         if message_type == RelayMessageType.EVENT:
-            if not len(message_json) == 3:
-                return False
-
-            subscription_id = message_json[1]
-            with self.lock:
-                if subscription_id not in self.subscriptions:
-                    return False
-
-            event = Event.from_dict(message_json[2])
-            if not event.verify():
-                return False
-
-            with self.lock:
-                subscription = self.subscriptions[subscription_id]
-
-            if subscription.filtersList and not subscription.filtersList.match(event):
-                return False
+            return self._check_event(message_json, trace)
         elif message_type == RelayMessageType.OK:
             if not len(message_json) == 4:
                 return False
@@ -208,3 +258,46 @@ class BaseRelay:
             else:
                 return False
         return True
+
+    def _check_event(self, message_json: list, trace: Optional[MessageTrace]) -> bool:
+        if not len(message_json) == 3:
+            return False
+
+        subscription_id = message_json[1]
+        with self.lock:
+            if subscription_id not in self.subscriptions:
+                return False
+
+        event = Event.from_dict(message_json[2])
+        if trace is not None:
+            trace.mark(Stage.VALIDATE)
+            trace.event_id = event.id
+        if not self._verify(event):
+            return False
+        if trace is not None:
+            trace.mark(Stage.VERIFY)
+
+        with self.lock:
+            subscription = self.subscriptions[subscription_id]
+
+        if subscription.filtersList and not subscription.filtersList.match(event):
+            return False
+        if trace is not None:
+            trace.mark(Stage.MATCH)
+        return True
+
+    def _parse(self, message: str):
+        if self.metrics is None:
+            return json.loads(message)
+        start = time.perf_counter()
+        message_json = json.loads(message)
+        self.metrics.parse_seconds.observe(time.perf_counter() - start, self.url)
+        return message_json
+
+    def _verify(self, event: Event) -> bool:
+        if self.metrics is None:
+            return event.verify()
+        start = time.perf_counter()
+        verified = event.verify()
+        self.metrics.verify_seconds.observe(time.perf_counter() - start, self.url)
+        return verified
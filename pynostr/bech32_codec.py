@@ -0,0 +1,153 @@
+"""Table driven Bech32 codec.
+
+The functions bech32_encode, bech32_decode and convertbits return the same
+results as the reference implementation in :mod:`pynostr.bech32`. The
+checksum uses a lookup table for the generator and the state after the
+human-readable part, bit groups are converted with integers.
+
+:func:`encode` and :func:`decode` convert between raw bytes and nostr
+bech32 strings, :func:`encode_many` and :func:`decode_many` convert lists.
+"""
+
+import functools
+from collections.abc import Iterable
+from typing import Optional
+
+from .bech32 import BECH32M_CONST, CHARSET, Encoding
+
+_GENERATOR = [0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3]
+# xor of the generators selected by the top five bits of the checksum
+POLYMOD_TABLE = [
+    functools.reduce(
+        lambda chk, i: chk ^ _GENERATOR[i] if (b >> i) & 1 else chk, range(5), 0
+    )
+    for b in range(32)
+]
+_CHARSET_VALUES = {c: i for i, c in enumerate(CHARSET)}
+
+
+def polymod_step(chk: int, value: int) -> int:
+    return ((chk & 0x1FFFFFF) << 5) ^ value ^ POLYMOD_TABLE[chk >> 25]
+
+
+def bech32_polymod(values, chk: int = 1) -> int:
+    """Computes the Bech32 checksum, starting with the state chk."""
+    table = POLYMOD_TABLE
+    for value in values:
+        chk = ((chk & 0x1FFFFFF) << 5) ^ value ^ table[chk >> 25]
+    return chk
+
+
+@functools.lru_cache(maxsize=64)
+def hrp_state(hrp: str) -> int:
+    """Returns the checksum state after the expanded hrp."""
+    expanded = [ord(x) >> 5 for x in hrp] + [0] + [ord(x) & 31 for x in hrp]
+    return bech32_polymod(expanded)
+
+
+def bech32_create_checksum(hrp: str, data, spec: Encoding) -> list[int]:
+    const = BECH32M_CONST if spec == Encoding.BECH32M else 1
+    polymod = bech32_polymod([*data, 0, 0, 0, 0, 0, 0], hrp_state(hrp)) ^ const
+    return [(polymod >> shift) & 31 for shift in (25, 20, 15, 10, 5, 0)]
+
+
+def bech32_encode(hrp: str, data, spec: Encoding) -> str:
+    """Computes a Bech32 string given HRP and data values."""
+    checksum = bech32_create_checksum(hrp, data, spec)
+    return hrp + "1" + "".join([CHARSET[d] for d in data + checksum])
+
+
+def bech32_decode(bech: str):
+    """Validates a Bech32/Bech32m string and returns HRP, data and spec."""
+    if not bech.isascii() or (bech.lower() != bech and bech.upper() != bech):
+        return (None, None, None)
+    if bech and (min(bech) < "!" or max(bech) > "~"):
+        return (None, None, None)
+    bech = bech.lower()
+    pos = bech.rfind("1")
+    if pos < 1 or pos + 7 > len(bech):
+        return (None, None, None)
+    try:
+        data = [_CHARSET_VALUES[x] for x in bech[pos + 1 :]]
+    except KeyError:
+        return (None, None, None)
+    hrp = bech[:pos]
+    const = bech32_polymod(data, hrp_state(hrp))
+    if const == 1:
+        return (hrp, data[:-6], Encoding.BECH32)
+    if const == BECH32M_CONST:
+        return (hrp, data[:-6], Encoding.BECH32M)
+    return (None, None, None)
+
+
+def convertbits(data, frombits: int, tobits: int, pad: bool = True):
+    """General power-of-2 base conversion."""
+    if frombits == 8:
+        try:
+            data = bytes(data)
+        except ValueError:
+            return None
+        value = int.from_bytes(data, "big")
+    else:
+        value = 0
+        for v in data:
+            if v < 0 or (v >> frombits):
+                return None
+            value = (value << frombits) | v
+    count, rest = divmod(len(data) * frombits, tobits)
+    if rest and pad:
+        value <<= tobits - rest
+        count += 1
+    elif rest:
+        if rest >= frombits or value & ((1 << rest) - 1):
+            return None
+        value >>= rest
+    mask = (1 << tobits) - 1
+    return [
+        (value >> shift) & mask for shift in range(tobits * (count - 1), -1, -tobits)
+    ]
+
+
+def data_to_bytes(data) -> Optional[bytes]:
+    """Converts 5 bit groups to bytes, returns None for invalid padding."""
+    n_bytes, rest = divmod(len(data) * 5, 8)
+    value = 0
+    for v in data:
+        value = (value << 5) | v
+    if rest >= 5 or value & ((1 << rest) - 1):
+        return None
+    return (value >> rest).to_bytes(n_bytes, "big")
+
+
+def encode(hrp: str, raw_bytes: bytes) -> str:
+    """Encodes raw_bytes as Bech32 string, e.g. a npub."""
+    return bech32_encode(hrp, convertbits(raw_bytes, 8, 5), Encoding.BECH32)
+
+
+def decode(bech: str) -> tuple[str, bytes]:
+    """Returns HRP and raw bytes of a Bech32 or Bech32m string.
+
+    The bytes of the padding bits are dropped, when they are zero.
+    """
+    hrp, data, _ = bech32_decode(bech)
+    if hrp is None:
+        raise ValueError(f"{bech} is not a valid bech32 string")
+    n_bits = len(data) * 5
+    n_bytes = -(-n_bits // 8)
+    value = 0
+    for v in data:
+        value = (value << 5) | v
+    raw_bytes = (value << (8 * n_bytes - n_bits)).to_bytes(n_bytes, "big")
+    if raw_bytes and raw_bytes[-1] == 0:
+        raw_bytes = raw_bytes[:-1]
+    return hrp, raw_bytes
+
+
+def encode_many(hrp: str, items: Iterable[bytes]) -> list[str]:
+    """Encodes each raw bytes of items, e.g. the pubkeys of a contact list."""
+    return [encode(hrp, raw_bytes) for raw_bytes in items]
+
+
+def decode_many(items: Iterable[str]) -> list[bytes]:
+    """Returns the raw bytes of each Bech32 string of items."""
+    return [decode(bech)[1] for bech in items]
@@ -0,0 +1,278 @@
+"""Benchmarks of the hot paths of pynostr.
+
+Each benchmark is calibrated like :meth:`timeit.Timer.autorange` and then
+repeated `rounds` times. The results can be written as json and compared
+with the results of an earlier release::
+
+    pynostr bench --output current.json --compare baseline.json
+"""
+
+import json
+import platform
+import statistics
+import time
+import timeit
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Optional
+
+from . import bech32_codec, nip19
+from .event import Event, EventKind
+from .filters import Filters, FiltersList
+from .key import PrivateKey
+from .local_relay import LocalRelay
+from .message_pool import MessagePool
+from .relay_manager import RelayManager
+
+try:
+    from ._version import __version__
+except ImportError:
+    __version__ = "unknown"
+
+
+@dataclass
+class BenchmarkResult:
+    """Timing of one benchmark.
+
+    :param name: benchmark name
+    :param operations: number of operations in each round
+    :param rounds: seconds of each round
+    """
+
+    name: str
+    operations: int
+    rounds: list[float] = field(default_factory=list)
+
+    @property
+    def ops_per_second(self) -> float:
+        return self.operations / min(self.rounds)
+
+    @property
+    def mean(self) -> float:
+        """Mean seconds per operation."""
+        return statistics.mean(self.rounds) / self.operations
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.rounds) / self.operations
+
+    @property
+    def stdev(self) -> float:
+        if len(self.rounds) < 2:
+            return 0.0
+        return statistics.stdev(self.rounds) / self.operations
+
+    def to_dict(self) -> dict:
+        ret = asdict(self)
+        ret["ops_per_second"] = self.ops_per_second
+        ret["mean"] = self.mean
+        ret["median"] = self.median
+        ret["stdev"] = self.stdev
+        return ret
+
+    @classmethod
+    def from_dict(cls, msg: dict) -> "BenchmarkResult":
+        return cls(msg["name"], msg["operations"], msg["rounds"])
+
+
+def _signed_events(n: int, kind: int = EventKind.TEXT_NOTE) -> list[Event]:
+    pk = PrivateKey()
+    events = []
+    for i in range(n):
+        event = Event(f"benchmark note {i}", kind=kind, created_at=1700000000 + i)
+        event.add_pubkey_ref(pk.public_key.hex())
+        event.sign(pk.hex())
+        events.append(event)
+    return events
+
+
+def bench_event_parse():
+    message = json.dumps(["EVENT", "sub", _signed_events(1)[0].to_dict()])
+    return lambda: Event.from_dict(json.loads(message)[2]), 1
+
+
+def bench_event_id():
+    event = _signed_events(1)[0]
+    return event.compute_id, 1
+
+
+def bench_event_sign():
+    pk = PrivateKey()
+    event = Event("benchmark note")
+    return lambda: event.sign(pk.hex()), 1
+
+
+def bench_event_verify():
+    event = _signed_events(1)[0]
+    return event.verify, 1
+
+
+def bench_filters_matches():
+    events = _signed_events(100)
+    filters = Filters(
+        kinds=[EventKind.TEXT_NOTE],
+        authors=[events[0].pubkey],
+        since=1700000050,
+        pubkey_refs=[events[0].pubkey],
+    )
+    return lambda: [filters.matches(event) for event in events], len(events)
+
+
+def bench_message_pool():
+    messages = [
+        json.dumps(["EVENT", "sub", event.to_dict()]) for event in _signed_events(100)
+    ]
+
+    def run():
+        message_pool = MessagePool(first_response_only=True)
+        for message in messages:
+            message_pool.add_message(message, "ws://relay.benchmark")
+
+    return run, len(messages)
+
+
+def bench_bech32_encode():
+    raw_bytes = PrivateKey().public_key.raw_bytes
+    return lambda: bech32_codec.encode("npub", raw_bytes), 1
+
+
+def bench_bech32_decode():
+    npub = PrivateKey().public_key.bech32()
+    return lambda: bech32_codec.decode(npub), 1
+
+
+def bench_nip19_decode():
+    pubkey = PrivateKey().public_key.hex()
+    nevent = nip19.EventPointer(pubkey, ["wss://relay.benchmark"], pubkey, 1).encode()
+    return lambda: nip19.decode(nevent), 1
+
+
+def bench_nip04_encrypt():
+    sender, recipient = PrivateKey(), PrivateKey()
+    recipient_pubkey = recipient.public_key.hex()
+    return lambda: sender.encrypt_message("benchmark message", recipient_pubkey), 1
+
+
+def bench_nip04_decrypt():
+    sender, recipient = PrivateKey(), PrivateKey()
+    encrypted = sender.encrypt_message("benchmark message", recipient.public_key.hex())
+    sender_pubkey = sender.public_key.hex()
+    return lambda: recipient.decrypt_message(encrypted, sender_pubkey), 1
+
+
+def bench_relay_manager(n_relays: int = 3, n_events: int = 200):
+    """Events per second of a subscription through RelayManager."""
+    events = _signed_events(n_events)
+    relays = [LocalRelay().start() for _ in range(n_relays)]
+    for relay in relays:
+        for event in events:
+            relay.add_event(event)
+    filters = FiltersList([Filters(kinds=[EventKind.TEXT_NOTE])])
+
+    def run():
+        relay_manager = RelayManager(timeout=10)
+        for relay in relays:
+            relay_manager.add_relay(relay.url)
+        relay_manager.add_subscription_on_all_relays(uuid.uuid4().hex, filters)
+        relay_manager.run_sync()
+        relay_manager.close_all_relay_connections()
+        received = relay_manager.message_pool.events.qsize()
+        if received != n_relays * n_events:
+            raise RuntimeError(f"received {received} of {n_relays * n_events} events")
+
+    return run, n_relays * n_events, lambda: [relay.stop() for relay in relays]
+
+
+# each benchmark returns the function to time, the number of operations of a
+# call and optionally a function to clean up
+BENCHMARKS: dict[str, Callable] = {
+    "event_parse": bench_event_parse,
+    "event_id": bench_event_id,
+    "event_sign": bench_event_sign,
+    "event_verify": bench_event_verify,
+    "filters_matches": bench_filters_matches,
+    "message_pool": bench_message_pool,
+    "bech32_encode": bench_bech32_encode,
+    "bech32_decode": bench_bech32_decode,
+    "nip19_decode": bench_nip19_decode,
+    "nip04_encrypt": bench_nip04_encrypt,
+    "nip04_decrypt": bench_nip04_decrypt,
+    "relay_manager": bench_relay_manager,
+}
+
+
+def run_benchmark(
+    name: str, rounds: int = 5, min_time: float = 0.2, number: Optional[int] = None
+) -> BenchmarkResult:
+    """Runs the benchmark name.
+
+    :param rounds: number of timed rounds
+    :param min_time: minimal seconds of a round, when number is None
+    :param number: calls of the benchmark in each round
+    """
+    setup = BENCHMARKS[name]()
+    func, operations = setup[0], setup[1]
+    try:
+        timer = timeit.Timer(func)
+        if number is None:
+            number = _calibrate(timer, min_time)
+        timings = timer.repeat(rounds, number)
+    finally:
+        if len(setup) > 2:
+            setup[2]()
+    return BenchmarkResult(name, operations * number, timings)
+
+
+def _calibrate(timer: timeit.Timer, min_time: float) -> int:
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time:
+            return number
+        number *= 2
+
+
+def run_benchmarks(
+    names: Optional[list[str]] = None, **kwargs
+) -> dict[str, BenchmarkResult]:
+    """Runs all or the given benchmarks, kwargs are passed to run_benchmark."""
+    if names is None:
+        names = list(BENCHMARKS)
+    return {name: run_benchmark(name, **kwargs) for name in names}
+
+
+def report(results: dict[str, BenchmarkResult]) -> dict:
+    """Returns the results with the environment as json serializable dict."""
+    return {
+        "pynostr": __version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "created_at": int(time.time()),
+        "benchmarks": {name: result.to_dict() for name, result in results.items()},
+    }
+
+
+def load_report(path: str) -> dict[str, BenchmarkResult]:
+    with open(path) as f:
+        benchmarks = json.load(f)["benchmarks"]
+    return {name: BenchmarkResult.from_dict(b) for name, b in benchmarks.items()}
+
+
+def compare(
+    baseline: dict[str, BenchmarkResult],
+    results: dict[str, BenchmarkResult],
+    threshold: float = 0.1,
+) -> dict[str, float]:
+    """Returns the relative throughput change of the regressed benchmarks.
+
+    A benchmark has regressed, when its operations per second dropped by more
+    than threshold compared to the baseline.
+    """
+    regressions = {}
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        change = result.ops_per_second / baseline[name].ops_per_second - 1
+        if change < -threshold:
+            regressions[name] = change
+    return regressions
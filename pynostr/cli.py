@@ -1,17 +1,18 @@
+import json
 import logging
+from dataclasses import asdict
+from typing import Annotated, Optional
 
 import click
 import typer
-from rich.console import Console
-from rich.table import Table
 
+from pynostr import nip19
 from pynostr.key import PrivateKey, PublicKey
 from pynostr.metadata import Metadata
-from pynostr.utils import get_relay_information, nprofile_decode
+from pynostr.utils import get_relay_information
 
 log = logging.getLogger(__name__)
 app = typer.Typer()
-console = Console()
 
 state = {"verbose": 3}
 
@@ -39,6 +40,10 @@ def convert(identifier: str):
 @app.command()
 def info(objects: str):
     """Basic info about object."""
+    from rich.console import Console
+    from rich.table import Table
+
+    console = Console()
     if "wss" in objects:
         relay_info = get_relay_information(objects)
         if relay_info is None:
@@ -66,14 +71,8 @@ def info(objects: str):
             for url in m.relays:
                 table.add_row(url)
             console.print(table)
-    elif "nprofile" in objects:
-        pubkey, relays = nprofile_decode(objects)
-        table = Table("key", "value")
-        table.add_row("pubkey", pubkey)
-        table.add_row("npub", str(PublicKey(pubkey).bech32()))
-        for i in range(len(relays)):
-            table.add_row(f"relay{i}", relays[i])
-        console.print(table)
+    elif objects.startswith(nip19.PREFIXES):
+        console.print(_nip19_table(objects))
     elif "npub" in objects:
         pubkey = PublicKey.from_npub(objects)
         table = Table("key", "value")
@@ -82,6 +81,72 @@ def info(objects: str):
         console.print(table)
 
 
+def _nip19_table(objects: str):
+    from rich.table import Table
+
+    table = Table("key", "value")
+    for key, value in asdict(nip19.decode(objects)).items():
+        if key == "relays":
+            for i in range(len(value)):
+                table.add_row(f"relay{i}", value[i])
+        elif value is not None:
+            table.add_row(key, str(value))
+        if key in ["pubkey", "author"] and value is not None:
+            table.add_row("npub", str(PublicKey.from_hex(value).bech32()))
+    return table
+
+
+@app.command()
+def bench(
+    name: Annotated[Optional[list[str]], typer.Option(help="Benchmark to run")] = None,
+    rounds: int = 5,
+    min_time: float = 0.2,
+    output: Annotated[
+        Optional[str], typer.Option(help="Writes the results as json")
+    ] = None,
+    compare: Annotated[
+        Optional[str], typer.Option(help="json results of a baseline")
+    ] = None,
+    threshold: float = 0.1,
+):
+    """Benchmarks the hot paths, fails on regressions against a baseline."""
+    from rich.console import Console
+    from rich.table import Table
+
+    from pynostr import benchmark
+
+    console = Console()
+
+    for key in name or []:
+        if key not in benchmark.BENCHMARKS:
+            raise typer.BadParameter(
+                f"{key} is not one of {', '.join(benchmark.BENCHMARKS)}"
+            )
+    results = benchmark.run_benchmarks(name or None, rounds=rounds, min_time=min_time)
+    baseline = benchmark.load_report(compare) if compare is not None else {}
+    table = Table("benchmark", "ops/s", "mean", "stdev", "change")
+    for key, result in results.items():
+        change = ""
+        if key in baseline:
+            ratio = result.ops_per_second / baseline[key].ops_per_second - 1
+            change = f"{ratio:+.1%}"
+        table.add_row(
+            key,
+            f"{result.ops_per_second:,.0f}",
+            f"{result.mean * 1e6:.2f} µs",
+            f"{result.stdev * 1e6:.2f} µs",
+            change,
+        )
+    console.print(table)
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(benchmark.report(results), f, indent=2)
+    regressions = benchmark.compare(baseline, results, threshold)
+    if regressions:
+        click.echo(f"Regressions: {', '.join(regressions)}")
+        raise typer.Exit(code=1)
+
+
 @app.callback()
 def main(verbose: int = 3):
     """Python CLI for nostr, enjoy."""
@@ -0,0 +1,181 @@
+"""Index of the NIP-04 direct message conversations of a pubkey."""
+
+import bisect
+import logging
+from threading import Lock
+from typing import Optional
+
+from .encrypted_dm import EncryptedDirectMessage, InboxDecryptor
+from .event import Event, EventKind
+from .message_pool import EventMessage
+
+log = logging.getLogger(__name__)
+
+
+class Conversation:
+    """Direct messages between two pubkeys, ordered by created_at.
+
+    :param pubkeys: sorted pair of the pubkeys
+    """
+
+    def __init__(self, pubkeys: tuple[str, str]) -> None:
+        self.pubkeys = pubkeys
+        self.messages: list[EncryptedDirectMessage] = []
+        self.read_until = 0
+        self._keys: list[tuple[int, str]] = []
+
+    def __len__(self):
+        return len(self.messages)
+
+    def get_peer(self, pubkey: str) -> str:
+        """Returns the other pubkey of the conversation."""
+        return self.pubkeys[1] if self.pubkeys[0] == pubkey else self.pubkeys[0]
+
+    def add(self, dm: EncryptedDirectMessage):
+        key = (dm.event.created_at, dm.event.id)
+        index = bisect.bisect(self._keys, key)
+        self._keys.insert(index, key)
+        self.messages.insert(index, dm)
+
+    def timeline(
+        self, limit: Optional[int] = None, newest_first: bool = True
+    ) -> list[EncryptedDirectMessage]:
+        """Returns the limit newest or oldest messages."""
+        if newest_first:
+            messages = self.messages[::-1]
+        else:
+            messages = list(self.messages)
+        return messages if limit is None else messages[:limit]
+
+    def unread_count(self, pubkey: str) -> int:
+        """Number of messages to pubkey after read_until."""
+        index = bisect.bisect_left(self._keys, (self.read_until + 1,))
+        return sum(1 for dm in self.messages[index:] if dm.pubkey != pubkey)
+
+    def mark_read(self, until: Optional[int] = None):
+        """Marks the messages up to created_at until or all as read."""
+        if until is None:
+            until = self._keys[-1][0] if self._keys else 0
+        self.read_until = max(self.read_until, until)
+
+    def decrypt(self, decryptor: InboxDecryptor):
+        """Decrypts the messages without cleartext_content."""
+        encrypted = [dm for dm in self.messages if dm.cleartext_content is None]
+        results = decryptor.decrypt(dm.event for dm in encrypted)
+        for dm, (_, cleartext) in zip(encrypted, results):
+            if isinstance(cleartext, str):
+                dm.cleartext_content = cleartext
+            else:
+                log.debug(f"Could not decrypt {dm.event.id}: {cleartext}")
+
+
+class ConversationIndex:
+    """Direct messages by conversation.
+
+    A conversation is keyed by the sorted pair of the author and the
+    recipient in the first `p` tag. The index can listen to a MessagePool, so
+    it is updated with each received direct message.
+
+    :param pubkey: our pubkey, needed for the per peer methods
+    """
+
+    def __init__(self, pubkey: Optional[str] = None) -> None:
+        self.pubkey = pubkey
+        self.conversations: dict[tuple[str, str], Conversation] = {}
+        self.lock = Lock()
+        self._ids: set[str] = set()
+
+    def __len__(self):
+        return len(self.conversations)
+
+    @staticmethod
+    def get_key(event: Event) -> Optional[tuple[str, str]]:
+        for tag in event.tags:
+            if len(tag) > 1 and tag[0] == "p":
+                return tuple(sorted((event.pubkey, tag[1])))
+        return None
+
+    def add_event(self, event: Event) -> Optional[Conversation]:
+        """Adds a direct message and returns its conversation.
+
+        Other kinds, messages without recipient and known ids are ignored.
+        """
+        if event.kind != EventKind.ENCRYPTED_DIRECT_MESSAGE:
+            return None
+        key = self.get_key(event)
+        if key is None:
+            return None
+        dm = EncryptedDirectMessage.from_event(event)
+        dm.recipient_pubkey = key[1] if key[0] == event.pubkey else key[0]
+        with self.lock:
+            if event.id in self._ids:
+                return None
+            self._ids.add(event.id)
+            conversation = self.conversations.get(key)
+            if conversation is None:
+                conversation = self.conversations[key] = Conversation(key)
+            conversation.add(dm)
+        return conversation
+
+    def add_events(self, events):
+        for event in events:
+            self.add_event(event)
+
+    def on_message(self, message):
+        if isinstance(message, EventMessage):
+            self.add_event(message.event)
+
+    def listen(self, message_pool):
+        """Adds the direct messages, which arrive in message_pool."""
+        message_pool.remove_message_listener(self.on_message)
+        message_pool.add_message_listener(self.on_message)
+
+    def get(self, pubkey: str, other_pubkey: Optional[str] = None):
+        """Returns the conversation of pubkey and other_pubkey or of our
+        pubkey and pubkey."""
+        if other_pubkey is None:
+            pubkey, other_pubkey = self._own_pubkey(), pubkey
+        return self.conversations.get(tuple(sorted((pubkey, other_pubkey))))
+
+    def timeline(
+        self, peer: str, limit: Optional[int] = None
+    ) -> list[EncryptedDirectMessage]:
+        """Returns the messages between us and peer, newest first."""
+        conversation = self.get(peer)
+        if conversation is None:
+            return []
+        with self.lock:
+            return conversation.timeline(limit)
+
+    def peers(self) -> list[str]:
+        """Returns our peers, latest conversation first."""
+        pubkey = self._own_pubkey()
+        with self.lock:
+            conversations = [c for c in self.conversations.values() if c.messages]
+            conversations.sort(key=lambda c: c._keys[-1], reverse=True)
+            return [c.get_peer(pubkey) for c in conversations if pubkey in c.pubkeys]
+
+    def unread_counts(self) -> dict[str, int]:
+        """Returns the number of unread messages of each peer, which has
+        unread messages."""
+        pubkey = self._own_pubkey()
+        ret = {}
+        with self.lock:
+            for conversation in self.conversations.values():
+                if pubkey not in conversation.pubkeys:
+                    continue
+                count = conversation.unread_count(pubkey)
+                if count > 0:
+                    ret[conversation.get_peer(pubkey)] = count
+        return ret
+
+    def mark_read(self, peer: str, until: Optional[int] = None):
+        conversation = self.get(peer)
+        if conversation is not None:
+            with self.lock:
+                conversation.mark_read(until)
+
+    def _own_pubkey(self) -> str:
+        if self.pubkey is None:
+            raise ValueError("The index has no pubkey")
+        return self.pubkey
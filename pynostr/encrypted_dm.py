@@ -1,13 +1,20 @@
+import itertools
 import logging
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Union
 
 from .event import Event, EventKind
 from .exception import NIPValidationException
-from .key import PrivateKey, PublicKey
+from .key import PrivateKey, PublicKey, SharedSecretCache
 
 log = logging.getLogger(__name__)
 
+# shared secrets of encrypt and decrypt without an own cache
+shared_secret_cache = SharedSecretCache()
+
 
 @dataclass
 class EncryptedDirectMessage:
@@ -54,7 +61,14 @@ class EncryptedDirectMessage:
         private_key_hex: str,
         cleartext_content: Optional[str] = None,
         recipient_pubkey: Optional[str] = None,
+        cache: Optional[SharedSecretCache] = None,
     ) -> None:
+        """
+        :param cache: cache of the shared secrets, default is
+            shared_secret_cache
+        """
+        if cache is None:
+            cache = shared_secret_cache
         if cleartext_content is not None:
             self.cleartext_content = cleartext_content
         if recipient_pubkey is not None:
@@ -66,7 +80,9 @@ class EncryptedDirectMessage:
         sk = PrivateKey(bytes.fromhex(private_key_hex))
         self.pubkey = sk.public_key.hex()
         self.encrypted_message = sk.encrypt_message(
-            message=self.cleartext_content, public_key_hex=self.recipient_pubkey
+            message=self.cleartext_content,
+            public_key_hex=self.recipient_pubkey,
+            shared_secret_cache=cache,
         )
 
     def decrypt(
@@ -74,7 +90,14 @@ class EncryptedDirectMessage:
         private_key_hex: str,
         encrypted_message: Optional[str] = None,
         public_key_hex: Optional[str] = None,
+        cache: Optional[SharedSecretCache] = None,
     ) -> None:
+        """
+        :param cache: cache of the shared secrets, default is
+            shared_secret_cache
+        """
+        if cache is None:
+            cache = shared_secret_cache
         if encrypted_message is not None:
             self.encrypted_message = encrypted_message
         if public_key_hex is None:
@@ -85,5 +108,110 @@ class EncryptedDirectMessage:
             raise Exception("encrypted_message must not be None")
         sk = PrivateKey(bytes.fromhex(private_key_hex))
         self.cleartext_content = sk.decrypt_message(
-            encoded_message=self.encrypted_message, public_key_hex=public_key_hex
+            encoded_message=self.encrypted_message,
+            public_key_hex=public_key_hex,
+            shared_secret_cache=cache,
         )
+
+
+def get_counterparty(event: Event, pubkey: str) -> Optional[str]:
+    """Returns the other party of a direct message of pubkey, which is the
+    recipient of sent messages and the author of received ones."""
+    if event.pubkey != pubkey:
+        return event.pubkey
+    for tag in event.tags:
+        if len(tag) > 1 and tag[0] == "p":
+            return tag[1]
+    return None
+
+
+class InboxDecryptor:
+    """Decrypts all NIP-04 direct messages of a mailbox.
+
+    The events are decrypted in chunks, in which they are grouped by
+    counterparty, so a shared secret is computed once per chunk even when
+    the cache is too small for all counterparties. With workers > 1 a
+    thread pool decrypts the chunks, the results keep the event order. The
+    shared secrets of a chunk are computed before it is submitted, so the
+    threads do not compute the secret of the same counterparty twice.
+
+    :param private_key: our private key as hex or PrivateKey
+    :param cache: cache of the shared secrets, default is shared_secret_cache
+    :param workers: threads, which decrypt chunks
+    :param chunk_size: number of events of a chunk
+    """
+
+    def __init__(
+        self,
+        private_key: Union[str, PrivateKey],
+        cache: Optional[SharedSecretCache] = None,
+        workers: int = 1,
+        chunk_size: int = 1000,
+    ) -> None:
+        if isinstance(private_key, str):
+            private_key = PrivateKey.from_hex(private_key)
+        self.private_key = private_key
+        self.pubkey = private_key.public_key.hex()
+        self.cache = shared_secret_cache if cache is None else cache
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+    def decrypt(
+        self, events: Iterable[Event]
+    ) -> Iterator[tuple[Event, Union[str, Exception]]]:
+        """Yields each event with its cleartext or the decryption error."""
+        events = iter(events)
+        chunks = iter(lambda: list(itertools.islice(events, self.chunk_size)), [])
+        if self.workers <= 1:
+            for chunk in chunks:
+                yield from self.decrypt_chunk(chunk)
+            return
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            for chunk in chunks:
+                self.prepare(chunk)
+                pending.append(executor.submit(self.decrypt_chunk, chunk))
+                if len(pending) > self.workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    def prepare(self, events: list[Event]):
+        """Computes the shared secret of each counterparty of events."""
+        counterparties = {
+            get_counterparty(event, self.pubkey)
+            for event in events
+            if event.kind == EventKind.ENCRYPTED_DIRECT_MESSAGE
+        }
+        counterparties.discard(None)
+        for counterparty in counterparties:
+            try:
+                self.cache.prepare(self.private_key, counterparty)
+            except Exception as exc:
+                # decrypt_chunk returns the error with the events
+                log.debug(f"No shared secret for {counterparty}: {exc}")
+
+    def decrypt_chunk(
+        self, events: list[Event]
+    ) -> list[tuple[Event, Union[str, Exception]]]:
+        results = [None] * len(events)
+        groups: dict[str, list[int]] = {}
+        for i, event in enumerate(events):
+            counterparty = get_counterparty(event, self.pubkey)
+            if event.kind != EventKind.ENCRYPTED_DIRECT_MESSAGE:
+                results[i] = (event, NIPValidationException("Not a direct message"))
+            elif counterparty is None:
+                results[i] = (event, NIPValidationException("recipient is missing!"))
+            else:
+                groups.setdefault(counterparty, []).append(i)
+        for counterparty, indices in groups.items():
+            for i in indices:
+                event = events[i]
+                try:
+                    cleartext = self.private_key.decrypt_message(
+                        event.content, counterparty, self.cache
+                    )
+                except Exception as exc:
+                    cleartext = exc
+                results[i] = (event, cleartext)
+        return results
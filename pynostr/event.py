@@ -9,9 +9,9 @@ from enum import IntEnum
 from hashlib import sha256
 from typing import Optional
 
+from . import bech32_codec
 from .key import PrivateKey, PublicKey
 from .message_type import ClientMessageType
-from .utils import bech32_encode
 
 
 class EventKind(IntEnum):
@@ -184,7 +184,7 @@ class Event:
         """
         self.compute_id()
         assert self.id is not None, "Event ID should not be None after compute_id()"
-        return bech32_encode(binascii.unhexlify(self.id), prefix)
+        return bech32_codec.encode(prefix, binascii.unhexlify(self.id))
 
     def sign(self, private_key_hex: str) -> None:
         """signs the event with the private key and stored the signature in self.sig.
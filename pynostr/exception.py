@@ -4,3 +4,11 @@ class RelayException(Exception):
 
 class NIPValidationException(Exception):
     """Raised when a specific event does not meet NIP requirements."""
+
+
+class NegentropyException(Exception):
+    """Raised when a negentropy message cannot be processed."""
+
+
+class MiningException(Exception):
+    """Raised when a mining process exits without a result."""
@@ -1,5 +1,6 @@
 """Forked from https://github.com/jeffthibault/python-nostr.git."""
 
+import copy
 import json
 from collections import UserList
 from dataclasses import dataclass
@@ -61,31 +62,25 @@ class Filters:
 
     @classmethod
     def from_dict(cls, filters):
-        if "ids" in filters:
-            ret = cls(filters["ids"])
-        else:
-            ret = cls("")
-        if "authors" in filters:
-            ret.authors = filters["authors"]
-        if "kinds" in filters:
-            ret.kinds = filters["kinds"]
-        if "#e" in filters:
-            ret.event_refs = filters["#e"]
-        if "#p" in filters:
-            ret.pubkey_refs = filters["#p"]
-        if "since" in filters:
-            ret.since = filters["since"]
-        if "until" in filters:
-            ret.until = filters["until"]
-        if "limit" in filters:
-            ret.limit = filters["limit"]
-        cls.tags = {}
-        if cls.event_refs:
-            cls.add_arbitrary_tag("e", cls.event_refs)
-        if cls.pubkey_refs:
-            cls.add_arbitrary_tag("p", cls.pubkey_refs)
+        ret = cls(
+            ids=filters.get("ids"),
+            kinds=filters.get("kinds"),
+            authors=filters.get("authors"),
+            since=filters.get("since"),
+            until=filters.get("until"),
+            event_refs=filters.get("#e"),
+            pubkey_refs=filters.get("#p"),
+            limit=filters.get("limit"),
+        )
+        for key, values in filters.items():
+            if key.startswith("#") and key not in ["#e", "#p"]:
+                ret.add_arbitrary_tag(key[1:], values)
         return ret
 
+    def copy(self) -> "Filters":
+        """Returns a copy, which can be changed without changing this filter."""
+        return copy.deepcopy(self)
+
     def matches(self, event: Event) -> bool:
         if self.ids is not None and event.id not in self.ids:
             return False
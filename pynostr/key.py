@@ -1,16 +1,30 @@
 import base64
 import binascii
+import functools
 import secrets
+from collections import OrderedDict
 from hashlib import sha256
-from typing import Optional
+from threading import Lock
+from typing import TYPE_CHECKING, Optional
 
 import coincurve as secp256k1
 from coincurve._libsecp256k1 import ffi, lib
-from cryptography.hazmat.primitives import padding
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 
+from . import bech32_codec
 from .delegation import Delegation
-from .utils import bech32_decode, bech32_encode
+
+if TYPE_CHECKING:
+    from cryptography.hazmat.primitives.ciphers import algorithms
+
+
+@functools.cache
+def _ciphers():
+    """Imports the NIP-04 ciphers once, on first use."""
+    from cryptography.hazmat.primitives import padding
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+    return padding, Cipher, algorithms, modes
+
 
 HAS_ECDH = hasattr(lib, "secp256k1_ecdh")
 
@@ -33,7 +47,7 @@ class PublicKey:
             self.raw_bytes = raw_bytes
 
     def bech32(self) -> str:
-        return bech32_encode(self.raw_bytes, "npub")
+        return bech32_codec.encode("npub", self.raw_bytes)
 
     @property
     def npub(self):
@@ -53,7 +67,7 @@ class PublicKey:
     @classmethod
     def from_npub(cls, npub: str):
         """Load a PublicKey from its bech32/npub form."""
-        return cls(bytes(bech32_decode(npub)))
+        return cls(bech32_codec.decode(npub)[1])
 
     def __repr__(self):
         pubkey = self.bech32()
@@ -101,7 +115,7 @@ class PrivateKey:
 
         :param nsec: the nsec key to be imported
         """
-        return cls(bytes(bech32_decode(nsec)))
+        return cls(bech32_codec.decode(nsec)[1])
 
     @classmethod
     def from_hex(cls, hex: str):
@@ -109,7 +123,7 @@ class PrivateKey:
         return cls(binascii.unhexlify(hex))
 
     def bech32(self) -> str:
-        return bech32_encode(self.raw_secret, "nsec")
+        return bech32_codec.encode("nsec", self.raw_secret)
 
     @property
     def nsec(self):
@@ -146,33 +160,62 @@ class PrivateKey:
     def compute_shared_secret(self, public_key_hex: str) -> bytes:
         return self.ecdh(public_key_hex)
 
-    def encrypt_message(self, message: str, public_key_hex: str) -> str:
+    def encrypt_message(
+        self,
+        message: str,
+        public_key_hex: str,
+        shared_secret_cache: Optional["SharedSecretCache"] = None,
+    ) -> str:
+        """NIP-04 encryption.
+
+        :param shared_secret_cache: reuses the shared secret of the keys
+        """
+        padding, Cipher, algorithms, modes = _ciphers()
+
         padder = padding.PKCS7(128).padder()
         padded_data = padder.update(message.encode()) + padder.finalize()
 
         iv = secrets.token_bytes(16)
-        cipher = Cipher(
-            algorithms.AES(self.compute_shared_secret(public_key_hex)), modes.CBC(iv)
-        )
-
-        encryptor = cipher.encryptor()
+        if shared_secret_cache is not None:
+            encryptor = shared_secret_cache.encryptor(self, public_key_hex, iv)
+        else:
+            cipher = Cipher(
+                algorithms.AES(self.compute_shared_secret(public_key_hex)),
+                modes.CBC(iv),
+            )
+            encryptor = cipher.encryptor()
         encrypted_message = encryptor.update(padded_data) + encryptor.finalize()
 
         ret_part1 = base64.b64encode(encrypted_message).decode()
         ret_part2 = base64.b64encode(iv).decode()
         return f"{ret_part1}?iv={ret_part2}"
 
-    def decrypt_message(self, encoded_message: str, public_key_hex: str) -> str:
+    def decrypt_message(
+        self,
+        encoded_message: str,
+        public_key_hex: str,
+        shared_secret_cache: Optional["SharedSecretCache"] = None,
+    ) -> str:
+        """NIP-04 decryption.
+
+        :param shared_secret_cache: reuses the shared secret of the keys
+        """
+        padding, Cipher, algorithms, modes = _ciphers()
+
         encoded_data = encoded_message.split("?iv=")
         encoded_content, encoded_iv = encoded_data[0], encoded_data[1]
 
         iv = base64.b64decode(encoded_iv)
-        cipher = Cipher(
-            algorithms.AES(self.compute_shared_secret(public_key_hex)), modes.CBC(iv)
-        )
+        if shared_secret_cache is not None:
+            decryptor = shared_secret_cache.decryptor(self, public_key_hex, iv)
+        else:
+            cipher = Cipher(
+                algorithms.AES(self.compute_shared_secret(public_key_hex)),
+                modes.CBC(iv),
+            )
+            decryptor = cipher.decryptor()
         encrypted_content = base64.b64decode(encoded_content)
 
-        decryptor = cipher.decryptor()
         decrypted_message = decryptor.update(encrypted_content) + decryptor.finalize()
 
         unpadder = padding.PKCS7(128).unpadder()
@@ -208,6 +251,98 @@ class PrivateKey:
         return self.raw_secret
 
 
+class SharedSecretCache:
+    """LRU cache of the NIP-04 shared secrets of key pairs.
+
+    The cache keeps an AES key for each pair of our public key and a peer
+    public key, so a conversation needs a single ECDH. The cipher contexts
+    are created inside the cache, because evicted secrets are overwritten
+    with zeros, as far as Python allows this.
+
+    :param maxsize: maximal number of shared secrets
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._secrets: OrderedDict[tuple[bytes, str], algorithms.AES] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._secrets)
+
+    def encryptor(self, private_key: PrivateKey, public_key_hex: str, iv: bytes):
+        """Returns an AES-CBC encryption context for the shared secret."""
+        return self._context(private_key, public_key_hex, iv, decrypt=False)
+
+    def decryptor(self, private_key: PrivateKey, public_key_hex: str, iv: bytes):
+        """Returns an AES-CBC decryption context for the shared secret."""
+        return self._context(private_key, public_key_hex, iv, decrypt=True)
+
+    def prepare(self, private_key: PrivateKey, public_key_hex: str):
+        """Computes and stores the shared secret, when it is not cached."""
+        self._context(private_key, public_key_hex, None, decrypt=False)
+
+    def _context(
+        self,
+        private_key: PrivateKey,
+        public_key_hex: str,
+        iv: Optional[bytes],
+        decrypt: bool,
+    ):
+        algorithms = _ciphers()[2]
+        key = (private_key.public_key.raw_bytes, public_key_hex)
+        with self._lock:
+            algorithm = self._get(key)
+            if algorithm is not None:
+                return _create_context(algorithm, iv, decrypt)
+        algorithm = algorithms.AES(
+            bytearray(private_key.compute_shared_secret(public_key_hex))
+        )
+        with self._lock:
+            cached = self._get(key)
+            if cached is not None:
+                # another thread has stored the secret in the meantime
+                _zero(algorithm)
+                return _create_context(cached, iv, decrypt)
+            self.misses += 1
+            context = _create_context(algorithm, iv, decrypt)
+            if self.maxsize > 0:
+                self._secrets[key] = algorithm
+                while len(self._secrets) > self.maxsize:
+                    _zero(self._secrets.popitem(last=False)[1])
+            else:
+                _zero(algorithm)
+        return context
+
+    def _get(self, key: tuple[bytes, str]):
+        algorithm = self._secrets.get(key)
+        if algorithm is not None:
+            self.hits += 1
+            self._secrets.move_to_end(key)
+        return algorithm
+
+    def clear(self):
+        with self._lock:
+            for algorithm in self._secrets.values():
+                _zero(algorithm)
+            self._secrets.clear()
+
+
+def _create_context(algorithm: "algorithms.AES", iv: Optional[bytes], decrypt: bool):
+    if iv is None:
+        return None
+    _, Cipher, _, modes = _ciphers()
+    # the context copies the key, afterwards it can be zeroed
+    cipher = Cipher(algorithm, modes.CBC(iv))
+    return cipher.decryptor() if decrypt else cipher.encryptor()
+
+
+def _zero(algorithm: "algorithms.AES"):
+    algorithm.key[:] = bytes(len(algorithm.key))
+
+
 @ffi.callback(
     "int (unsigned char *, const unsigned char *, const unsigned char *, void *)"
 )
@@ -0,0 +1,260 @@
+"""In-process NIP-01 relay for integration tests and benchmarks."""
+
+import asyncio
+import json
+import logging
+import random
+import threading
+from collections import Counter
+from typing import Optional
+
+from tornado.httpserver import HTTPServer
+from tornado.ioloop import IOLoop
+from tornado.netutil import bind_sockets
+from tornado.web import Application
+from tornado.websocket import WebSocketClosedError, WebSocketHandler
+
+from .event import Event
+from .filters import Filters, FiltersList
+from .message_type import ClientMessageType, RelayMessageType
+from .negentropy import Negentropy, NegentropyStorage
+
+log = logging.getLogger(__name__)
+
+
+class LocalRelayHandler(WebSocketHandler):
+    def initialize(self, relay: "LocalRelay"):
+        self.relay = relay
+        self.subscriptions: dict[str, FiltersList] = {}
+        self.negentropy: dict[str, Negentropy] = {}
+        self.next_send_time = 0.0
+
+    def check_origin(self, origin):
+        return True
+
+    def open(self):
+        self.relay.connections.add(self)
+
+    def on_close(self):
+        self.relay.connections.discard(self)
+
+    def on_message(self, message):
+        self.relay._on_message(self, message)
+
+
+class LocalRelay:
+    """Relay stand-in, which keeps its events in memory.
+
+    It answers EVENT with OK, REQ with the stored events and EOSE, COUNT,
+    CLOSE and, when enabled, the NIP-77 negentropy messages. Each message to
+    a client can be delayed, dropped or throttled, to reproduce slow and
+    unreliable relays without network access.
+
+    The relay can either run on an existing IOLoop with :meth:`listen` or on
+    its own thread with :meth:`start`.
+
+    :param host: listening address
+    :param port: listening port, 0 picks a free port
+    :param latency: seconds every message to a client is delayed
+    :param jitter: maximal random seconds added to or removed from latency
+    :param drop_rate: probability that a message to a client is dropped
+    :param max_messages_per_second: limit of messages to each client
+    :param negentropy: when False, NEG-OPEN is answered with a NOTICE
+    :param seed: seed of the random generator for jitter and drop_rate
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0,
+        jitter: float = 0,
+        drop_rate: float = 0,
+        max_messages_per_second: Optional[float] = None,
+        negentropy: bool = True,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.host = host
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.max_messages_per_second = max_messages_per_second
+        self.negentropy = negentropy
+        self.events: dict[str, Event] = {}
+        self.received: Counter = Counter()
+        self.requests: list[list[dict]] = []
+        self.sent = 0
+        self.dropped = 0
+        self.connections: set[LocalRelayHandler] = set()
+        self.io_loop: Optional[IOLoop] = None
+        self.random = random.Random(seed)
+        self._sockets = bind_sockets(port, host)
+        self.port = self._sockets[0].getsockname()[1]
+        self._server: Optional[HTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    def add_event(self, event: Event):
+        self.events[event.id] = event
+
+    def listen(self, io_loop: Optional[IOLoop] = None) -> "LocalRelay":
+        """Serves on io_loop (the current IOLoop when None)."""
+        self.io_loop = io_loop if io_loop is not None else IOLoop.current()
+        self._server = HTTPServer(
+            Application([(r"/.*", LocalRelayHandler, {"relay": self})])
+        )
+        self._server.add_sockets(self._sockets)
+        return self
+
+    def start(self) -> "LocalRelay":
+        """Serves on a new IOLoop in a background thread."""
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(asyncio.new_event_loop())
+            self.listen()
+            started.set()
+            self.io_loop.start()
+            self.io_loop.close(all_fds=True)
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self.io_loop.add_callback(self._stop)
+            self._thread.join()
+            self._thread = None
+        elif self._server is not None:
+            self._stop()
+
+    def _stop(self):
+        self._server.stop()
+        self._close_connections()
+        if self._thread is not None:
+            self.io_loop.stop()
+
+    def disconnect_all(self):
+        """Closes all client connections, e.g. to test reconnects."""
+        self.io_loop.add_callback(self._close_connections)
+
+    def _close_connections(self):
+        for connection in list(self.connections):
+            connection.close()
+
+    def query(self, filters_list: FiltersList) -> list[Event]:
+        """Returns the stored events matching any of the filters, newest first."""
+        events: dict[str, Event] = {}
+        for filters in filters_list:
+            matches = [e for e in self.events.values() if filters.matches(e)]
+            matches.sort(key=lambda e: e.created_at, reverse=True)
+            if filters.limit is not None:
+                matches = matches[: filters.limit]
+            events.update((e.id, e) for e in matches)
+        return sorted(events.values(), key=lambda e: e.created_at, reverse=True)
+
+    def _on_message(self, connection: LocalRelayHandler, message: str):
+        message_json = json.loads(message)
+        message_type = message_json[0]
+        self.received[message_type] += 1
+        if message_type == ClientMessageType.EVENT:
+            self._on_event(connection, message_json[1])
+        elif message_type == ClientMessageType.REQUEST:
+            self._on_request(connection, message_json[1], message_json[2:])
+        elif message_type == ClientMessageType.CLOSE:
+            connection.subscriptions.pop(message_json[1], None)
+        elif message_type == ClientMessageType.COUNT:
+            count = len(self.query(self._filters_list(message_json[2:])))
+            self._send(connection, ["COUNT", message_json[1], {"count": count}])
+        elif self.negentropy and message_type == ClientMessageType.NEG_OPEN:
+            storage = NegentropyStorage()
+            for event in self.query(self._filters_list([message_json[2]])):
+                storage.insert(event.created_at, event.id)
+            connection.negentropy[message_json[1]] = Negentropy(storage)
+            self._on_negentropy(connection, message_json[1], message_json[3])
+        elif self.negentropy and message_type == ClientMessageType.NEG_MSG:
+            self._on_negentropy(connection, message_json[1], message_json[2])
+        elif self.negentropy and message_type == ClientMessageType.NEG_CLOSE:
+            connection.negentropy.pop(message_json[1], None)
+        else:
+            self._send(connection, [RelayMessageType.NOTICE, "unknown message type"])
+
+    def _on_event(self, connection: LocalRelayHandler, event_dict: dict):
+        event = Event.from_dict(event_dict)
+        if not event.verify():
+            result = [False, "invalid: bad signature"]
+        elif event.id in self.events:
+            result = [True, "duplicate: already have this event"]
+        else:
+            self.add_event(event)
+            result = [True, ""]
+            for client in list(self.connections):
+                for subscription_id, filters_list in client.subscriptions.items():
+                    if filters_list.match(event):
+                        self._send(
+                            client,
+                            [RelayMessageType.EVENT, subscription_id, event_dict],
+                        )
+        self._send(connection, [RelayMessageType.OK, event.id, *result])
+
+    def _on_request(self, connection, subscription_id: str, filters: list[dict]):
+        self.requests.append(filters)
+        filters_list = self._filters_list(filters)
+        connection.subscriptions[subscription_id] = filters_list
+        for event in self.query(filters_list):
+            self._send(
+                connection, [RelayMessageType.EVENT, subscription_id, event.to_dict()]
+            )
+        self._send(connection, [RelayMessageType.END_OF_STORED_EVENTS, subscription_id])
+
+    def _on_negentropy(self, connection, subscription_id: str, message: str):
+        negentropy = connection.negentropy.get(subscription_id)
+        if negentropy is None:
+            self._send(
+                connection,
+                [RelayMessageType.NEG_ERR, subscription_id, "closed: unknown"],
+            )
+            return
+        answer = negentropy.reconcile(message)
+        self._send(connection, [RelayMessageType.NEG_MSG, subscription_id, answer])
+
+    @staticmethod
+    def _filters_list(filters: list[dict]) -> FiltersList:
+        return FiltersList([Filters.from_dict(f) for f in filters])
+
+    def _send(self, connection: LocalRelayHandler, message_json: list):
+        if self.drop_rate > 0 and self.random.random() < self.drop_rate:
+            self.dropped += 1
+            return
+        now = self.io_loop.time()
+        delay = self.latency
+        if self.jitter > 0:
+            delay += self.random.uniform(-self.jitter, self.jitter)
+        # messages stay in order, even with jitter
+        send_time = max(now + max(delay, 0), connection.next_send_time)
+        connection.next_send_time = send_time
+        if self.max_messages_per_second:
+            connection.next_send_time += 1 / self.max_messages_per_second
+        message = json.dumps(message_json)
+        if send_time <= now:
+            self._write(connection, message)
+        else:
+            self.io_loop.call_at(send_time, self._write, connection, message)
+
+    def _write(self, connection: LocalRelayHandler, message: str):
+        try:
+            connection.write_message(message)
+            self.sent += 1
+        except WebSocketClosedError:
+            pass
@@ -2,13 +2,14 @@
 
 import datetime
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from queue import Queue
 from threading import Lock
-from typing import Optional
+from typing import Callable, Optional
 
 from .event import Event
 from .message_type import RelayMessageType
+from .tracing import MessageTrace, Stage
 
 
 @dataclass
@@ -16,6 +17,7 @@ class EventMessage:
     event: Event
     subscription_id: str
     url: str
+    trace: Optional[MessageTrace] = field(default=None, compare=False)
 
     def __repr__(self):
         return f"EventMessage({self.url}: kind {str(self.event.kind)})"
@@ -69,10 +71,48 @@ class MessagePool:
         self.ok_notices: Queue[OKMessage] = Queue()
         self.count: Queue[CountMessage] = Queue()
         self._unique_objects: set = set()
+        self._ok_listeners: list[Callable[[OKMessage], None]] = []
+        self._message_listeners: list[Callable] = []
         self.lock: Lock = Lock()
-
-    def add_message(self, message: str, url: str):
-        self._process_message(message, url)
+        self.metrics = None
+
+    def add_message(
+        self, message: str, url: str, trace: Optional[MessageTrace] = None
+    ) -> bool:
+        """Adds a relay message, returns False for an already received event.
+
+        :param trace: trace of the message, when the relay has a tracer
+        """
+        return self._process_message(message, url, trace)
+
+    def add_ok_listener(self, listener: Callable[[OKMessage], None]):
+        """Calls listener with every received OKMessage.
+
+        The OKMessage is still added to ok_notices.
+        """
+        with self.lock:
+            self._ok_listeners.append(listener)
+
+    def remove_ok_listener(self, listener: Callable[[OKMessage], None]):
+        with self.lock:
+            if listener in self._ok_listeners:
+                self._ok_listeners.remove(listener)
+
+    def add_message_listener(self, listener: Callable):
+        """Calls listener with every queued EventMessage and EOSE message."""
+        with self.lock:
+            self._message_listeners.append(listener)
+
+    def remove_message_listener(self, listener: Callable):
+        with self.lock:
+            if listener in self._message_listeners:
+                self._message_listeners.remove(listener)
+
+    def _notify(self, message) -> None:
+        with self.lock:
+            listeners = list(self._message_listeners)
+        for listener in listeners:
+            listener(message)
 
     def get_all_events(self):
         events = []
@@ -114,7 +154,10 @@ class MessagePool:
         return results
 
     def get_event(self):
-        return self.events.get()
+        event_message = self.events.get()
+        if event_message.trace is not None:
+            event_message.trace.dequeued()
+        return event_message
 
     def get_notice(self):
         return self.notices.get()
@@ -143,7 +186,9 @@ class MessagePool:
     def has_counts(self):
         return self.count.qsize() > 0
 
-    def _process_message(self, message: str, url: str):
+    def _process_message(
+        self, message: str, url: str, trace: Optional[MessageTrace] = None
+    ) -> bool:
         message_json = json.loads(message)
         message_type = message_json[0]
         if message_type == RelayMessageType.EVENT:
@@ -151,26 +196,46 @@ class MessagePool:
             e = message_json[2]
             event = Event.from_dict(e)
             with self.lock:
+                is_new = event.id not in self._unique_objects
                 if self.first_response_only:
                     object_id = event.id
                 else:
                     object_id = f"{event.id}:{url}"
+                event_message = None
                 if object_id not in self._unique_objects:
-                    self.events.put(EventMessage(event, subscription_id, url))
+                    event_message = EventMessage(event, subscription_id, url, trace)
+                    self.events.put(event_message)
                     self._unique_objects.add(event.id)
+            if trace is not None:
+                trace.mark(Stage.ENQUEUE)
+            if self.metrics is not None:
+                self.metrics.pool_events.inc()
+                if not is_new:
+                    self.metrics.pool_duplicates.inc()
+            if event_message is not None:
+                self._notify(event_message)
+            return is_new
         elif message_type == RelayMessageType.NOTICE:
             self.notices.put(NoticeMessage(message_json[1], url))
         elif message_type == RelayMessageType.END_OF_STORED_EVENTS:
-            self.eose_notices.put(EndOfStoredEventsMessage(message_json[1], url))
+            eose_message = EndOfStoredEventsMessage(message_json[1], url)
+            self.eose_notices.put(eose_message)
+            self._notify(eose_message)
         elif message_type == RelayMessageType.OK:
-            self.ok_notices.put(
-                OKMessage(message_json[1], message_json[2], message_json[3], url)
+            ok_message = OKMessage(
+                message_json[1], message_json[2], message_json[3], url
             )
+            self.ok_notices.put(ok_message)
+            with self.lock:
+                listeners = list(self._ok_listeners)
+            for listener in listeners:
+                listener(ok_message)
         elif message_type == RelayMessageType.COUNT:
             count = message_json[2].get("count", -1)  # TODO make -1 an error constant
             self.count.put(
                 CountMessage(subscription_id=message_json[1], count=count, url=url)
             )
+        return True
 
     def __repr__(self):
         return (
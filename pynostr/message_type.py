@@ -4,15 +4,21 @@ class ClientMessageType:
     CLOSE = "CLOSE"
     AUTH = "AUTH"
     COUNT = "COUNT"
+    NEG_OPEN = "NEG-OPEN"
+    NEG_MSG = "NEG-MSG"
+    NEG_CLOSE = "NEG-CLOSE"
 
     @staticmethod
     def is_valid(type: str) -> bool:
         if (
             type == ClientMessageType.EVENT
-            or type == ClientMessageType.REQ
+            or type == ClientMessageType.REQUEST
             or type == ClientMessageType.CLOSE
             or type == ClientMessageType.AUTH
             or type == ClientMessageType.COUNT
+            or type == ClientMessageType.NEG_OPEN
+            or type == ClientMessageType.NEG_MSG
+            or type == ClientMessageType.NEG_CLOSE
         ):
             return True
         return False
@@ -25,6 +31,8 @@ class RelayMessageType:
     END_OF_STORED_EVENTS = "EOSE"
     OK = "OK"
     COUNT = "COUNT"
+    NEG_MSG = "NEG-MSG"
+    NEG_ERR = "NEG-ERR"
 
     @staticmethod
     def is_valid(type: str) -> bool:
@@ -35,6 +43,8 @@ class RelayMessageType:
             or type == RelayMessageType.END_OF_STORED_EVENTS
             or type == RelayMessageType.OK
             or type == RelayMessageType.COUNT
+            or type == RelayMessageType.NEG_MSG
+            or type == RelayMessageType.NEG_ERR
         ):
             return True
         return False
@@ -0,0 +1,305 @@
+"""Metrics of relays and message pools with a Prometheus text exporter."""
+
+import bisect
+import math
+from threading import Lock
+from typing import Callable
+
+# upper bounds in seconds of the parse and verify histograms
+DEFAULT_BUCKETS = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.1,
+)
+
+
+class Metric:
+    """Values of a metric by label values.
+
+    :param name: metric name
+    :param documentation: help text
+    :param labelnames: names of the labels
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: dict[tuple, float] = {}
+        self.lock = Lock()
+
+    def get(self, *labels) -> float:
+        return self.values.get(labels, 0)
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        """Returns (name, labels, value) of every labelled value."""
+        with self.lock:
+            values = list(self.values.items())
+        return [(self.name, self._labels(key), value) for key, value in values]
+
+    def to_dict(self) -> list[dict]:
+        with self.lock:
+            values = list(self.values.items())
+        return [{"labels": self._labels(key), "value": value} for key, value in values]
+
+    def _labels(self, key: tuple) -> dict:
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, *labels):
+        with self.lock:
+            self.values[labels] = value
+
+    def remove(self, *labels):
+        with self.lock:
+            self.values.pop(labels, None)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.counts: dict[tuple, list[int]] = {}
+        self.sums: dict[tuple, float] = {}
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.counts.get(labels)
+            if counts is None:
+                counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+            counts[index] += 1
+            self.sums[labels] = self.sums.get(labels, 0) + value
+
+    def get(self, *labels) -> float:
+        """Returns the number of observations."""
+        return sum(self.counts.get(labels, []))
+
+    def mean(self, *labels) -> float:
+        count = self.get(*labels)
+        if count == 0:
+            return 0
+        return self.sums[labels] / count
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        ret = []
+        for key, counts, total in self._items():
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                ret.append((f"{self.name}_bucket", {**labels, "le": le}, cumulative))
+            ret.append((f"{self.name}_count", labels, cumulative))
+            ret.append((f"{self.name}_sum", labels, total))
+        return ret
+
+    def to_dict(self) -> list[dict]:
+        return [
+            {
+                "labels": self._labels(key),
+                "count": sum(counts),
+                "sum": total,
+                "buckets": dict(zip((*self.buckets, math.inf), counts)),
+            }
+            for key, counts, total in self._items()
+        ]
+
+    def _items(self):
+        with self.lock:
+            return [(key, list(c), self.sums[key]) for key, c in self.counts.items()]
+
+
+class MetricsRegistry:
+    """Metrics of relays and message pools.
+
+    Relays and message pools record into the registry, when their `metrics`
+    attribute is set, e.g. by passing the registry to a RelayManager. Without
+    a registry nothing is recorded.
+
+    The values can be pulled with :meth:`to_dict` or exported in the
+    Prometheus text format with :meth:`to_prometheus`. Queue depths are
+    sampled by collectors at these calls.
+
+    :param buckets: upper bounds in seconds of the time histograms
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS) -> None:
+        self.metrics: dict[str, Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+        self.received_bytes = self.counter(
+            "pynostr_relay_received_bytes", "Bytes received from a relay", ["url"]
+        )
+        self.sent_bytes = self.counter(
+            "pynostr_relay_sent_bytes", "Bytes sent to a relay", ["url"]
+        )
+        self.received_frames = self.counter(
+            "pynostr_relay_received_frames",
+            "Messages received from a relay",
+            ["url", "type"],
+        )
+        self.sent_frames = self.counter(
+            "pynostr_relay_sent_frames", "Messages sent to a relay", ["url", "type"]
+        )
+        self.invalid_frames = self.counter(
+            "pynostr_relay_invalid_frames",
+            "Dropped messages, which were invalid or for closed subscriptions",
+            ["url"],
+        )
+        self.connects = self.counter(
+            "pynostr_relay_connects", "Opened connections to a relay", ["url"]
+        )
+        self.reconnects = self.counter(
+            "pynostr_relay_reconnects",
+            "Connections to a relay after the first one",
+            ["url"],
+        )
+        self.parse_seconds = self.histogram(
+            "pynostr_relay_parse_seconds",
+            "Time to parse a relay message",
+            ["url"],
+            buckets,
+        )
+        self.verify_seconds = self.histogram(
+            "pynostr_relay_verify_seconds",
+            "Time to verify the signature of an event",
+            ["url"],
+            buckets,
+        )
+        self.pool_events = self.counter(
+            "pynostr_message_pool_events", "Events added to a message pool"
+        )
+        self.pool_duplicates = self.counter(
+            "pynostr_message_pool_duplicates",
+            "Events, which the message pool had already received",
+        )
+        self.queue_depth = self.gauge(
+            "pynostr_message_pool_queue_depth",
+            "Unconsumed messages in the message pool",
+            ["queue"],
+        )
+        self.outgoing_queue_depth = self.gauge(
+            "pynostr_relay_outgoing_queue_depth", "Unsent messages of a relay", ["url"]
+        )
+        self.dropped_messages = self.counter(
+            "pynostr_relay_dropped_messages",
+            "Unsent messages, which were dropped from a full outgoing queue",
+            ["url"],
+        )
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"{metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Calls collector before the metrics are read, e.g. to set gauges."""
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], None]):
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def collect(self):
+        for collector in list(self._collectors):
+            collector()
+
+    def record_queue_depths(self, message_pool, relays):
+        """Sets the queue depth gauges of a message pool and its relays."""
+        for queue in ["events", "notices", "eose_notices", "ok_notices", "count"]:
+            self.queue_depth.set(getattr(message_pool, queue).qsize(), queue)
+        for relay in relays:
+            self.outgoing_queue_depth.set(relay.outgoing_messages.qsize(), relay.url)
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Share of the events, which the message pools had already received."""
+        events = self.pool_events.get()
+        if events == 0:
+            return 0
+        return self.pool_duplicates.get() / events
+
+    def to_dict(self) -> dict:
+        self.collect()
+        ret = {name: metric.to_dict() for name, metric in self.metrics.items()}
+        ret["dedup_ratio"] = self.dedup_ratio
+        return ret
+
+    def to_prometheus(self) -> str:
+        """Returns all metrics in the Prometheus text exposition format."""
+        self.collect()
+        lines = []
+        for metric in self.metrics.values():
+            name = metric.name
+            if metric.type == "counter":
+                name = f"{name}_total"
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for sample_name, labels, value in metric.samples():
+                if metric.type == "counter":
+                    sample_name = f"{sample_name}_total"
+                lines.append(f"{sample_name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{key}="{_escape(str(value))}"' for key, value in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def frame_size(message) -> int:
+    """Returns the number of bytes of a websocket frame, str is sent as UTF-8."""
+    if isinstance(message, str):
+        return len(message.encode())
+    return len(message)
+
+
+def frame_type(message: str) -> str:
+    """Returns the type of a serialized client or relay message."""
+    end = message.find('"', 2)
+    if not message.startswith('["') or end < 0:
+        return "invalid"
+    return message[2:end]
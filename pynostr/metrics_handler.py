@@ -0,0 +1,19 @@
+"""Tornado handler, which serves a MetricsRegistry for Prometheus."""
+
+from tornado.web import RequestHandler
+
+from .metrics import MetricsRegistry
+
+
+class MetricsHandler(RequestHandler):
+    """Serves a MetricsRegistry for Prometheus, e.g. at /metrics.
+
+    Application([(r"/metrics", MetricsHandler, {"registry": registry})])
+    """
+
+    def initialize(self, registry: MetricsRegistry):
+        self.registry = registry
+
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.write(self.registry.to_prometheus())
@@ -0,0 +1,298 @@
+"""Range-based set reconciliation of events (negentropy, NIP-77).
+
+Both sides keep their events sorted by (created_at, id). Ranges are compared
+by a fingerprint of the ids they contain; equal ranges are skipped, differing
+ranges are split until they are small enough to exchange the ids directly.
+Only the differing ids are transferred, not the events themselves.
+"""
+
+import bisect
+import hashlib
+from typing import Optional
+
+from .exception import NegentropyException
+
+PROTOCOL_VERSION = 0x61
+ID_SIZE = 32
+FINGERPRINT_SIZE = 16
+BUCKETS = 16
+MAX_TIMESTAMP = 2**64 - 1
+
+
+class Mode:
+    SKIP = 0
+    FINGERPRINT = 1
+    ID_LIST = 2
+
+
+def encode_varint(n: int) -> bytes:
+    """Base-128 big endian, the high bit is set on all but the last byte."""
+    if n == 0:
+        return b"\x00"
+    out = []
+    while n:
+        out.append(n & 0x7F)
+        n >>= 7
+    out.reverse()
+    for i in range(len(out) - 1):
+        out[i] |= 0x80
+    return bytes(out)
+
+
+class _Reader:
+    def __init__(self, data: bytes) -> None:
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def __len__(self):
+        return len(self.data) - self.pos
+
+    def read_byte(self) -> int:
+        return self.read(1)[0]
+
+    def read(self, n: int) -> bytes:
+        if len(self) < n:
+            raise NegentropyException("parse ends prematurely")
+        ret = bytes(self.data[self.pos : self.pos + n])
+        self.pos += n
+        return ret
+
+    def read_varint(self) -> int:
+        n = 0
+        while True:
+            byte = self.read_byte()
+            n = (n << 7) | (byte & 0x7F)
+            if not byte & 0x80:
+                return n
+
+
+class NegentropyStorage:
+    """Sorted (created_at, id) items of the local events."""
+
+    def __init__(self) -> None:
+        self.items: list[tuple[int, bytes]] = []
+        self._sealed = False
+
+    def __len__(self):
+        return len(self.items)
+
+    def insert(self, created_at: int, event_id: str):
+        if self._sealed:
+            raise NegentropyException("storage is already sealed")
+        id_bytes = bytes.fromhex(event_id)
+        if len(id_bytes) != ID_SIZE:
+            raise NegentropyException(f"invalid id {event_id}")
+        self.items.append((created_at, id_bytes))
+
+    def seal(self):
+        self.items.sort()
+        self._sealed = True
+
+    def find_lower_bound(self, begin: int, end: int, bound: tuple[int, bytes]) -> int:
+        return bisect.bisect_left(self.items, bound, begin, end)
+
+    def fingerprint(self, begin: int, end: int) -> bytes:
+        total = 0
+        for i in range(begin, end):
+            total += int.from_bytes(self.items[i][1], "little")
+        total %= 2**256
+        data = total.to_bytes(ID_SIZE, "little") + encode_varint(end - begin)
+        return hashlib.sha256(data).digest()[:FINGERPRINT_SIZE]
+
+
+class Negentropy:
+    """One side of a reconciliation.
+
+    The client calls :meth:`initiate` and passes every answer of the relay to
+    :meth:`reconcile` until it returns None as next message. The ids found
+    only locally are collected in `have_ids`, the ids found only on the relay
+    in `need_ids`.
+
+    :param storage: sealed NegentropyStorage
+    :param frame_size_limit: maximum message size in bytes, 0 for no limit
+    """
+
+    def __init__(self, storage: NegentropyStorage, frame_size_limit: int = 0) -> None:
+        if frame_size_limit != 0 and frame_size_limit < 4096:
+            raise NegentropyException("frame_size_limit too small")
+        if not storage._sealed:
+            storage.seal()
+        self.storage = storage
+        self.frame_size_limit = frame_size_limit
+        self.is_initiator = False
+        self.have_ids: list[str] = []
+        self.need_ids: list[str] = []
+        self._last_timestamp_in = 0
+        self._last_timestamp_out = 0
+
+    def initiate(self) -> str:
+        """Returns the first message as hex string."""
+        if self.is_initiator:
+            raise NegentropyException("already initiated")
+        self.is_initiator = True
+        self._last_timestamp_out = 0
+        output = bytes([PROTOCOL_VERSION])
+        output += self._split_range(0, len(self.storage), (MAX_TIMESTAMP, b""))
+        return output.hex()
+
+    def reconcile(self, message: str) -> Optional[str]:
+        """Processes a hex message, returns the answer or None when done."""
+        output = self._reconcile(_Reader(bytes.fromhex(message)))
+        if len(output) == 1 and self.is_initiator:
+            return None
+        return output.hex()
+
+    def _reconcile(self, query: _Reader) -> bytes:
+        self._last_timestamp_in = 0
+        self._last_timestamp_out = 0
+        full_output = bytearray([PROTOCOL_VERSION])
+        protocol_version = query.read_byte()
+        if protocol_version < 0x60 or protocol_version > 0x6F:
+            raise NegentropyException("invalid negentropy protocol version byte")
+        if protocol_version != PROTOCOL_VERSION:
+            if self.is_initiator:
+                raise NegentropyException(
+                    f"unsupported negentropy protocol version {protocol_version}"
+                )
+            return bytes(full_output)
+
+        storage_size = len(self.storage)
+        prev_bound = (0, b"")
+        prev_index = 0
+        skip = False
+        while len(query) > 0:
+            out = bytearray()
+            curr_bound = self._decode_bound(query)
+            mode = query.read_varint()
+            lower = prev_index
+            upper = self.storage.find_lower_bound(prev_index, storage_size, curr_bound)
+
+            if mode == Mode.SKIP:
+                skip = True
+            elif mode == Mode.FINGERPRINT:
+                their_fingerprint = query.read(FINGERPRINT_SIZE)
+                if their_fingerprint != self.storage.fingerprint(lower, upper):
+                    if skip:
+                        skip = False
+                        out += self._encode_bound(prev_bound)
+                        out += encode_varint(Mode.SKIP)
+                    out += self._split_range(lower, upper, curr_bound)
+                else:
+                    skip = True
+            elif mode == Mode.ID_LIST:
+                num_ids = query.read_varint()
+                their_ids = {query.read(ID_SIZE) for _ in range(num_ids)}
+                for i in range(lower, upper):
+                    id_bytes = self.storage.items[i][1]
+                    if id_bytes in their_ids:
+                        their_ids.discard(id_bytes)
+                    elif self.is_initiator:
+                        self.have_ids.append(id_bytes.hex())
+                if self.is_initiator:
+                    skip = True
+                    self.need_ids.extend(id_bytes.hex() for id_bytes in their_ids)
+                else:
+                    if skip:
+                        skip = False
+                        out += self._encode_bound(prev_bound)
+                        out += encode_varint(Mode.SKIP)
+                    full_output += out
+                    out = bytearray()
+                    response, upper = self._id_list(
+                        lower, upper, curr_bound, len(full_output)
+                    )
+                    full_output += response
+            else:
+                raise NegentropyException(f"unexpected mode {mode}")
+
+            if self._exceeded(len(full_output) + len(out)):
+                # the remaining ranges are answered with a single fingerprint
+                full_output += self._encode_bound((MAX_TIMESTAMP, b""))
+                full_output += encode_varint(Mode.FINGERPRINT)
+                full_output += self.storage.fingerprint(upper, storage_size)
+                break
+            full_output += out
+            prev_index = upper
+            prev_bound = curr_bound
+        return bytes(full_output)
+
+    def _id_list(
+        self, lower: int, upper: int, upper_bound, output_size: int
+    ) -> tuple[bytes, int]:
+        """Returns the ids of a range and the index after the last sent id."""
+        ids = bytearray()
+        end_bound = upper_bound
+        for i in range(lower, upper):
+            if self._exceeded(output_size + len(ids)):
+                end_bound = self.storage.items[i]
+                upper = i
+                break
+            ids += self.storage.items[i][1]
+        out = self._encode_bound(end_bound)
+        out += encode_varint(Mode.ID_LIST)
+        out += encode_varint(upper - lower)
+        return out + ids, upper
+
+    def _split_range(self, lower: int, upper: int, upper_bound) -> bytes:
+        out = bytearray()
+        num_elems = upper - lower
+        if num_elems < BUCKETS * 2:
+            out += self._encode_bound(upper_bound)
+            out += encode_varint(Mode.ID_LIST)
+            out += encode_varint(num_elems)
+            for i in range(lower, upper):
+                out += self.storage.items[i][1]
+            return bytes(out)
+
+        items_per_bucket, buckets_with_extra = divmod(num_elems, BUCKETS)
+        curr = lower
+        for i in range(BUCKETS):
+            bucket_size = items_per_bucket + (1 if i < buckets_with_extra else 0)
+            fingerprint = self.storage.fingerprint(curr, curr + bucket_size)
+            curr += bucket_size
+            if curr == upper:
+                next_bound = upper_bound
+            else:
+                next_bound = self._minimal_bound(
+                    self.storage.items[curr - 1], self.storage.items[curr]
+                )
+            out += self._encode_bound(next_bound)
+            out += encode_varint(Mode.FINGERPRINT)
+            out += fingerprint
+        return bytes(out)
+
+    def _exceeded(self, n: int) -> bool:
+        return self.frame_size_limit != 0 and n > self.frame_size_limit - 200
+
+    @staticmethod
+    def _minimal_bound(prev, curr) -> tuple[int, bytes]:
+        if curr[0] != prev[0]:
+            return (curr[0], b"")
+        shared = 0
+        while shared < ID_SIZE and curr[1][shared] == prev[1][shared]:
+            shared += 1
+        return (curr[0], curr[1][: shared + 1])
+
+    def _encode_bound(self, bound: tuple[int, bytes]) -> bytes:
+        timestamp, id_prefix = bound
+        if timestamp == MAX_TIMESTAMP:
+            self._last_timestamp_out = MAX_TIMESTAMP
+            encoded = encode_varint(0)
+        else:
+            encoded = encode_varint(timestamp - self._last_timestamp_out + 1)
+            self._last_timestamp_out = timestamp
+        return encoded + encode_varint(len(id_prefix)) + id_prefix
+
+    def _decode_bound(self, query: _Reader) -> tuple[int, bytes]:
+        timestamp = query.read_varint()
+        timestamp = MAX_TIMESTAMP if timestamp == 0 else timestamp - 1
+        if timestamp == MAX_TIMESTAMP or self._last_timestamp_in == MAX_TIMESTAMP:
+            self._last_timestamp_in = MAX_TIMESTAMP
+            timestamp = MAX_TIMESTAMP
+        else:
+            timestamp += self._last_timestamp_in
+            self._last_timestamp_in = timestamp
+        length = query.read_varint()
+        if length > ID_SIZE:
+            raise NegentropyException("bound key too long")
+        return (timestamp, query.read(length))
@@ -0,0 +1,218 @@
+"""NIP-19 TLV entities: nprofile, nevent, naddr and nrelay.
+
+https://github.com/nostr-protocol/nips/blob/master/19.md
+
+The TLV records are parsed as memoryview slices of the decoded bytes and
+written into a single bytearray::
+
+    pointer = decode("nevent1...")
+    print(pointer.id, pointer.relays)
+    nevent = EventPointer(event.id, relays=[url]).encode()
+"""
+
+import struct
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Optional, Union
+
+from . import bech32_codec
+
+
+class TLVType(IntEnum):
+    SPECIAL = 0
+    RELAY = 1
+    AUTHOR = 2
+    KIND = 3
+
+
+@dataclass
+class ProfilePointer:
+    """nprofile: a pubkey with relays, on which it can be found.
+
+    :param pubkey: hex pubkey
+    :param relays: relay urls
+    """
+
+    pubkey: str
+    relays: list[str] = field(default_factory=list)
+
+    def encode(self) -> str:
+        buffer = bytearray()
+        _add(buffer, TLVType.SPECIAL, _from_hex(self.pubkey))
+        _add_relays(buffer, self.relays)
+        return bech32_codec.encode("nprofile", buffer)
+
+
+@dataclass
+class EventPointer:
+    """nevent: an event id with optional relays, author and kind.
+
+    :param id: hex event id
+    :param relays: relay urls
+    :param author: hex pubkey of the author
+    :param kind: kind of the event
+    """
+
+    id: str
+    relays: list[str] = field(default_factory=list)
+    author: Optional[str] = None
+    kind: Optional[int] = None
+
+    def encode(self) -> str:
+        buffer = bytearray()
+        _add(buffer, TLVType.SPECIAL, _from_hex(self.id))
+        _add_relays(buffer, self.relays)
+        if self.author is not None:
+            _add(buffer, TLVType.AUTHOR, _from_hex(self.author))
+        if self.kind is not None:
+            _add(buffer, TLVType.KIND, struct.pack(">I", self.kind))
+        return bech32_codec.encode("nevent", buffer)
+
+
+@dataclass
+class AddressPointer:
+    """naddr: a replaceable event by its d tag, author and kind.
+
+    :param identifier: d tag of the event
+    :param pubkey: hex pubkey of the author
+    :param kind: kind of the event
+    :param relays: relay urls
+    """
+
+    identifier: str
+    pubkey: str
+    kind: int
+    relays: list[str] = field(default_factory=list)
+
+    def encode(self) -> str:
+        buffer = bytearray()
+        _add(buffer, TLVType.SPECIAL, self.identifier.encode())
+        _add_relays(buffer, self.relays)
+        _add(buffer, TLVType.AUTHOR, _from_hex(self.pubkey))
+        _add(buffer, TLVType.KIND, struct.pack(">I", self.kind))
+        return bech32_codec.encode("naddr", buffer)
+
+
+@dataclass
+class RelayPointer:
+    """nrelay: a relay url.
+
+    :param url: relay url
+    """
+
+    url: str
+
+    def encode(self) -> str:
+        buffer = bytearray()
+        _add(buffer, TLVType.SPECIAL, self.url.encode())
+        return bech32_codec.encode("nrelay", buffer)
+
+
+Pointer = Union[ProfilePointer, EventPointer, AddressPointer, RelayPointer]
+
+PREFIXES = ("nprofile", "nevent", "naddr", "nrelay")
+
+
+def _from_hex(value: str) -> bytes:
+    raw = bytes.fromhex(value)
+    if len(raw) != 32:
+        raise ValueError(f"{value} is not a 32 byte hex string")
+    return raw
+
+
+def _add(buffer: bytearray, type_id: int, value: bytes):
+    if len(value) > 255:
+        raise ValueError(f"TLV value of type {type_id} is longer than 255 bytes")
+    buffer.append(type_id)
+    buffer.append(len(value))
+    buffer += value
+
+
+def _add_relays(buffer: bytearray, relays: Iterable[str]):
+    for relay in relays:
+        _add(buffer, TLVType.RELAY, relay.encode())
+
+
+def encode_tlv(entries: Iterable[tuple[int, bytes]]) -> bytes:
+    """Writes (type, value) entries as TLV records."""
+    buffer = bytearray()
+    for type_id, value in entries:
+        _add(buffer, type_id, value)
+    return bytes(buffer)
+
+
+def iter_tlv(data: Union[bytes, memoryview]) -> Iterator[tuple[int, memoryview]]:
+    """Yields the type and a memoryview of the value of each TLV record."""
+    view = memoryview(data)
+    pos = 0
+    while pos < len(view):
+        if pos + 2 > len(view):
+            raise ValueError("Truncated TLV record")
+        type_id, length = view[pos], view[pos + 1]
+        end = pos + 2 + length
+        if end > len(view):
+            raise ValueError("Truncated TLV record")
+        yield type_id, view[pos + 2 : end]
+        pos = end
+
+
+def _parse(data: bytes) -> tuple[Optional[memoryview], list[str], dict]:
+    special = None
+    relays = []
+    values = {}
+    for type_id, value in iter_tlv(data):
+        if type_id == TLVType.SPECIAL:
+            special = value if special is None else special
+        elif type_id == TLVType.RELAY:
+            relays.append(str(value, "utf-8"))
+        elif type_id == TLVType.AUTHOR and len(value) == 32:
+            values.setdefault("author", value.hex())
+        elif type_id == TLVType.KIND and len(value) == 4:
+            values.setdefault("kind", int.from_bytes(value, "big"))
+    return special, relays, values
+
+
+def decode(bech: str) -> Pointer:
+    """Decodes a nprofile, nevent, naddr or nrelay string.
+
+    Unknown TLV types are ignored. Raises ValueError, when the string is
+    invalid or required values are missing.
+    """
+    hrp, data, _ = bech32_codec.bech32_decode(bech)
+    raw = bech32_codec.data_to_bytes(data) if hrp is not None else None
+    if raw is None:
+        raise ValueError(f"{bech} is not a valid bech32 string")
+    special, relays, values = _parse(raw)
+    if special is None:
+        raise ValueError(f"{bech} has no special TLV record")
+    if hrp in ("nprofile", "nevent") and len(special) != 32:
+        raise ValueError(f"{bech} has no 32 byte key")
+    if hrp == "nprofile":
+        return ProfilePointer(special.hex(), relays)
+    if hrp == "nevent":
+        return EventPointer(
+            special.hex(), relays, values.get("author"), values.get("kind")
+        )
+    if hrp == "naddr":
+        if "author" not in values or "kind" not in values:
+            raise ValueError(f"{bech} needs an author and a kind")
+        return AddressPointer(
+            str(special, "utf-8"), values["author"], values["kind"], relays
+        )
+    if hrp == "nrelay":
+        return RelayPointer(str(special, "utf-8"))
+    raise ValueError(f"{hrp} is not a NIP-19 TLV entity")
+
+
+def encode(pointer: Pointer) -> str:
+    return pointer.encode()
+
+
+def decode_many(items: Iterable[str]) -> list[Pointer]:
+    """Decodes each string of items, e.g. the links of a note."""
+    return [decode(bech) for bech in items]
+
+
+def encode_many(pointers: Iterable[Pointer]) -> list[str]:
+    return [pointer.encode() for pointer in pointers]
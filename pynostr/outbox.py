@@ -0,0 +1,187 @@
+"""Outbox model: query authors on the relays they write to (NIP-65)."""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .base_relay import RelayPolicy
+from .contact_list import ContactList
+from .event import Event, EventKind
+from .filters import Filters, FiltersList
+from .relay_health import RelayHealthTracker
+from .relay_list import RelayList
+
+log = logging.getLogger(__name__)
+
+
+def normalize_url(url: str) -> str:
+    return url.strip().rstrip("/")
+
+
+@dataclass
+class OutboxRouter:
+    """Routes author queries to the write relays of each author.
+
+    Write relays are learned from NIP-65 relay lists (kind 10002) and from
+    contact lists (kind 3). The relay hint of a contact is used only when the
+    relay list of this contact is unknown.
+
+    :param max_relays: connection budget, the maximum number of routed relays
+    :param relays_per_author: on how many write relays an author is queried
+    :param fallback_relays: used for authors without known write relays
+    :param health_tracker: used to break ties between equally useful relays
+    """
+
+    max_relays: int = 20
+    relays_per_author: int = 2
+    fallback_relays: list[str] = field(default_factory=list)
+    health_tracker: Optional[RelayHealthTracker] = None
+
+    def __post_init__(self):
+        self.fallback_relays = [normalize_url(url) for url in self.fallback_relays]
+        self.write_relays: dict[str, list[str]] = {}
+        self.relay_hints: dict[str, list[str]] = {}
+        self._created_at: dict[str, int] = {}
+
+    def add_event(self, event: Event):
+        if event.kind == EventKind.RELAY_LIST_METADATA:
+            self.add_relay_list(event.pubkey, RelayList.from_event(event), event)
+        elif event.kind == EventKind.CONTACTS:
+            self.add_contact_list(ContactList.from_event(event))
+
+    def add_relay_list(
+        self, pubkey: str, relay_list: RelayList, event: Optional[Event] = None
+    ):
+        """Sets the write relays of pubkey, older relay list events are ignored."""
+        if event is not None:
+            if self._created_at.get(pubkey, -1) > event.created_at:
+                return
+            self._created_at[pubkey] = event.created_at
+        self.write_relays[pubkey] = [
+            normalize_url(url) for url in relay_list.get_write_url_list()
+        ]
+
+    def add_contact_list(self, contact_list: ContactList):
+        """Uses the relays of the owner and the relay hints of all contacts."""
+        if len(contact_list.relays) > 0 and contact_list.pubkey not in self._created_at:
+            self.write_relays[contact_list.pubkey] = [
+                normalize_url(url) for url in contact_list.relays.get_write_url_list()
+            ]
+        for contact in contact_list.contacts:
+            if not contact.relay:
+                continue
+            hints = self.relay_hints.setdefault(contact.pub_key, [])
+            url = normalize_url(contact.relay)
+            if url not in hints:
+                hints.append(url)
+
+    def get_write_relays(self, pubkey: str) -> list[str]:
+        if self.write_relays.get(pubkey):
+            return self.write_relays[pubkey]
+        return self.relay_hints.get(pubkey, [])
+
+    def _score(self, url: str) -> float:
+        if self.health_tracker is None:
+            return 0
+        return self.health_tracker.get(url).read_score()
+
+    def route(
+        self, authors: list[str], exclude: Optional[set[str]] = None
+    ) -> dict[str, list[str]]:
+        """Greedy set cover of authors by their write relays.
+
+        Relays are picked one by one, always the relay which covers the most
+        authors that still need a relay, until the budget is used up.
+        Uncovered authors are routed to the fallback relays.
+
+        :param exclude: relay urls, which are not used
+        :return: dict of relay url and list of authors
+        """
+        exclude = exclude if exclude is not None else set()
+        need = {}
+        candidates: dict[str, set[str]] = {}
+        for author in dict.fromkeys(authors):
+            urls = [url for url in self.get_write_relays(author) if url not in exclude]
+            need[author] = min(self.relays_per_author, len(urls))
+            for url in urls:
+                candidates.setdefault(url, set()).add(author)
+
+        routes: dict[str, list[str]] = {}
+        while candidates and len(routes) < self.max_relays:
+            url = max(
+                candidates,
+                key=lambda u: (
+                    sum(1 for a in candidates[u] if need[a] > 0),
+                    self._score(u),
+                ),
+            )
+            covered = [a for a in candidates.pop(url) if need[a] > 0]
+            if not covered:
+                break
+            for author in covered:
+                need[author] -= 1
+            routes[url] = covered
+
+        routed = {author for authors in routes.values() for author in authors}
+        uncovered = [author for author in need if author not in routed]
+        if uncovered:
+            for url in self.fallback_relays:
+                if url not in exclude:
+                    routes.setdefault(url, []).extend(uncovered)
+            log.info(f"{len(uncovered)} authors routed to fallback relays")
+        return routes
+
+    def add_subscription(self, relay_manager, id: str, filters: FiltersList):
+        """Subscribes on each relay only to the authors routed to it.
+
+        Missing relays are added to the relay_manager as read relays. Filters
+        without authors are sent to the fallback relays. Relays, which the
+        relay_manager has as write-only relays, are left out of the routes,
+        so their authors are covered by other relays or the fallback relays.
+
+        :return: the routes as returned by :meth:`route`
+        """
+        authors = []
+        for f in filters:
+            if f.authors:
+                authors.extend(f.authors)
+        write_only = {
+            normalize_url(url)
+            for url, relay in relay_manager.relays.items()
+            if not relay.policy.should_read
+        }
+        routes = self.route(authors, exclude=write_only)
+        for url in self.fallback_relays:
+            if url in write_only:
+                log.warning(f"Skipped {url}, it is not configured to read from")
+            else:
+                routes.setdefault(url, [])
+
+        for url, relay_authors in routes.items():
+            shard = self._shard_filters(filters, url, set(relay_authors))
+            if len(shard) == 0:
+                continue
+            if url not in relay_manager.relays:
+                relay_manager.add_relay(url, RelayPolicy(True, False))
+            relay_manager.add_subscription_on_relay(url, id, shard)
+        return routes
+
+    def _shard_filters(
+        self, filters: FiltersList, url: str, authors: set[str]
+    ) -> FiltersList:
+        shard = FiltersList()
+        for f in filters:
+            if not f.authors:
+                if url in self.fallback_relays:
+                    shard.append(f)
+                continue
+            shard_authors = [a for a in f.authors if a in authors]
+            if shard_authors:
+                shard.append(self._copy_filters(f, shard_authors))
+        return shard
+
+    @staticmethod
+    def _copy_filters(filters: Filters, authors: list[str]) -> Filters:
+        ret = filters.copy()
+        ret.authors = authors
+        return ret
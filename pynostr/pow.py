@@ -1,10 +1,35 @@
+import functools
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
 import time
 from dataclasses import dataclass
+from typing import Optional
 
+import coincurve as secp256k1
+from coincurve._libsecp256k1 import ffi, lib
+from coincurve.context import GLOBAL_CONTEXT
+
+from .bech32 import CHARSET
+from .bech32_codec import hrp_state, polymod_step
 from .event import Event
+from .exception import MiningException
 from .key import PrivateKey
 
 BECH32_CHARS = "023456789acdefghjklmnpqrstuvwxyz"
+# digits of the nonces of mined events
+NONCE_WIDTH = 16
+# nonces hashed from the sha256 state of their leading digits
+NONCE_BLOCK = 1000
+_BLOCK_DIGITS = 3
+# keys checked between the checks of the stop conditions of a key search
+KEY_BLOCK = 1000
+# order of the secp256k1 group
+_ORDER = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+# 5-bit groups of the data part of a npub
+_NPUB_GROUPS = 52
 
 
 def zero_bits(b: int) -> int:
@@ -38,18 +63,337 @@ def _guess_event(event: Event) -> Event:
     return num_leading_zero_bits, event
 
 
+def leading_zero_bits(digest: bytes) -> int:
+    """Counts the leading zero bits of a digest."""
+    return len(digest) * 8 - int.from_bytes(digest, "big").bit_length()
+
+
+def nonce_template(event: Event, tag_pos: int) -> tuple[bytes, bytes]:
+    """Returns the serialized event before and after the nonce value.
+
+    The nonce value is the second entry of the tag at tag_pos.
+    """
+
+    def dumps(data) -> str:
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+    tags = event.tags
+    before = dumps([0, event.pubkey, event.created_at, event.kind, tags[:tag_pos]])
+    before = before[:-2] + ("," if tag_pos > 0 else "") + dumps(tags[tag_pos][:1])
+    before = before[:-1] + ',"'
+    after = '"' + (
+        "," + dumps(tags[tag_pos][2:])[1:] if len(tags[tag_pos]) > 2 else "]"
+    )
+    following = tags[tag_pos + 1 :]
+    if following:
+        after += "," + dumps(following)[1:-1]
+    after += "]," + dumps(event.content) + "]"
+    return before.encode(), after.encode()
+
+
+def format_nonce(nonce: int) -> str:
+    return f"{nonce:0{NONCE_WIDTH}d}"
+
+
+def search_nonces(
+    prefix: bytes,
+    suffix: bytes,
+    difficulty: int,
+    first: int = 0,
+    block_offset: int = 0,
+    block_step: int = 1,
+    max_count: int = 0,
+    max_duration: float = 0,
+    stop=None,
+) -> tuple[int, int, int]:
+    """Searches a nonce, whose sha256(prefix + nonce + suffix) has difficulty
+    leading zero bits.
+
+    The nonces have NONCE_WIDTH digits and are hashed in blocks of
+    NONCE_BLOCK, which share the sha256 state of prefix and their leading
+    digits, so only the last digits and the suffix are hashed for each nonce.
+    The search starts at the block of first and continues with every
+    block_step-th block, so processes can split the nonces by block_offset.
+
+    :param stop: multiprocessing Event, which is checked after every block
+        and set on success
+    :return: number of guesses, best number of zero bits, best nonce
+    """
+    target = (
+        (1 << (256 - difficulty)).to_bytes(33, "big")[1:] if difficulty > 0 else None
+    )
+    best_digest = b"\xff" * 33
+    best_nonce = first
+    midstate = hashlib.sha256(prefix)
+    tails = [b"%0*d" % (_BLOCK_DIGITS, i) + suffix for i in range(NONCE_BLOCK)]
+    block = first // NONCE_BLOCK + block_offset
+    low = first % NONCE_BLOCK if block_offset == 0 else 0
+    start = time.perf_counter()
+    count = 0
+    while True:
+        head = midstate.copy()
+        head.update(b"%0*d" % (NONCE_WIDTH - _BLOCK_DIGITS, block))
+        high = (
+            NONCE_BLOCK if max_count <= 0 else min(NONCE_BLOCK, low + max_count - count)
+        )
+        for i in range(low, high):
+            h = head.copy()
+            h.update(tails[i])
+            digest = h.digest()
+            if digest < best_digest:
+                best_digest = digest
+                best_nonce = block * NONCE_BLOCK + i
+                if target is None or digest < target:
+                    if stop is not None:
+                        stop.set()
+                    return count + i - low + 1, leading_zero_bits(digest), best_nonce
+        count += high - low
+        low = 0
+        block += block_step
+        if (
+            count == max_count
+            or (stop is not None and stop.is_set())
+            or (max_duration > 0 and time.perf_counter() - start > max_duration)
+        ):
+            return count, leading_zero_bits(best_digest[:32]), best_nonce
+
+
+def next_nonce(first: int, counts: list[int]) -> int:
+    """Returns the nonce, from which a search can continue.
+
+    All nonces below it were searched by the search_nonces calls, which
+    started at first with block_offset i, block_step len(counts) and made
+    counts[i] guesses.
+    """
+    ret = None
+    for i, count in enumerate(counts):
+        searched = count + (first % NONCE_BLOCK if i == 0 else 0)
+        block = first // NONCE_BLOCK + i + len(counts) * (searched // NONCE_BLOCK)
+        nonce = block * NONCE_BLOCK + searched % NONCE_BLOCK
+        ret = nonce if ret is None else min(ret, nonce)
+    return ret
+
+
+_NPUB_CHECKSUM_START = hrp_state("npub")
+
+
+def npub_checksum(data: int) -> int:
+    """Returns the 30 checksum bits of a npub.
+
+    :param data: x-only public key shifted by the 4 padding bits
+    """
+    chk = _NPUB_CHECKSUM_START
+    for shift in range(5 * (_NPUB_GROUPS - 1), -1, -5):
+        chk = polymod_step(chk, (data >> shift) & 31)
+    for _ in range(6):
+        chk = polymod_step(chk, 0)
+    return chk ^ 1
+
+
+class VanityPattern:
+    """Compares a npub prefix and suffix with raw x-only public keys.
+
+    The data part of a npub are the 5-bit groups of the key padded with four
+    zero bits, so the prefix is compared with the leading bits of the key.
+    The last six chars are the checksum, which is only computed for a suffix.
+
+    :param prefix: chars after npub1
+    :param suffix: last chars
+    """
+
+    def __init__(self, prefix: Optional[str] = None, suffix: Optional[str] = None):
+        prefix = prefix or ""
+        suffix = suffix or ""
+        self.prefix_shift = 5 * (_NPUB_GROUPS - len(prefix))
+        self.prefix_value = self._value(prefix)
+        checksum = suffix[-6:]
+        tail = suffix[: -len(checksum)] if checksum else ""
+        self.checksum_mask = (1 << 5 * len(checksum)) - 1
+        self.checksum_value = self._value(checksum)
+        self.tail_mask = (1 << 5 * len(tail)) - 1
+        self.tail_value = self._value(tail)
+
+    @staticmethod
+    def _value(pattern: str) -> int:
+        value = 0
+        for c in pattern:
+            value = (value << 5) | CHARSET.index(c)
+        return value
+
+    def matches(self, xonly: bytes) -> bool:
+        data = int.from_bytes(xonly, "big") << 4
+        if data >> self.prefix_shift != self.prefix_value:
+            return False
+        if self.checksum_mask == 0:
+            return True
+        if data & self.tail_mask != self.tail_value:
+            return False
+        return npub_checksum(data) & self.checksum_mask == self.checksum_value
+
+
+class KeyWalker:
+    """Walks the x-only public keys of the secret keys k, k + 1, k + 2, ...
+
+    Each step adds the generator point to the public key, which is much
+    cheaper than deriving the public key of a new secret key.
+
+    :param secret: first secret key
+    """
+
+    def __init__(self, secret: bytes) -> None:
+        self.first = int.from_bytes(secret, "big")
+        self.steps = 0
+        self._ctx = GLOBAL_CONTEXT.ctx
+        self._point = self._create(secret)
+        self._generator = self._create((1).to_bytes(32, "big"))
+        self._points = ffi.new("secp256k1_pubkey *[2]", [self._point, self._generator])
+        self._sum = ffi.new("secp256k1_pubkey *")
+        self._output = ffi.new("unsigned char [33]")
+        self._output_length = ffi.new("size_t *")
+        self._buffer = ffi.buffer(self._output, 33)
+
+    def _create(self, secret: bytes):
+        point = ffi.new("secp256k1_pubkey *")
+        if not lib.secp256k1_ec_pubkey_create(self._ctx, point, secret):
+            raise ValueError("The secret key is invalid.")
+        return point
+
+    @property
+    def secret(self) -> bytes:
+        """Secret key of the current public key."""
+        return ((self.first + self.steps) % _ORDER).to_bytes(32, "big")
+
+    def xonly(self) -> bytes:
+        """Returns the current x-only public key."""
+        self._output_length[0] = 33
+        lib.secp256k1_ec_pubkey_serialize(
+            self._ctx,
+            self._output,
+            self._output_length,
+            self._point,
+            lib.SECP256K1_EC_COMPRESSED,
+        )
+        return self._buffer[1:]
+
+    def step(self) -> bytes:
+        """Moves to the next secret key and returns its x-only public key."""
+        if not lib.secp256k1_ec_pubkey_combine(self._ctx, self._sum, self._points, 2):
+            raise ValueError("The walk reached the point at infinity.")
+        ffi.memmove(self._point, self._sum, 64)
+        self.steps += 1
+        return self.xonly()
+
+
+def _random_secret() -> bytes:
+    return secp256k1.PrivateKey().secret
+
+
+def search_vanity_keys(
+    pattern: VanityPattern,
+    max_count: int = 0,
+    max_duration: float = 0,
+    stop=None,
+    secret: Optional[bytes] = None,
+) -> tuple[int, Optional[bytes]]:
+    """Searches a secret key, whose npub matches pattern.
+
+    The keys are walked with a KeyWalker from secret or a random secret key.
+
+    :param stop: multiprocessing Event, which is checked every KEY_BLOCK keys
+        and set on success
+    :return: number of guesses, matching secret key or None
+    """
+    walker = KeyWalker(secret or _random_secret())
+    xonly = walker.xonly()
+    start = time.perf_counter()
+    count = 0
+    while True:
+        n = KEY_BLOCK if max_count <= 0 else min(KEY_BLOCK, max_count - count)
+        for i in range(n):
+            if pattern.matches(xonly):
+                if stop is not None:
+                    stop.set()
+                return count + i + 1, walker.secret
+            xonly = walker.step()
+        count += n
+        if (
+            count == max_count
+            or (stop is not None and stop.is_set())
+            or (max_duration > 0 and time.perf_counter() - start > max_duration)
+        ):
+            return count, None
+
+
+def search_keys(
+    difficulty: int,
+    best_bits: int = 0,
+    max_count: int = 0,
+    max_duration: float = 0,
+    stop=None,
+    secret: Optional[bytes] = None,
+    on_progress=None,
+) -> tuple[int, int, Optional[bytes]]:
+    """Searches a secret key, whose x-only public key has difficulty leading
+    zero bits.
+
+    The keys are walked with a KeyWalker from secret or a random secret key.
+
+    :param best_bits: zero bits of the best key so far
+    :param stop: multiprocessing Event, which is checked every KEY_BLOCK keys
+        and set on success
+    :param on_progress: called with the zero bits and the secret key of each
+        key, which is better than the best one so far
+    :return: number of guesses, best number of zero bits, best secret key or
+        None, when no key was better than best_bits
+    """
+    walker = KeyWalker(secret or _random_secret())
+    xonly = walker.xonly()
+    best_secret = None
+    # keys below target have more than best_bits leading zero bits
+    target = (1 << (255 - best_bits)).to_bytes(32, "big")
+    start = time.perf_counter()
+    count = 0
+    while True:
+        n = KEY_BLOCK if max_count <= 0 else min(KEY_BLOCK, max_count - count)
+        for i in range(n):
+            if xonly < target:
+                best_bits, best_secret = leading_zero_bits(xonly), walker.secret
+                if on_progress is not None:
+                    on_progress(best_bits, best_secret)
+                if best_bits >= difficulty:
+                    if stop is not None:
+                        stop.set()
+                    return count + i + 1, best_bits, best_secret
+                target = (1 << (255 - best_bits)).to_bytes(32, "big")
+            xonly = walker.step()
+        count += n
+        if (
+            count == max_count
+            or (stop is not None and stop.is_set())
+            or (max_duration > 0 and time.perf_counter() - start > max_duration)
+        ):
+            return count, best_bits, best_secret
+
+
+def _put_progress(results, *progress):
+    results.put((None, progress))
+
+
+def _search_worker(results, index, search, with_progress, *args):
+    """Puts the result of search(*args) and optionally its progress into
+    results."""
+    kwargs = {}
+    if with_progress:
+        kwargs["on_progress"] = functools.partial(_put_progress, results)
+    results.put((index, search(*args, **kwargs)))
+
+
 def _guess_key():
     sk = PrivateKey()
     num_leading_zero_bits = count_leading_zero_bits(sk.public_key.hex())
     return num_leading_zero_bits, sk
 
 
-def _guess_vanity_key():
-    sk = PrivateKey()
-    vk = sk.public_key.bech32()
-    return vk, sk
-
-
 @dataclass
 class Pow:
     def __post_init__(self):
@@ -90,6 +434,72 @@ class Pow:
         hashrate = 1 / t
         return hashrate
 
+    def get_workers(self) -> int:
+        """Number of mining processes, workers 0 uses one per core."""
+        workers = getattr(self, "workers", 1)
+        if workers == 0:
+            return os.cpu_count() or 1
+        return workers
+
+    def _run_workers(self, search, args: list[tuple], on_progress=None) -> list:
+        """Runs search(*args[i], stop) in a process for each args and returns
+        their results in the same order. The search, which succeeds first,
+        sets stop.
+
+        :param on_progress: called with the progress of the searches, which
+            is passed back from the processes
+        :raises MiningException: when a process exits without a result, the
+            other processes are terminated
+        """
+        context = multiprocessing.get_context()
+        stop = context.Event()
+        results = context.Queue()
+        with_progress = on_progress is not None
+        processes = [
+            context.Process(
+                target=_search_worker,
+                args=(results, i, search, with_progress, *worker_args, stop),
+                daemon=True,
+            )
+            for i, worker_args in enumerate(args)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            return self._collect_results(processes, results, on_progress)
+        except BaseException:
+            stop.set()
+            for process in processes:
+                process.terminate()
+            raise
+        finally:
+            for process in processes:
+                process.join()
+
+    @staticmethod
+    def _collect_results(processes, results, on_progress) -> list:
+        ret = [None] * len(processes)
+        pending = set(range(len(processes)))
+        exited = False
+        while pending:
+            try:
+                # an exited process has flushed its result into the queue
+                index, value = results.get(timeout=1 if exited else 0.1)
+            except queue.Empty:
+                if exited:
+                    raise MiningException(
+                        f"Workers {sorted(pending)} exited without a result"
+                    ) from None
+                exited = any(processes[i].exitcode is not None for i in pending)
+                continue
+            exited = False
+            if index is None:
+                on_progress(*value)
+            else:
+                ret[index] = value
+                pending.discard(index)
+        return ret
+
     def get_expected_guesses(self):
         p = 1 / self.n_options
         return 1 / (p**self.n_pattern)
@@ -107,7 +517,14 @@ class Pow:
 
 @dataclass
 class PowEvent(Pow):
+    """NIP-13 event miner.
+
+    :param difficulty: number of leading zero bits of the event id
+    :param workers: number of mining processes, 0 for one per core
+    """
+
     difficulty: int = 8
+    workers: int = 1
 
     def __post_init__(self):
         self.mode = "event"
@@ -120,6 +537,7 @@ class PowEvent(Pow):
         self.count = 1
         self.duration = 0
         self.results = []
+        self.next_nonce = None
 
     def set_difficulty(self, difficulty):
         self.difficulty = difficulty
@@ -154,11 +572,18 @@ class PowEvent(Pow):
             and int(event.tags[tag_pos][2]) >= self.difficulty
         )
 
-    def mine(self, event: Event, max_count: int = 0, max_duration: int = 0) -> Event:
+    def mine(
+        self,
+        event: Event,
+        max_count: int = 0,
+        max_duration: int = 0,
+        nonce: Optional[int] = None,
+    ) -> Event:
+        """Sets the nonce tag of event to the best nonce found.
+
+        :param nonce: first nonce to search, default is the one of the tag
+        """
         start = time.perf_counter()
-        count = 0
-        duration = 0
-
         tag_pos = self.get_nonce_tag_pos(event)
 
         if tag_pos < 0:
@@ -170,26 +595,81 @@ class PowEvent(Pow):
             event.tags[tag_pos][2] = str(self.difficulty)
             event.tags[tag_pos][1] = "1"
 
-        num_leading_zero_bits, event_pow = self.operation(event)
-        num_leading_zero_bits_pow = num_leading_zero_bits
-        while num_leading_zero_bits < self.difficulty and (
-            not self._stop_mining(count, max_count, duration, max_duration)
+        prefix, suffix = nonce_template(event, tag_pos)
+        first_nonce = int(event.tags[tag_pos][1]) if nonce is None else nonce
+        if self.get_workers() > 1:
+            counts, num_leading_zero_bits, nonce = self._mine_parallel(
+                prefix, suffix, first_nonce, max_count, max_duration
+            )
+        else:
+            count, num_leading_zero_bits, nonce = search_nonces(
+                prefix,
+                suffix,
+                self.difficulty,
+                first_nonce,
+                max_count=max_count,
+                max_duration=max_duration,
+            )
+            counts = [count]
+        self.next_nonce = next_nonce(first_nonce, counts)
+        self.count += sum(counts)
+        self.duration += time.perf_counter() - start
+
+        event.tags[tag_pos][1] = format_nonce(nonce)
+        event.compute_id()
+        if len(self.results) == 0 or self.results[-1][1].id != event.id:
+            self.results.append((num_leading_zero_bits, event))
+        return event
+
+    def _mine_parallel(
+        self,
+        prefix: bytes,
+        suffix: bytes,
+        first_nonce: int,
+        max_count: int,
+        max_duration: int,
+    ) -> tuple[list[int], int, int]:
+        """Splits the nonce blocks between processes, the first solution stops
+        all of them."""
+        workers = self.get_workers()
+        max_count_per_worker = -(-max_count // workers) if max_count > 0 else 0
+        args = [
+            (
+                prefix,
+                suffix,
+                self.difficulty,
+                first_nonce,
+                i,
+                workers,
+                max_count_per_worker,
+                max_duration,
+            )
+            for i in range(workers)
+        ]
+        counts, best_bits, best_nonce = [], -1, first_nonce
+        for count, num_leading_zero_bits, nonce in self._run_workers(
+            search_nonces, args
         ):
-            event.tags[tag_pos][1] = str(int(event.tags[tag_pos][1]) + 1)
-            num_leading_zero_bits, event = self.operation(event)
-            if num_leading_zero_bits > num_leading_zero_bits_pow:
-                event_pow = event
-                num_leading_zero_bits_pow = num_leading_zero_bits
-            count += 1
-            self.count += 1
-            duration = time.perf_counter() - start
-        end = time.perf_counter()
-        self.duration += end - start
-        if len(self.results) == 0:
-            self.results.append((num_leading_zero_bits_pow, event_pow))
-        elif self.results[-1][1].id != event_pow.id:
-            self.results.append((num_leading_zero_bits_pow, event_pow))
-        return event_pow
+            counts.append(count)
+            if num_leading_zero_bits > best_bits:
+                best_bits, best_nonce = num_leading_zero_bits, nonce
+        return counts, best_bits, best_nonce
+
+    def estimate_hashrate(self, n_guesses: int = 1e4, event: Event = None) -> float:
+        """Measures the guesses per second of search_nonces on one core."""
+        if event is None:
+            event = Event()
+        event = Event(
+            event.content,
+            event.pubkey,
+            event.created_at,
+            event.kind,
+            [["nonce", "0", str(self.difficulty)], *event.tags],
+        )
+        prefix, suffix = nonce_template(event, 0)
+        start = time.perf_counter()
+        search_nonces(prefix, suffix, 256, max_count=int(n_guesses))
+        return int(n_guesses) / (time.perf_counter() - start)
 
     def get_expected_time(self, hashrate=None) -> float:
         if hashrate is None:
@@ -197,7 +677,7 @@ class PowEvent(Pow):
                 hashrate = self.get_hashrate()
             else:
                 event = Event()
-                hashrate = self.estimate_hashrate(event=event)
+                hashrate = self.estimate_hashrate(event=event) * self.get_workers()
         self.n_pattern = self.difficulty
         self.n_options = 2
         return self.get_expected_guesses() / hashrate
@@ -205,7 +685,14 @@ class PowEvent(Pow):
 
 @dataclass
 class PowKey(Pow):
+    """Miner of public keys with leading zero bits.
+
+    :param difficulty: number of leading zero bits of the public key
+    :param workers: number of mining processes, 0 for one per core
+    """
+
     difficulty: int = 8
+    workers: int = 1
 
     def __post_init__(self):
         self.mode = "key"
@@ -228,31 +715,46 @@ class PowKey(Pow):
         self.set_difficulty(self.num_leading_zero_bits + 1)
 
     def mine(self, max_count: int = 0, max_duration: int = 0) -> PrivateKey:
+        """Returns the best key, every better key is appended to results."""
         start = time.perf_counter()
-        count = 0
-        duration = 0
-        num_leading_zero_bits = self.num_leading_zero_bits
-        while num_leading_zero_bits < self.difficulty and (
-            not self._stop_mining(count, max_count, duration, max_duration)
-        ):
-            num_leading_zero_bits, sk = self.operation()
-            if num_leading_zero_bits > self.num_leading_zero_bits:
-                self.sk = sk
-                self.num_leading_zero_bits = num_leading_zero_bits
-            count += 1
-            duration = time.perf_counter() - start
-        self.count += count
-        end = time.perf_counter()
-        self.duration += end - start
-        self.results.append((self.num_leading_zero_bits, self.sk))
+        if self.num_leading_zero_bits < self.difficulty:
+            workers = self.get_workers()
+            args = (self.difficulty, self.num_leading_zero_bits)
+            if workers > 1:
+                max_count_per_worker = -(-max_count // workers) if max_count > 0 else 0
+                found = self._run_workers(
+                    search_keys,
+                    [(*args, max_count_per_worker, max_duration)] * workers,
+                    self._on_progress,
+                )
+            else:
+                found = [
+                    search_keys(
+                        *args, max_count, max_duration, on_progress=self._on_progress
+                    )
+                ]
+            self.count += sum(count for count, _, _ in found)
+        self.duration += time.perf_counter() - start
         return self.sk
 
+    def _on_progress(self, num_leading_zero_bits: int, secret: bytes):
+        if num_leading_zero_bits > self.num_leading_zero_bits:
+            self.num_leading_zero_bits = num_leading_zero_bits
+            self.sk = PrivateKey(secret)
+            self.results.append((num_leading_zero_bits, self.sk))
+
+    def estimate_hashrate(self, n_guesses: int = 1e4) -> float:
+        """Measures the guesses per second of search_keys on one core."""
+        start = time.perf_counter()
+        search_keys(256, 255, max_count=int(n_guesses))
+        return int(n_guesses) / (time.perf_counter() - start)
+
     def get_expected_time(self, hashrate=None) -> float:
         if hashrate is None:
             if self.count > 10000 and self.duration > 0:
                 hashrate = self.get_hashrate()
             else:
-                hashrate = self.estimate_hashrate()
+                hashrate = self.estimate_hashrate() * self.get_workers()
         self.n_pattern = self.difficulty
         self.n_options = 2
         return self.get_expected_guesses() / hashrate
@@ -260,12 +762,20 @@ class PowKey(Pow):
 
 @dataclass
 class PowVanityKey(Pow):
+    """Vanity npub miner.
+
+    :param prefix: chars after npub1
+    :param suffix: last chars of the npub
+    :param workers: number of mining processes, 0 for one per core
+    """
+
     prefix: str = None
     suffix: str = None
+    workers: int = 1
 
     def __post_init__(self):
         self.n_pattern = 0
-        self.operation = _guess_vanity_key
+        self.operation = None
         self.n_options = len(BECH32_CHARS)
         self.mode = "vanity_key"
         if self.prefix is None and self.suffix is None:
@@ -280,14 +790,19 @@ class PowVanityKey(Pow):
                         f"{missing_chars} not in valid "
                         f"list of bech32 chars: ({BECH32_CHARS})"
                     )
+        self.pattern = VanityPattern(self.prefix, self.suffix)
         self.reset()
 
     def reset(self):
         self.count = 0
         self.duration = 0
         self.results = []
+        self.vk = None
+        self.sk = None
 
     def _check_vanity(self):
+        if self.vk is None:
+            return False
         if (
             self.prefix is not None
             and not self.vk[5 : 5 + len(self.prefix)] == self.prefix
@@ -297,28 +812,40 @@ class PowVanityKey(Pow):
             return False
         return True
 
-    def mine(self, max_count: int = 0, max_duration: int = 0) -> PrivateKey:
+    def mine(self, max_count: int = 0, max_duration: int = 0) -> Optional[PrivateKey]:
+        """Returns the found key or None, when max_count or max_duration was
+        reached before."""
         start = time.perf_counter()
-        count = 0
-        duration = 0
-        self.vk, self.sk = self.operation()
-        while not self._check_vanity() and (
-            not self._stop_mining(count, max_count, duration, max_duration)
-        ):
-            self.vk, self.sk = self.operation()
-            count += 1
-            duration = time.perf_counter() - start
-        self.count += count
-        end = time.perf_counter()
-        self.duration += end - start
-        if self._check_vanity():
-            self.results.append((self.vk, self.sk))
+        workers = self.get_workers()
+        if workers > 1:
+            max_count_per_worker = -(-max_count // workers) if max_count > 0 else 0
+            args = [(self.pattern, max_count_per_worker, max_duration)] * workers
+            found = self._run_workers(search_vanity_keys, args)
+        else:
+            found = [search_vanity_keys(self.pattern, max_count, max_duration)]
+        self.count += sum(count for count, _ in found)
+        self.duration += time.perf_counter() - start
+        self.vk, self.sk = None, None
+        for _, secret in found:
+            if secret is not None:
+                self.sk = PrivateKey(secret)
+                self.vk = self.sk.public_key.bech32()
+                self.results.append((self.vk, self.sk))
         return self.sk
 
+    def estimate_hashrate(self, n_guesses: int = 1e4) -> float:
+        """Measures the guesses per second of search_vanity_keys on one core."""
+        n_guesses = int(n_guesses)
+        start = time.perf_counter()
+        count = 0
+        while count < n_guesses:
+            count += search_vanity_keys(self.pattern, n_guesses - count)[0]
+        return count / (time.perf_counter() - start)
+
     def get_expected_time(self, hashrate=None):
         if hashrate is None:
             if self.count > 10000 and self.duration > 0:
                 hashrate = self.get_hashrate()
             else:
-                hashrate = self.estimate_hashrate()
+                hashrate = self.estimate_hashrate() * self.get_workers()
         return self.get_expected_guesses() / hashrate
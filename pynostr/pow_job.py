@@ -0,0 +1,270 @@
+"""Background mining jobs for the Pow miners.
+
+A :class:`MiningJob` runs a miner in chunks in an executor, so an asyncio
+event loop keeps running, while e.g. a bot mines the PoW of a note::
+
+    job = MiningJob(PowEvent(difficulty=20), event)
+    async for progress in job.progress():
+        print(progress.hashrate, progress.best_bits)
+    event = job.result
+
+A cancelled job can be resumed from its :meth:`MiningJob.checkpoint`.
+"""
+
+import asyncio
+import copy
+import json
+import logging
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable, Optional, Union
+
+from .event import Event
+from .key import PrivateKey
+from .pow import (
+    Pow,
+    PowEvent,
+    PowKey,
+    PowVanityKey,
+    leading_zero_bits,
+)
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class MiningProgress:
+    """Progress of a mining job after a chunk.
+
+    :param count: guesses so far
+    :param duration: seconds spent mining
+    :param hashrate: guesses per second
+    :param best_bits: leading zero bits of the best event id or public key
+    :param best: nonce of the best event, best key or found vanity key
+    :param expected_time: expected seconds of a whole search at hashrate
+    :param done: True, when a solution was found
+    """
+
+    count: int
+    duration: float
+    hashrate: float
+    best_bits: int
+    best: Union[int, PrivateKey, None]
+    expected_time: float
+    done: bool = False
+
+
+class MiningJob:
+    """Runs a miner in chunks of interval seconds in an executor.
+
+    Between the chunks the job emits a :class:`MiningProgress` and can be
+    cancelled. The nonce of an event job continues after the last searched
+    nonce, when the job is resumed.
+
+    A miner with workers > 1 starts its processes for each chunk. With the
+    spawn start method (Windows, macOS) this imports pynostr again in every
+    process, so the interval should be several seconds there.
+
+    :param miner: PowEvent, PowKey or PowVanityKey
+    :param event: event, which is mined by a PowEvent
+    :param interval: seconds of each chunk
+    :param executor: executor of the chunks, None uses the default executor
+        of the event loop
+    :param on_progress: called with each MiningProgress
+    """
+
+    def __init__(
+        self,
+        miner: Pow,
+        event: Optional[Event] = None,
+        interval: float = 1.0,
+        executor=None,
+        on_progress: Optional[Callable[[MiningProgress], None]] = None,
+    ) -> None:
+        if isinstance(miner, PowEvent) and event is None:
+            raise ValueError("A PowEvent job needs an event")
+        self.miner = miner
+        self.event = event
+        self.interval = interval
+        self.executor = executor
+        self.on_progress = on_progress
+        self.nonce: Optional[int] = None
+        self.best_bits = 0
+        self.best = None
+        self.done = False
+        self.result = None
+        self.task: Optional[asyncio.Task] = None
+        self.lock = Lock()
+        self._chunk: Optional[asyncio.Future] = None
+        self._queues: list[asyncio.Queue] = []
+
+    def start(self) -> asyncio.Task:
+        """Runs the job as task of the running event loop."""
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+        return self.task
+
+    async def run(self):
+        """Mines until a solution is found and returns the event or key."""
+        loop = asyncio.get_running_loop()
+        try:
+            while not self.done:
+                self._chunk = loop.run_in_executor(self.executor, self._mine_chunk)
+                # a cancel does not interrupt the chunk, see cancel()
+                progress = await asyncio.shield(self._chunk)
+                if self.on_progress is not None:
+                    self.on_progress(progress)
+                for queue in self._queues:
+                    queue.put_nowait(progress)
+        finally:
+            for queue in self._queues:
+                queue.put_nowait(None)
+        return self.result
+
+    async def cancel(self):
+        """Cancels the job and waits for the running chunk, so that a
+        following checkpoint contains its progress."""
+        if self.task is not None:
+            self.task.cancel()
+        if self._chunk is not None:
+            await asyncio.wait([self._chunk])
+
+    async def progress(self):
+        """Yields the progress after each chunk until the job ends, starts
+        the job when needed."""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._queues.append(queue)
+        try:
+            if self.start().done():
+                return
+            while True:
+                progress = await queue.get()
+                if progress is None:
+                    return
+                yield progress
+        finally:
+            self._queues.remove(queue)
+
+    def _mine_chunk(self) -> MiningProgress:
+        if isinstance(self.miner, PowEvent):
+            self._mine_event()
+        elif isinstance(self.miner, PowKey):
+            self._mine_key()
+        else:
+            self._mine_vanity_key()
+        return self.get_progress()
+
+    def _mine_event(self):
+        # the chunk mines a copy, so a checkpoint during the chunk reads the
+        # nonce tag and id of the best chunk so far
+        event = copy.deepcopy(self.event)
+        self.miner.mine(event, max_duration=self.interval, nonce=self.nonce)
+        bits = leading_zero_bits(bytes.fromhex(event.id))
+        tag_pos = self.miner.get_nonce_tag_pos(event)
+        with self.lock:
+            self.nonce = self.miner.next_nonce
+            if self.best is None or bits > self.best_bits:
+                self.best_bits = bits
+                self.best = int(event.tags[tag_pos][1])
+                # the event keeps the best nonce of all chunks
+                self.event.tags, self.event.id = event.tags, event.id
+            if bits >= self.miner.difficulty:
+                self.done, self.result = True, self.event
+
+    def _mine_key(self):
+        sk = self.miner.mine(max_duration=self.interval)
+        with self.lock:
+            self.best_bits, self.best = self.miner.num_leading_zero_bits, sk
+            if self.best_bits >= self.miner.difficulty:
+                self.done, self.result = True, sk
+
+    def _mine_vanity_key(self):
+        sk = self.miner.mine(max_duration=self.interval)
+        if sk is not None:
+            with self.lock:
+                self.done, self.result, self.best = True, sk, sk
+
+    def get_progress(self) -> MiningProgress:
+        hashrate = self.miner.get_hashrate()
+        expected_time = self.miner.get_expected_time(hashrate) if hashrate > 0 else 0
+        with self.lock:
+            return MiningProgress(
+                self.miner.count,
+                self.miner.duration,
+                hashrate,
+                self.best_bits,
+                self.best,
+                expected_time,
+                self.done,
+            )
+
+    def checkpoint(self) -> dict:
+        """Returns the state, from which :meth:`resume` continues.
+
+        The checkpoint of a PowKey job contains the best secret key.
+        """
+        miner = self.miner
+        with self.lock:
+            ret = {
+                "mode": miner.mode,
+                "workers": miner.workers,
+                "count": miner.count,
+                "duration": miner.duration,
+                "best_bits": self.best_bits,
+                "done": self.done,
+            }
+            if isinstance(miner, PowEvent):
+                ret["difficulty"] = miner.difficulty
+                ret["event"] = self.event.to_dict()
+                ret["nonce"] = self.nonce
+                ret["best"] = self.best
+            elif isinstance(miner, PowKey):
+                ret["difficulty"] = miner.difficulty
+                ret["best"] = self.best.hex() if self.best is not None else None
+            else:
+                ret["prefix"] = miner.prefix
+                ret["suffix"] = miner.suffix
+                ret["best"] = self.best.hex() if self.best is not None else None
+        return ret
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.checkpoint(), f)
+
+    @classmethod
+    def resume(cls, checkpoint: dict, **kwargs) -> "MiningJob":
+        """Returns a job, which continues from checkpoint.
+
+        :param kwargs: further arguments of MiningJob
+        """
+        mode = checkpoint["mode"]
+        event = None
+        best = checkpoint["best"]
+        if mode == "event":
+            miner = PowEvent(checkpoint["difficulty"], workers=checkpoint["workers"])
+            event = Event.from_dict(checkpoint["event"])
+        elif mode == "key":
+            miner = PowKey(checkpoint["difficulty"], workers=checkpoint["workers"])
+        else:
+            miner = PowVanityKey(
+                checkpoint["prefix"],
+                checkpoint["suffix"],
+                workers=checkpoint["workers"],
+            )
+        if mode != "event" and best is not None:
+            best = PrivateKey.from_hex(best)
+        if mode == "key" and best is not None:
+            miner.sk, miner.num_leading_zero_bits = best, checkpoint["best_bits"]
+        miner.count = checkpoint["count"]
+        miner.duration = checkpoint["duration"]
+        job = cls(miner, event, **kwargs)
+        job.nonce = checkpoint.get("nonce")
+        job.best_bits, job.best = checkpoint["best_bits"], best
+        if checkpoint["done"]:
+            job.done, job.result = True, event if mode == "event" else best
+        return job
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "MiningJob":
+        with open(path) as f:
+            return cls.resume(json.load(f), **kwargs)
@@ -0,0 +1,200 @@
+"""NIP-20 command results for published events."""
+
+import logging
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from threading import RLock
+from typing import Callable, Optional
+
+from .message_pool import OKMessage
+
+log = logging.getLogger(__name__)
+
+# NIP-20 prefixes of OK messages, after which a retry can succeed
+TRANSIENT_PREFIXES = ("rate-limited:", "error:")
+
+
+def is_ok(ok) -> bool:
+    """OK messages can contain a boolean or its string representation."""
+    return ok is True or ok == "true"
+
+
+@dataclass
+class RelayPublishStatus:
+    """State of an event publication on a single relay.
+
+    :param url: relay url
+    :param accepted: None while pending, afterwards the OK result
+    :param message: message of the last OK
+    :param attempts: number of times the event was sent
+    :param latency: seconds between the last send and its OK
+    :param timed_out: True, when no OK was received
+    """
+
+    url: str
+    accepted: Optional[bool] = None
+    message: str = ""
+    attempts: int = 0
+    latency: Optional[float] = None
+    timed_out: bool = False
+    sent_at: Optional[float] = None
+    future: Future = field(default_factory=Future, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.accepted is not None
+
+
+class PublishHandle:
+    """Tracks the OK messages of a published event.
+
+    The handle is resolved when `min_acks` relays have accepted the event or
+    when this is not possible anymore. Each relay has its own future in
+    `statuses`, the handle itself can be awaited with `future` or `wait`.
+
+    :param event_id: id of the published event
+    :param message: EVENT message, which is sent again on a retry
+    :param publish: function(url, message) that queues the message on a relay
+    :param urls: urls of all relays the event is sent to
+    :param min_acks: number of accepting relays needed for success
+    :param timeout: seconds to wait for an OK from each relay (0 disables it)
+    :param max_retries: how often a relay is retried after a transient failure
+    :param schedule: function(delay, callback) used for timeouts
+    """
+
+    def __init__(
+        self,
+        event_id: str,
+        message: str,
+        publish: Callable[[str, str], None],
+        urls: list[str],
+        min_acks: int = 1,
+        timeout: float = 10,
+        max_retries: int = 2,
+        schedule: Optional[Callable[[float, Callable], None]] = None,
+    ) -> None:
+        self.event_id = event_id
+        self.message = message
+        self.min_acks = min_acks
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.statuses: dict[str, RelayPublishStatus] = {
+            url: RelayPublishStatus(url) for url in urls
+        }
+        self.future: Future = Future()
+        self._publish = publish
+        self._schedule = schedule
+        self.lock: RLock = RLock()
+        for url in urls:
+            self._send(url)
+        self._check_done()
+
+    def __repr__(self):
+        return (
+            f"PublishHandle({self.event_id[:10]}... accepted {len(self.accepted)}/"
+            f"{self.min_acks} of {len(self.statuses)})"
+        )
+
+    @property
+    def accepted(self) -> list[str]:
+        return [s.url for s in self.statuses.values() if s.accepted]
+
+    @property
+    def rejected(self) -> list[str]:
+        return [s.url for s in self.statuses.values() if s.accepted is False]
+
+    @property
+    def pending(self) -> list[str]:
+        return [s.url for s in self.statuses.values() if not s.done]
+
+    @property
+    def latencies(self) -> dict[str, float]:
+        return {
+            s.url: s.latency for s in self.statuses.values() if s.latency is not None
+        }
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def succeeded(self) -> bool:
+        return len(self.accepted) >= self.min_acks
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the handle is resolved, returns whether it succeeded.
+
+        The OK timeouts are scheduled with `schedule`, the RelayManager
+        expires the pending relays when run_sync returns.
+        """
+        return self.future.result(timeout)
+
+    def expire(self) -> None:
+        """Marks the relays without OK as timed out and resolves the handle."""
+        with self.lock:
+            for status in self.statuses.values():
+                if not status.done:
+                    status.timed_out = True
+                    self._finish(status, False)
+        self._check_done()
+
+    def on_ok(self, ok_message: OKMessage) -> None:
+        """Processes an OK message, which can belong to another event."""
+        if ok_message.event_id != self.event_id:
+            return
+        with self.lock:
+            status = self.statuses.get(ok_message.url)
+            if status is None or status.done:
+                return
+            if status.sent_at is not None:
+                status.latency = time.monotonic() - status.sent_at
+            status.message = ok_message.message
+            if is_ok(ok_message.ok):
+                self._finish(status, True)
+            elif (
+                str(ok_message.message).startswith(TRANSIENT_PREFIXES)
+                and status.attempts <= self.max_retries
+            ):
+                log.info(f"Retry {self.event_id} on {status.url}: {status.message}")
+                self._send(status.url)
+            else:
+                self._finish(status, False)
+        self._check_done()
+
+    def _send(self, url: str) -> None:
+        status = self.statuses[url]
+        status.attempts += 1
+        status.sent_at = time.monotonic()
+        self._publish(url, self.message)
+        if self.timeout > 0 and self._schedule is not None:
+            attempt = status.attempts
+            self._schedule(self.timeout, lambda: self._on_timeout(url, attempt))
+
+    def _on_timeout(self, url: str, attempt: int) -> None:
+        with self.lock:
+            status = self.statuses[url]
+            if status.done or status.attempts != attempt:
+                return
+            if status.attempts <= self.max_retries:
+                log.info(f"Retry {self.event_id} on {url}: timeout")
+                self._send(url)
+            else:
+                status.timed_out = True
+                self._finish(status, False)
+        self._check_done()
+
+    def _finish(self, status: RelayPublishStatus, accepted: bool) -> None:
+        status.accepted = accepted
+        status.future.set_result(status)
+
+    def _check_done(self) -> None:
+        with self.lock:
+            if self.future.done():
+                return
+            n_accepted = len(self.accepted)
+            if n_accepted >= self.min_acks:
+                result = True
+            elif n_accepted + len(self.pending) < self.min_acks:
+                result = False
+            else:
+                return
+            self.future.set_result(result)
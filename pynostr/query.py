@@ -0,0 +1,148 @@
+"""Fan-out queries, which finish as soon as their result is known."""
+
+import logging
+from concurrent.futures import Future
+from threading import RLock
+from typing import Callable, Optional
+
+from .event import Event
+from .message_pool import EndOfStoredEventsMessage, EventMessage
+
+log = logging.getLogger(__name__)
+
+
+class Query:
+    """Collects the events of one subscription sent to several relays.
+
+    The query is resolved as soon as the first of these conditions is met:
+
+    * `limit` unique events were received, e.g. 1 for a lookup by id
+    * `eose_quorum` relays sent EOSE, e.g. for the newest replaceable event
+    * `stop` returned True for a received event
+    * all relays sent EOSE or failed
+    * `timeout` seconds passed
+
+    Afterwards `close` is called for every relay, so outstanding
+    subscriptions are closed right away.
+
+    :param subscription_id: id of the subscription on all relays
+    :param urls: urls of the queried relays
+    :param close: function(url) that closes the subscription on a relay
+    :param limit: number of unique events, after which the query is done
+    :param eose_quorum: number of EOSEs, after which the query is done
+    :param stop: function(event) returning True, when the query is done
+    :param timeout: seconds until the query is resolved anyway (0 disables it)
+    :param schedule: function(delay, callback) used for the timeout
+    """
+
+    def __init__(
+        self,
+        subscription_id: str,
+        urls: list[str],
+        close: Callable[[str], None],
+        limit: Optional[int] = None,
+        eose_quorum: Optional[int] = None,
+        stop: Optional[Callable[[Event], bool]] = None,
+        timeout: float = 10,
+        schedule: Optional[Callable[[float, Callable], None]] = None,
+    ) -> None:
+        self.subscription_id = subscription_id
+        self.urls = urls
+        self.limit = limit
+        self.eose_quorum = eose_quorum
+        self.stop = stop
+        self.timeout = timeout
+        self.eose_urls: list[str] = []
+        self.failed_urls: list[str] = []
+        self.sources: dict[str, list[str]] = {}
+        self.timed_out = False
+        self.future: Future = Future()
+        self.lock: RLock = RLock()
+        self._events: dict[str, Event] = {}
+        self._close = close
+        if timeout > 0 and schedule is not None:
+            schedule(timeout, self._on_timeout)
+        with self.lock:
+            self._check_done()
+
+    def __repr__(self):
+        return (
+            f"Query({self.subscription_id}: {len(self._events)} events, "
+            f"eose {len(self.eose_urls)}/{len(self.urls)})"
+        )
+
+    @property
+    def events(self) -> list[Event]:
+        """Unique events, newest first."""
+        with self.lock:
+            events = list(self._events.values())
+        return sorted(events, key=lambda e: e.created_at, reverse=True)
+
+    def newest(self) -> Optional[Event]:
+        events = self.events
+        return events[0] if events else None
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def wait(self, timeout: Optional[float] = None) -> list[Event]:
+        """Blocks until the query is resolved, returns the events."""
+        return self.future.result(timeout)
+
+    def on_event(self, event_message: EventMessage) -> None:
+        if event_message.subscription_id != self.subscription_id:
+            return
+        event = event_message.event
+        with self.lock:
+            if self.done():
+                return
+            self.sources.setdefault(event.id, []).append(event_message.url)
+            if event.id in self._events:
+                return
+            self._events[event.id] = event
+            if self.stop is not None and self.stop(event):
+                self._finish()
+                return
+            self._check_done()
+
+    def on_eose(self, eose_message: EndOfStoredEventsMessage) -> None:
+        if eose_message.subscription_id != self.subscription_id:
+            return
+        with self.lock:
+            if eose_message.url in self.eose_urls:
+                return
+            self.eose_urls.append(eose_message.url)
+            self._check_done()
+
+    def on_relay_failed(self, url: str) -> None:
+        """A relay, which will not send EOSE anymore."""
+        with self.lock:
+            if url in self.eose_urls or url in self.failed_urls:
+                return
+            self.failed_urls.append(url)
+            self._check_done()
+
+    def _on_timeout(self) -> None:
+        with self.lock:
+            if self.done():
+                return
+            log.info(f"Query {self.subscription_id} timed out")
+            self.timed_out = True
+            self._finish()
+
+    def _check_done(self) -> None:
+        if self.done():
+            return
+        n_events = len(self._events)
+        n_eose = len(self.eose_urls)
+        if (
+            (self.limit is not None and n_events >= self.limit)
+            or (self.eose_quorum is not None and n_eose >= self.eose_quorum)
+            or n_eose + len(self.failed_urls) >= len(self.urls)
+        ):
+            self._finish()
+
+    def _finish(self) -> None:
+        for url in self.urls:
+            self._close(url)
+        self.future.set_result(self.events)
@@ -48,6 +48,7 @@ class Relay(BaseRelay):
         timeout_error = False
         self.error_counter = 0
         self.timeout_error_counter = 0
+        start = self.io_loop.time()
         try:
             if self.timeout > 0:
                 self.ws = yield gen.with_timeout(
@@ -65,12 +66,10 @@ class Relay(BaseRelay):
                     ping_timeout=120,
                 )
             self.connected = True
+            self._on_connected(self.io_loop.time() - start)
             # self.io_loop.call_later(1, self.send_message, self.request)
             while True:
-                if self.outgoing_messages.qsize() > 0:
-                    message = self.outgoing_messages.get()
-                    self.num_sent_events += 1
-                    self.ws.write_message(message)
+                self._flush_outgoing_messages()
                 message = yield self.ws.read_message()
                 if message is None:
                     break
@@ -88,12 +87,14 @@ class Relay(BaseRelay):
             log.warning(f"Error connecting to {self.url}: {e}")
             error = True
         if error:
+            self.health.record_error()
             self.error_counter += 1
             if self.error_counter <= self.error_threshold:
                 self.io_loop.call_later(1, self.connect)
             else:
                 return
         elif timeout_error:
+            self.health.record_timeout()
             self.timeout_error_counter += 1
             if self.timeout_error_counter <= self.timeout_error_threshold:
                 self.io_loop.call_later(1, self.connect)
@@ -102,6 +103,18 @@ class Relay(BaseRelay):
 
         log.info(f"WebSocket connection to {self.url} closed")
 
+    def publish(self, message: str):
+        super().publish(message)
+        if self.connected:
+            # the read loop waits for incoming messages, so send right away
+            self.io_loop.add_callback(self._flush_outgoing_messages)
+
+    def _flush_outgoing_messages(self):
+        while self.is_connected and self.outgoing_messages.qsize() > 0:
+            message = self.outgoing_messages.get()
+            self.ws.write_message(message)
+            self._record_sent(message)
+
     @gen.coroutine
     def _eose_received(self):
         self.eose_counter += 1
@@ -0,0 +1,146 @@
+import math
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+# weight of a new measurement in the moving averages
+EWMA_ALPHA = 0.3
+
+
+def _ewma(average: Optional[float], value: float) -> float:
+    if average is None:
+        return value
+    return EWMA_ALPHA * value + (1 - EWMA_ALPHA) * average
+
+
+@dataclass
+class RelayHealth:
+    """Connection statistics of a relay.
+
+    Latencies are exponentially weighted moving averages in seconds.
+
+    :param url: relay url
+    """
+
+    url: str
+    connects: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    connect_latency: Optional[float] = None
+    eose_latency: Optional[float] = None
+    eose_count: int = 0
+    events: int = 0
+    duplicates: int = 0
+    ok_accepted: int = 0
+    ok_rejected: int = 0
+
+    def record_connect(self, latency: float):
+        self.connects += 1
+        self.connect_latency = _ewma(self.connect_latency, latency)
+
+    def record_error(self):
+        self.errors += 1
+
+    def record_timeout(self):
+        self.timeouts += 1
+
+    def record_eose(self, latency: float):
+        self.eose_count += 1
+        self.eose_latency = _ewma(self.eose_latency, latency)
+
+    def record_event(self, duplicate: bool = False):
+        self.events += 1
+        if duplicate:
+            self.duplicates += 1
+
+    def record_ok(self, accepted: bool):
+        if accepted:
+            self.ok_accepted += 1
+        else:
+            self.ok_rejected += 1
+
+    @property
+    def unique_events(self) -> int:
+        return self.events - self.duplicates
+
+    @property
+    def duplicate_ratio(self) -> float:
+        if self.events == 0:
+            return 0
+        return self.duplicates / self.events
+
+    @property
+    def ok_rejection_rate(self) -> float:
+        total = self.ok_accepted + self.ok_rejected
+        if total == 0:
+            return 0
+        return self.ok_rejected / total
+
+    @property
+    def reliability(self) -> float:
+        """Share of successful connects, relays without data get 0.5."""
+        return (self.connects + 1) / (self.connects + self.errors + self.timeouts + 2)
+
+    def read_score(self) -> float:
+        """Higher is better, fast relays returning many unique events win."""
+        latency = (self.connect_latency or 0) + (self.eose_latency or 0)
+        return self.reliability * (1 + math.log1p(self.unique_events)) / (1 + latency)
+
+    def write_score(self) -> float:
+        """Higher is better, fast relays accepting events win."""
+        acceptance = (self.ok_accepted + 1) / (self.ok_accepted + self.ok_rejected + 2)
+        return self.reliability * acceptance / (1 + (self.connect_latency or 0))
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, msg: dict) -> "RelayHealth":
+        return cls(**msg)
+
+
+@dataclass
+class RelayHealthTracker:
+    """Keeps the RelayHealth of all relays, also of removed ones."""
+
+    data: dict[str, RelayHealth] = field(default_factory=dict)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, url):
+        return self.get(url)
+
+    def __iter__(self):
+        return self.data.values().__iter__()
+
+    def __contains__(self, url):
+        return url in self.data
+
+    def get(self, url: str) -> RelayHealth:
+        if url not in self.data:
+            self.data[url] = RelayHealth(url)
+        return self.data[url]
+
+    def rank(self, urls: list[str], write: bool = False) -> list[str]:
+        """Sorts urls from the best to the worst relay.
+
+        Relays, which have never connected, come after all connected relays,
+        no matter how slow those are.
+        """
+
+        def key(url: str) -> tuple[bool, float]:
+            health = self.get(url)
+            score = health.write_score() if write else health.read_score()
+            return health.connects > 0, score
+
+        return sorted(urls, key=key, reverse=True)
+
+    def best(self, urls: list[str], n: int, write: bool = False) -> list[str]:
+        return self.rank(urls, write=write)[:n]
+
+    def to_dict(self) -> dict:
+        return {url: health.to_dict() for url, health in self.data.items()}
+
+    @classmethod
+    def from_dict(cls, msg: dict) -> "RelayHealthTracker":
+        return cls({url: RelayHealth.from_dict(health) for url, health in msg.items()})
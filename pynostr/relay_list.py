@@ -5,6 +5,7 @@ from itertools import repeat
 from typing import Optional
 
 from .base_relay import BaseRelay, RelayPolicy
+from .event import Event, EventKind
 from .utils import get_relay_information
 
 log = logging.getLogger(__name__)
@@ -47,6 +48,36 @@ class RelayList:
             ret[relay.url] = relay.policy.to_dict()
         return ret
 
+    @classmethod
+    def from_event(cls, event: Event) -> Optional["RelayList"]:
+        """Loads a NIP-65 relay list metadata event (kind 10002), returns
+        None for other kinds.
+
+        https://github.com/nostr-protocol/nips/blob/master/65.md
+        """
+        if event.kind != EventKind.RELAY_LIST_METADATA:
+            return None
+        rl = RelayList()
+        for tag in event.get_tag_list("r"):
+            marker = tag[1] if len(tag) > 1 else None
+            policy = RelayPolicy(
+                should_read=marker != "write", should_write=marker != "read"
+            )
+            rl.append(tag[0], policy)
+        return rl
+
+    def to_event(self) -> Event:
+        """Creates a NIP-65 relay list metadata event (kind 10002)."""
+        e = Event(kind=EventKind.RELAY_LIST_METADATA, content="")
+        for relay in self.data:
+            if relay.policy.should_read and relay.policy.should_write:
+                e.add_tag("r", relay.url)
+            elif relay.policy.should_write:
+                e.add_tag("r", [relay.url, "write"])
+            elif relay.policy.should_read:
+                e.add_tag("r", [relay.url, "read"])
+        return e
+
     def append_relay(self, relay: BaseRelay):
         if self.check_url(relay.url) and relay.url not in self.get_url_list():
             self.data.append(relay)
@@ -71,6 +102,12 @@ class RelayList:
             url_list.append(d.url)
         return url_list
 
+    def get_write_url_list(self):
+        return [d.url for d in self.data if d.policy.should_write]
+
+    def get_read_url_list(self):
+        return [d.url for d in self.data if d.policy.should_read]
+
     def check_url(self, url: str):
         if not url or not bool(url.strip()):
             return False
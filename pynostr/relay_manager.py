@@ -1,6 +1,7 @@
 import json
 import logging
 import time
+import uuid
 from dataclasses import dataclass
 from typing import Optional
 
@@ -11,9 +12,14 @@ from .base_relay import RelayPolicy
 from .event import Event
 from .exception import RelayException
 from .filters import FiltersList
-from .message_pool import MessagePool
+from .message_pool import EventMessage, MessagePool, OKMessage
+from .metrics import MetricsRegistry
+from .publish import PublishHandle
+from .query import Query
 from .relay import Relay
+from .relay_health import RelayHealthTracker
 from .relay_list import RelayList
+from .tracing import Tracer
 
 log = logging.getLogger(__name__)
 
@@ -24,16 +30,32 @@ class RelayManager:
 
     :param error_threshold: When set, error_threshold on each relay is overwritten
     :param timeout:  When set, timeout on each relay is overwritten
+    :param health_tracker: Keeps the statistics of each relay url, can be
+        shared between RelayManagers
+    :param metrics: When set, the relays and the message pool record into it
+    :param tracer: When set, the relays trace each received message
     """
 
     error_threshold: Optional[int] = None
     timeout_error_threshold: Optional[int] = None
     timeout: Optional[float] = None
+    health_tracker: Optional[RelayHealthTracker] = None
+    metrics: Optional[MetricsRegistry] = None
+    tracer: Optional[Tracer] = None
 
     def __post_init__(self):
+        if self.health_tracker is None:
+            self.health_tracker = RelayHealthTracker()
         self.relays: dict[str, Relay] = {}
         self.message_pool: MessagePool = MessagePool()
         self.io_loop: IOLoop = IOLoop.current()
+        self.publish_handles: dict[str, list[PublishHandle]] = {}
+        self.queries: dict[str, Query] = {}
+        self.message_pool.add_ok_listener(self._on_ok)
+        self.message_pool.add_message_listener(self._on_query_message)
+        if self.metrics is not None:
+            self.message_pool.metrics = self.metrics
+            self.metrics.add_collector(self._collect_metrics)
 
     def add_relay(
         self,
@@ -66,12 +88,20 @@ class RelayManager:
             relay.timeout = self.timeout
         if get_metadata:
             relay.update_metadata()
+        relay.health = self.health_tracker.get(url)
+        relay.metrics = self.metrics
+        relay.tracer = self.tracer
         self.relays[url] = relay
 
     def remove_relay(self, url: str):
         if url in self.relays:
             relay = self.relays.pop(url)
             relay.close()
+            if self.metrics is not None:
+                self.metrics.outgoing_queue_depth.remove(url)
+
+    def _collect_metrics(self):
+        self.metrics.record_queue_depths(self.message_pool, list(self.relays.values()))
 
     def add_relay_list(
         self,
@@ -104,7 +134,7 @@ class RelayManager:
             relay = self.relays[url]
             if not relay.policy.should_read:
                 raise RelayException(
-                    f"Could not send request: {url} " f"is not configured to read from"
+                    f"Could not send request: {url} is not configured to read from"
                 )
             relay.add_subscription(id, filters)
 
@@ -145,8 +175,114 @@ class RelayManager:
             if relay.policy.should_read:
                 relay.add_subscription(id, filters)
 
+    def get_best_relays(self, n: int, write: bool = False) -> list[str]:
+        """Returns the urls of the n relays with the best health score.
+
+        :param n: number of relays
+        :param write: when True, write relays are ranked, otherwise read relays
+        """
+        urls = [
+            url
+            for url, relay in self.relays.items()
+            if (relay.policy.should_write if write else relay.policy.should_read)
+        ]
+        return self.health_tracker.best(urls, n, write=write)
+
+    def add_subscription_on_best_relays(self, id: str, filters: FiltersList, n: int):
+        """Subscribes only on the n read relays with the best health score."""
+        for url in self.get_best_relays(n):
+            self.relays[url].add_subscription(id, filters)
+
     def run_sync(self):
         self.io_loop.run_sync(lambda: self.prepare_relays())
+        self._expire_publish_handles()
+
+    def query(
+        self,
+        filters: FiltersList,
+        limit: Optional[int] = None,
+        eose_quorum: Optional[int] = None,
+        stop=None,
+        timeout: float = 10,
+    ) -> Query:
+        """Subscribes on all read relays, the Query finishes on the first result.
+
+        See :class:`pynostr.query.Query` for limit, eose_quorum and stop. When
+        the query is done, the subscription is closed on all relays.
+        """
+        subscription_id = uuid.uuid4().hex
+        urls = [url for url, relay in self.relays.items() if relay.policy.should_read]
+        query = Query(
+            subscription_id,
+            urls,
+            lambda url: self._close_query_subscription(url, subscription_id),
+            limit=limit,
+            eose_quorum=eose_quorum,
+            stop=stop,
+            timeout=timeout,
+            schedule=self._call_later,
+        )
+        if not query.done():
+            self.queries[subscription_id] = query
+            query.future.add_done_callback(
+                lambda _: self.queries.pop(subscription_id, None)
+            )
+            for url in urls:
+                self.relays[url].add_subscription(subscription_id, filters)
+        return query
+
+    def run_query(
+        self,
+        filters: FiltersList,
+        limit: Optional[int] = None,
+        eose_quorum: Optional[int] = None,
+        stop=None,
+        timeout: float = 10,
+    ) -> list[Event]:
+        """Connects the relays and returns the events as soon as the query is done.
+
+        Relays with close_on_eose are closed afterwards, as with run_sync.
+        """
+        query = self.query(
+            filters, limit=limit, eose_quorum=eose_quorum, stop=stop, timeout=timeout
+        )
+        self.io_loop.run_sync(lambda: self._run_query(query))
+        self._expire_publish_handles()
+        return query.events
+
+    @gen.coroutine
+    def _run_query(self, query: Query):
+        for url in query.urls:
+            relay = self.relays[url]
+            if not relay.is_connected:
+                connection = relay.connect()
+                connection.add_done_callback(
+                    lambda _, url=url: query.on_relay_failed(url)
+                )
+        yield query.future
+        # lets the relays send the CLOSE messages
+        yield gen.moment
+        for url in query.urls:
+            relay = self.relays[url]
+            if relay.close_on_eose:
+                yield relay.close()
+
+    def _close_query_subscription(self, url: str, id: str):
+        relay = self.relays.get(url)
+        if relay is None or id not in relay.subscriptions:
+            return
+        relay.close_subscription(id)
+        if relay.is_connected:
+            relay.publish(json.dumps(["CLOSE", id]))
+
+    def _on_query_message(self, message):
+        query = self.queries.get(message.subscription_id)
+        if query is None:
+            return
+        if isinstance(message, EventMessage):
+            query.on_event(message)
+        else:
+            query.on_eose(message)
 
     def close_subscription_on_relay(self, url: str, id: str):
         if url in self.relays:
@@ -194,8 +330,25 @@ class RelayManager:
             if relay.policy.should_write:
                 relay.publish(message)
 
-    def publish_event(self, event: Event):
-        """Verifies that the Event is publishable before submitting it to relays."""
+    def publish_event(
+        self,
+        event: Event,
+        min_acks: int = 1,
+        timeout: float = 10,
+        max_retries: int = 2,
+        max_relays: Optional[int] = None,
+    ) -> PublishHandle:
+        """Verifies that the Event is publishable before submitting it to relays.
+
+        :param event: signed event
+        :param min_acks: number of relays that must accept the event
+        :param timeout: seconds to wait for the OK of each relay, 0 disables it
+        :param max_retries: retries per relay after a timeout or a transient
+            (rate-limited/error) rejection
+        :param max_relays: when set, only the write relays with the best health
+            score are used
+        :return: PublishHandle, which resolves when min_acks relays sent OK
+        """
         if event.sig is None:
             raise RelayException(f"Could not publish {event.id}: must be signed")
 
@@ -204,7 +357,60 @@ class RelayManager:
                 f"Could not publish {event.id}: failed to verify signature {event.sig}"
             )
 
-        self.publish_message(event.to_message())
+        if max_relays is None:
+            urls = [
+                url for url, relay in self.relays.items() if relay.policy.should_write
+            ]
+        else:
+            urls = self.get_best_relays(max_relays, write=True)
+        handle = PublishHandle(
+            event.id,
+            event.to_message(),
+            self._publish_on_relay,
+            urls,
+            min_acks=min_acks,
+            timeout=timeout,
+            max_retries=max_retries,
+            schedule=self._call_later,
+        )
+        if handle.pending:
+            # an event can be published again, while its first handle is pending,
+            # the handle stays registered until every relay has answered or
+            # timed out, also after min_acks is reached
+            self.publish_handles.setdefault(event.id, []).append(handle)
+            for status in handle.statuses.values():
+                status.future.add_done_callback(lambda _: self._remove_handle(handle))
+        return handle
+
+    def _remove_handle(self, handle: PublishHandle):
+        if handle.pending:
+            return
+        handles = self.publish_handles.get(handle.event_id, [])
+        if handle in handles:
+            handles.remove(handle)
+        if not handles:
+            self.publish_handles.pop(handle.event_id, None)
+
+    def _expire_publish_handles(self):
+        """Times out the relays without OK, when the IOLoop has stopped.
+
+        The OK timeouts are scheduled on the IOLoop, so they would not fire
+        until the loop runs again.
+        """
+        for handles in list(self.publish_handles.values()):
+            for handle in list(handles):
+                handle.expire()
+
+    def _publish_on_relay(self, url: str, message: str):
+        if url in self.relays:
+            self.relays[url].publish(message)
+
+    def _call_later(self, delay: float, callback):
+        self.io_loop.add_callback(self.io_loop.call_later, delay, callback)
+
+    def _on_ok(self, ok_message: OKMessage):
+        for handle in list(self.publish_handles.get(ok_message.event_id, [])):
+            handle.on_ok(ok_message)
 
     def get_relay_information(self, update_metadata=False):
         ret = {}
@@ -0,0 +1,419 @@
+"""websocket-client relays multiplexed on a single selector thread."""
+
+import logging
+import selectors
+import socket
+import ssl
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Thread
+from typing import Optional, Union
+
+from websocket import (
+    ABNF,
+    WebSocket,
+    WebSocketConnectionClosedException,
+    WebSocketTimeoutException,
+)
+
+from .base_relay import BaseRelay, RelayPolicy, RelayProxyConnectionConfig
+from .message_pool import MessagePool
+
+log = logging.getLogger(__name__)
+
+
+class RelaySelector:
+    """Runs the sockets of many relays on one thread.
+
+    Websocket handshakes are done by a small connect pool, received messages
+    are parsed and verified by a small worker pool. Messages of one relay are
+    always processed in the order in which they were received.
+
+    :param max_workers: number of threads used for message verification
+    :param max_connect_workers: number of threads used for handshakes
+    :param reconnect_interval: seconds between reconnects of closed relays
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_connect_workers: int = 8,
+        reconnect_interval: float = 5,
+    ) -> None:
+        self.reconnect_interval = reconnect_interval
+        self.running: bool = False
+        self.lock: Lock = Lock()
+        self._relays: set[SelectorRelay] = set()
+        self._registered: dict[SelectorRelay, socket.socket] = {}
+        self._removed: set[SelectorRelay] = set()
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_reader, self._wakeup_writer = socket.socketpair()
+        self._wakeup_reader.setblocking(False)
+        self._wakeup_writer.setblocking(False)
+        self._selector.register(self._wakeup_reader, selectors.EVENT_READ, None)
+        self._workers = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="relay-selector-worker"
+        )
+        self._connect_workers = ThreadPoolExecutor(
+            max_workers=max_connect_workers,
+            thread_name_prefix="relay-selector-connect",
+        )
+        self._thread: Optional[Thread] = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._thread = Thread(target=self._run, name="relay-selector", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self.lock:
+            self.running = False
+        self.wakeup()
+        if self._thread is not None:
+            self._thread.join()
+        self._workers.shutdown(wait=True)
+        self._connect_workers.shutdown(wait=True)
+        # handshakes, which finished after the loop has exited
+        with self.lock:
+            relays = self._relays | self._removed
+            self._removed.clear()
+        for relay in relays:
+            relay._close_socket()
+
+    def add_relay(self, relay: "SelectorRelay"):
+        with self.lock:
+            self._relays.add(relay)
+            self._removed.discard(relay)
+
+    def remove_relay(self, relay: "SelectorRelay"):
+        with self.lock:
+            self._relays.discard(relay)
+            self._removed.add(relay)
+        self.wakeup()
+
+    def _accept(self, relay: "SelectorRelay", ws: WebSocket) -> bool:
+        """Hands a finished handshake to relay, False when the relay was removed
+        or the selector was stopped in the meantime."""
+        with self.lock:
+            relay.connecting = False
+            if not self.running or relay not in self._relays:
+                return False
+            relay.ws = ws
+            relay.connected = True
+            return True
+
+    def wakeup(self):
+        try:
+            self._wakeup_writer.send(b"\0")
+        except OSError:
+            # the buffer is full, so the selector wakes up anyway
+            pass
+
+    def connect(self, relay: "SelectorRelay"):
+        with self.lock:
+            if relay.connecting or relay.ws is not None:
+                return
+            relay.connecting = True
+        future = self._connect_workers.submit(relay._handshake)
+        future.add_done_callback(lambda _: self.wakeup())
+
+    def _run(self):
+        last_reconnect = time.monotonic()
+        while self.running:
+            self._update_registrations()
+            for relay in list(self._registered):
+                relay._flush_outgoing()
+            for key, _ in self._selector.select(timeout=self.reconnect_interval):
+                if key.data is None:
+                    self._drain_wakeup()
+                    continue
+                self._read(key.data)
+            if time.monotonic() - last_reconnect >= self.reconnect_interval:
+                last_reconnect = time.monotonic()
+                self._reconnect()
+        for relay in list(self._registered):
+            self._unregister(relay)
+            relay._close_socket()
+
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup_reader.recv(4096):
+                pass
+        except OSError:
+            pass
+
+    def _read(self, relay: "SelectorRelay"):
+        messages, alive = relay._read_messages()
+        if messages and relay._queue_incoming(messages):
+            self._workers.submit(relay._process_incoming)
+        if not alive:
+            self._unregister(relay)
+            relay._close_socket()
+
+    def _update_registrations(self):
+        with self.lock:
+            relays = set(self._relays)
+            removed, self._removed = self._removed, set()
+        for relay in list(self._registered):
+            if relay not in relays or not relay.connected:
+                self._unregister(relay)
+                relay._close_socket()
+        for relay in removed:
+            if relay not in relays:
+                relay._close_socket()
+        for relay in relays:
+            if relay in self._registered:
+                continue
+            if relay.ws is not None and relay.connected:
+                self._selector.register(relay.ws.sock, selectors.EVENT_READ, relay)
+                self._registered[relay] = relay.ws.sock
+            elif relay.ws is not None and not relay.connecting:
+                # closed before it was registered
+                relay._close_socket()
+
+    def _unregister(self, relay: "SelectorRelay"):
+        sock = self._registered.pop(relay, None)
+        if sock is not None:
+            try:
+                self._selector.unregister(sock)
+            except (KeyError, ValueError):
+                pass
+
+    def _reconnect(self):
+        with self.lock:
+            relays = list(self._relays)
+        for relay in relays:
+            if not relay.connected and relay.ws is None:
+                self.connect(relay)
+
+
+class SelectorRelay(BaseRelay):
+    """websocket-client relay, which is driven by a :class:`RelaySelector`."""
+
+    def __init__(
+        self,
+        url: str,
+        message_pool: MessagePool,
+        relay_selector: RelaySelector,
+        policy: Optional[RelayPolicy] = None,
+        ssl_options: Optional[dict] = None,
+        proxy_config: Union[None, RelayProxyConnectionConfig] = None,
+        timeout: float = 2.0,
+    ) -> None:
+        if policy is None:
+            policy = RelayPolicy()
+        super().__init__(url, policy, message_pool, timeout)
+        self.ssl_options = ssl_options
+        self.proxy_config = proxy_config
+        self.relay_selector = relay_selector
+        self.ws: Optional[WebSocket] = None
+        self.connecting: bool = False
+        self._unsent_message: Optional[str] = None
+        self._buffer: bytearray = bytearray()
+        self._fragments: list[bytes] = []
+        self._fragment_opcode: int = ABNF.OPCODE_TEXT
+        self._incoming: deque = deque()
+        self._incoming_lock: Lock = Lock()
+        self._incoming_scheduled: bool = False
+        self.relay_selector.add_relay(self)
+
+    @property
+    def is_connected(self) -> bool:
+        return self.connected
+
+    def connect(self, is_reconnect=False):
+        self.relay_selector.connect(self)
+
+    def close(self):
+        self.connected = False
+        self.relay_selector.wakeup()
+
+    def publish(self, message: str):
+        super().publish(message)
+        if self.connected:
+            self.relay_selector.wakeup()
+
+    def _handshake(self):
+        ws = WebSocket(sslopt=self.ssl_options)
+        start = time.monotonic()
+        try:
+            ws.connect(
+                self.url,
+                timeout=self.timeout if self.timeout > 0 else None,
+                http_proxy_host=self.proxy_config.host
+                if self.proxy_config is not None
+                else None,
+                http_proxy_port=self.proxy_config.port
+                if self.proxy_config is not None
+                else None,
+                proxy_type=self.proxy_config.type
+                if self.proxy_config is not None
+                else None,
+            )
+        except (socket.timeout, WebSocketTimeoutException):
+            log.info(f"Timeout connecting to {self.url}")
+            self.connecting = False
+            self.health.record_timeout()
+            return
+        except Exception as e:
+            log.info(f"Error connecting to {self.url}: {e}")
+            self.connecting = False
+            self._on_error(e)
+            return
+        if not self.relay_selector._accept(self, ws):
+            log.info(f"Closing {self.url}, it was removed while connecting")
+            ws.close(timeout=0)
+            return
+        self._on_connected(time.monotonic() - start)
+
+    def _flush_outgoing(self):
+        while self.connected:
+            if self._unsent_message is not None:
+                message = self._unsent_message
+            elif self.outgoing_messages.qsize() > 0:
+                message = self.outgoing_messages.get()
+            else:
+                return
+            try:
+                self.ws.send(message)
+            except Exception as e:
+                self._unsent_message = message
+                self._on_error(e)
+                self.connected = False
+                return
+            self._unsent_message = None
+            self._record_sent(message)
+
+    def _read_messages(self) -> tuple[list[str], bool]:
+        """Reads the available bytes without blocking, returns the messages of
+        all complete frames and whether the connection is still open.
+
+        A partial frame stays in the buffer until its remaining bytes arrive,
+        so a slow relay does not stall the selector thread.
+        """
+        try:
+            eof = self._recv_available()
+            messages, alive = self._handle_frames()
+        except Exception as e:
+            log.info(f"Error reading from {self.url}: {e}")
+            self.connected = False
+            self._on_error(e)
+            return [], False
+        if eof and alive:
+            log.info(f"Connection to {self.url} was lost")
+            self.connected = False
+            self._on_error(WebSocketConnectionClosedException(self.url))
+            return messages, False
+        return messages, alive
+
+    def _handle_frames(self) -> tuple[list[str], bool]:
+        frames, used = parse_frames(self._buffer)
+        del self._buffer[:used]
+        messages = []
+        for fin, opcode, payload in frames:
+            if opcode == ABNF.OPCODE_CLOSE:
+                self.connected = False
+                return messages, False
+            if opcode == ABNF.OPCODE_PING:
+                self.ws.pong(payload)
+            elif opcode in (ABNF.OPCODE_TEXT, ABNF.OPCODE_BINARY, ABNF.OPCODE_CONT):
+                if opcode != ABNF.OPCODE_CONT:
+                    self._fragment_opcode = opcode
+                self._fragments.append(payload)
+                if fin:
+                    data = b"".join(self._fragments)
+                    self._fragments.clear()
+                    if self._fragment_opcode == ABNF.OPCODE_TEXT:
+                        messages.append(data.decode("utf-8"))
+        return messages, True
+
+    def _recv_available(self) -> bool:
+        """Appends all readable bytes to the buffer, returns True on EOF."""
+        sock = self.ws.sock
+        timeout = sock.gettimeout()
+        sock.settimeout(0)
+        try:
+            while True:
+                data = sock.recv(65536)
+                if not data:
+                    return True
+                self._buffer += data
+        except (BlockingIOError, ssl.SSLWantReadError):
+            return False
+        finally:
+            sock.settimeout(timeout)
+
+    def _queue_incoming(self, messages: list[str]) -> bool:
+        """Returns True, when a worker has to be scheduled for this relay."""
+        with self._incoming_lock:
+            self._incoming.extend(messages)
+            if self._incoming_scheduled:
+                return False
+            self._incoming_scheduled = True
+            return True
+
+    def _process_incoming(self):
+        while True:
+            with self._incoming_lock:
+                if not self._incoming:
+                    self._incoming_scheduled = False
+                    return
+                message = self._incoming.popleft()
+            try:
+                self._on_message(message)
+            except Exception as e:
+                log.warning(f"Could not process message from {self.url}: {e}")
+
+    def _close_socket(self):
+        self.connected = False
+        ws, self.ws = self.ws, None
+        self._buffer.clear()
+        self._fragments.clear()
+        if ws is not None:
+            try:
+                ws.close(timeout=0)
+            except Exception:
+                ws.shutdown()
+        self.error_counter = 0
+
+    def _on_error(self, error):
+        self.health.record_error()
+        self.error_counter += 1
+
+
+def parse_frames(buffer: Union[bytes, bytearray]) -> tuple[list, int]:
+    """Parses the complete websocket frames at the start of buffer.
+
+    :return: list of (fin, opcode, payload) and the number of used bytes
+    """
+    frames = []
+    pos = 0
+    size = len(buffer)
+    while size - pos >= 2:
+        fin = buffer[pos] & 0x80 != 0
+        opcode = buffer[pos] & 0x0F
+        masked = buffer[pos + 1] & 0x80 != 0
+        length = buffer[pos + 1] & 0x7F
+        start = pos + 2
+        if length == 126:
+            start += 2
+        elif length == 127:
+            start += 8
+        if masked:
+            start += 4
+        if start > size:
+            break
+        if length >= 126:
+            length = int.from_bytes(buffer[pos + 2 : start - 4 * masked], "big")
+        end = start + length
+        if end > size:
+            break
+        payload = bytes(buffer[start:end])
+        if masked:
+            payload = ABNF.mask(bytes(buffer[start - 4 : start]), payload)
+        frames.append((fin, opcode, payload))
+        pos = end
+    return frames, pos
@@ -0,0 +1,62 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from .base_relay import RelayPolicy, RelayProxyConnectionConfig
+from .selector_relay import RelaySelector, SelectorRelay
+from .websocket_relay_manager import WebSocketRelayManager
+
+
+@dataclass
+class SelectorRelayManager(WebSocketRelayManager):
+    """WebSocketRelayManager, which runs all relay sockets on one thread.
+
+    Instead of two threads per relay, all connections are multiplexed by a
+    :class:`RelaySelector`, so the number of threads does not grow with the
+    number of relays.
+
+    :param max_workers: number of threads used for message verification
+    :param max_connect_workers: number of threads used for handshakes
+    :param timeout: connect and send timeout of each relay
+    """
+
+    max_workers: int = 4
+    max_connect_workers: int = 8
+    timeout: float = 2.0
+
+    def _start_connection_monitor(self):
+        self.relay_selector = RelaySelector(
+            max_workers=self.max_workers,
+            max_connect_workers=self.max_connect_workers,
+            reconnect_interval=self.connection_monitor_interval_secs,
+        )
+        self.relay_selector.start()
+
+    def _create_relay(
+        self,
+        url: str,
+        policy: RelayPolicy,
+        ssl_options: Optional[dict] = None,
+        proxy_config: Optional[RelayProxyConnectionConfig] = None,
+    ):
+        return SelectorRelay(
+            url,
+            self.message_pool,
+            self.relay_selector,
+            policy,
+            ssl_options,
+            proxy_config,
+            timeout=self.timeout,
+        )
+
+    def remove_relay(self, url: str):
+        with self.lock:
+            if url in self.relays:
+                relay = self.relays.pop(url)
+                self.relay_selector.remove_relay(relay)
+        self._remove_metrics(url)
+
+    def stop(self):
+        """Closes all connections and stops the selector thread."""
+        with self.lock:
+            self.relays = {}
+        self.relay_selector.stop()
@@ -0,0 +1,174 @@
+"""Resumable long-running subscriptions."""
+
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from .event import Event
+from .filters import FiltersList
+from .message_pool import EndOfStoredEventsMessage, EventMessage
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class HighWaterMark:
+    """Newest received created_at of a subscription on a relay.
+
+    :param created_at: newest created_at
+    :param ids: ids of the received events with this created_at
+    """
+
+    created_at: int = 0
+    ids: list[str] = field(default_factory=list)
+
+    def add(self, event: Event):
+        self.merge(HighWaterMark(event.created_at, [event.id]))
+
+    def merge(self, other: "HighWaterMark"):
+        if other.created_at > self.created_at:
+            self.created_at = other.created_at
+            self.ids = list(other.ids)
+        elif other.created_at == self.created_at:
+            self.ids.extend(i for i in other.ids if i not in self.ids)
+
+    def contains(self, event: Event) -> bool:
+        """True, when the event is one of the ids at the created_at of the mark.
+
+        Relays send live events in arrival order, so an older event can still
+        be new, the mark is only used for since on a resubscription.
+        """
+        return event.created_at == self.created_at and event.id in self.ids
+
+
+class SubscriptionCheckpoint:
+    """Persists a high-water mark per subscription id and relay url.
+
+    On a restart, each relay is subscribed with `since` set to its mark, so
+    only the events of the last second are received twice and
+    :meth:`is_new` filters them out. The stored events of a relay arrive
+    newest first, therefore the mark is only advanced after the EOSE of the
+    subscription, a restart before the EOSE repeats the request.
+
+    :param path: json file, None keeps the marks in memory
+    :param save_interval: minimal seconds between two automatic saves
+    """
+
+    def __init__(self, path: Optional[str] = None, save_interval: float = 5) -> None:
+        self.path = path
+        self.save_interval = save_interval
+        self.marks: dict[str, dict[str, HighWaterMark]] = {}
+        self._pending: dict[tuple[str, str], HighWaterMark] = {}
+        self._live: set[tuple[str, str]] = set()
+        self._last_save = 0.0
+        self._dirty = False
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def get(self, subscription_id: str, url: str) -> Optional[HighWaterMark]:
+        return self.marks.get(subscription_id, {}).get(url)
+
+    def resume_filters(
+        self, subscription_id: str, url: str, filters: FiltersList
+    ) -> FiltersList:
+        """Returns filters with since set to the mark of the relay."""
+        mark = self.get(subscription_id, url)
+        if mark is None:
+            return filters
+        ret = FiltersList()
+        for f in filters:
+            f = f.copy()
+            if f.since is None or f.since < mark.created_at:
+                f.since = mark.created_at
+            ret.append(f)
+        return ret
+
+    def add_subscription(self, relay_manager, subscription_id: str, filters):
+        """Subscribes on all read relays, resuming from their marks.
+
+        The checkpoint listens to the message pool of relay_manager, so the
+        marks follow the received events.
+        """
+        relay_manager.message_pool.remove_message_listener(self.on_message)
+        relay_manager.message_pool.add_message_listener(self.on_message)
+        for url, relay in relay_manager.relays.items():
+            if relay.policy.should_read:
+                relay_manager.add_subscription_on_relay(
+                    url,
+                    subscription_id,
+                    self.resume_filters(subscription_id, url, filters),
+                )
+
+    def is_new(self, subscription_id: str, url: str, event: Event) -> bool:
+        """False for an event at the mark, which was already received.
+
+        With since set to the mark, these are the only events a relay sends
+        again, live events with an older created_at are new.
+        """
+        mark = self.get(subscription_id, url)
+        return mark is None or not mark.contains(event)
+
+    def on_message(self, message):
+        if isinstance(message, EventMessage):
+            self.record_event(message.subscription_id, message.url, message.event)
+        elif isinstance(message, EndOfStoredEventsMessage):
+            self.record_eose(message.subscription_id, message.url)
+
+    def record_event(self, subscription_id: str, url: str, event: Event):
+        key = (subscription_id, url)
+        if key in self._live:
+            self._mark(subscription_id, url).add(event)
+            self._changed()
+        else:
+            self._pending.setdefault(key, HighWaterMark()).add(event)
+
+    def record_eose(self, subscription_id: str, url: str):
+        key = (subscription_id, url)
+        self._live.add(key)
+        pending = self._pending.pop(key, None)
+        if pending is not None:
+            self._mark(subscription_id, url).merge(pending)
+            self._changed()
+
+    def _mark(self, subscription_id: str, url: str) -> HighWaterMark:
+        return self.marks.setdefault(subscription_id, {}).setdefault(
+            url, HighWaterMark()
+        )
+
+    def _changed(self):
+        self._dirty = True
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def to_dict(self) -> dict:
+        return {
+            subscription_id: {url: asdict(mark) for url, mark in marks.items()}
+            for subscription_id, marks in self.marks.items()
+        }
+
+    @classmethod
+    def from_dict(cls, msg: dict) -> "SubscriptionCheckpoint":
+        ret = cls()
+        ret.marks = {
+            subscription_id: {url: HighWaterMark(**mark) for url, mark in marks.items()}
+            for subscription_id, marks in msg.items()
+        }
+        return ret
+
+    def save(self):
+        """Writes the marks to path, when they were changed."""
+        self._last_save = time.monotonic()
+        if self.path is None or not self._dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def load(self):
+        with open(self.path) as f:
+            self.marks = self.from_dict(json.load(f)).marks
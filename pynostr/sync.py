@@ -0,0 +1,181 @@
+"""Synchronizes a local event store with relays by set reconciliation (NIP-77)."""
+
+import json
+import logging
+import uuid
+from dataclasses import dataclass, field
+
+from tornado import gen
+
+from .backfill import Backfill
+from .exception import NegentropyException
+from .filters import Filters
+from .message_type import ClientMessageType, RelayMessageType
+from .negentropy import Negentropy, NegentropyStorage
+from .relay import Relay
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class SyncResult:
+    """Difference between the local store and a relay.
+
+    :param url: relay url
+    :param have_ids: ids of events, which only the local store has
+    :param need_ids: ids of events, which only the relay has
+    :param fetched: number of downloaded events
+    :param negentropy: False, when the relay does not support NIP-77
+    :param rounds: number of NEG-MSG round trips
+    :param done: True, when all missing events were downloaded
+    """
+
+    url: str
+    have_ids: list[str] = field(default_factory=list)
+    need_ids: list[str] = field(default_factory=list)
+    fetched: int = 0
+    negentropy: bool = True
+    rounds: int = 0
+    done: bool = False
+
+
+class Sync(Backfill):
+    """Downloads only the events of the relays, which are missing in the store.
+
+    The ids of the store are reconciled with each relay by negentropy
+    fingerprints over (created_at, id) ranges, so only the differing ids are
+    transferred. The missing events are then requested by id in batches of
+    `ids_batch_size`. Relays without NIP-77 support fall back to the
+    paginated :class:`Backfill`, which stores only unknown events.
+
+    :param urls: relay urls
+    :param filters: filters of the synchronized events, limit is ignored
+    :param since: oldest created_at to synchronize
+    :param until: newest created_at to synchronize
+    :param store: iterable of EventMessages with an add_event method
+    :param frame_size_limit: maximum size of a negentropy message, 0 for none
+    :param ids_batch_size: number of ids in each REQ for missing events
+    :param kwargs: further parameters of :class:`Backfill`
+    """
+
+    def __init__(
+        self,
+        urls: list[str],
+        filters: Filters,
+        since=None,
+        until=None,
+        store=None,
+        frame_size_limit: int = 0,
+        ids_batch_size: int = 500,
+        **kwargs,
+    ) -> None:
+        super().__init__(urls, filters, since=since, until=until, store=store, **kwargs)
+        self.frame_size_limit = frame_size_limit
+        self.ids_batch_size = ids_batch_size
+        self.results: dict[str, SyncResult] = {}
+        self._stored_ids = {event_message.event.id for event_message in self.store}
+        self._negotiating: set[str] = set()
+
+    @property
+    def done(self) -> bool:
+        return all(url in self.results and self.results[url].done for url in self.urls)
+
+    def sync_filters(self) -> Filters:
+        filters = self.filters.copy()
+        filters.since = self.since
+        filters.until = self.until
+        filters.limit = None
+        return filters
+
+    def storage(self) -> NegentropyStorage:
+        """Returns the sealed negentropy storage of the matching local events."""
+        filters = self.sync_filters()
+        storage = NegentropyStorage()
+        ids = set()
+        for event_message in self.store:
+            event = event_message.event
+            if event.id not in ids and filters.matches(event):
+                ids.add(event.id)
+                storage.insert(event.created_at, event.id)
+        storage.seal()
+        return storage
+
+    @gen.coroutine
+    def _crawl(self, relay: Relay):
+        result = self.results.setdefault(relay.url, SyncResult(relay.url))
+        supported = yield self._reconcile(relay, result)
+        if not supported:
+            result.negentropy = False
+            yield super()._crawl(relay)
+            result.done = self.checkpoint.get(relay.url).done
+            return
+        yield self._fetch_ids(relay, result)
+
+    @gen.coroutine
+    def _reconcile(self, relay: Relay, result: SyncResult):
+        """Collects have_ids and need_ids, returns False without NIP-77 support."""
+        negentropy = Negentropy(self.storage(), self.frame_size_limit)
+        subscription_id = uuid.uuid4().hex
+        message = [
+            ClientMessageType.NEG_OPEN,
+            subscription_id,
+            self.sync_filters().to_dict(),
+            negentropy.initiate(),
+        ]
+        self._negotiating.add(relay.url)
+        try:
+            while message is not None:
+                answer = yield self._request(
+                    relay,
+                    subscription_id,
+                    lambda m=message: relay.publish(json.dumps(m)),
+                )
+                if not answer or answer[0] != RelayMessageType.NEG_MSG:
+                    log.info(f"No negentropy sync with {relay.url}: {answer}")
+                    return False
+                result.rounds += 1
+                next_message = negentropy.reconcile(answer[2])
+                if next_message is None:
+                    message = None
+                else:
+                    message = [ClientMessageType.NEG_MSG, subscription_id, next_message]
+        except NegentropyException as e:
+            log.warning(f"Negentropy sync with {relay.url} failed: {e}")
+            return False
+        finally:
+            self._negotiating.discard(relay.url)
+            if relay.is_connected:
+                relay.publish(
+                    json.dumps([ClientMessageType.NEG_CLOSE, subscription_id])
+                )
+        result.have_ids = negentropy.have_ids
+        result.need_ids = negentropy.need_ids
+        return True
+
+    @gen.coroutine
+    def _fetch_ids(self, relay: Relay, result: SyncResult):
+        need_ids = [i for i in result.need_ids if i not in self._stored_ids]
+        for start in range(0, len(need_ids), self.ids_batch_size):
+            ids = need_ids[start : start + self.ids_batch_size]
+            events = yield self._fetch(relay, Filters(ids=ids, limit=len(ids)))
+            if events is None:
+                log.info(f"Sync with {relay.url} stopped after {result.fetched} events")
+                return
+            for event_message in events:
+                if event_message.event.id in self._stored_ids:
+                    continue
+                self._stored_ids.add(event_message.event.id)
+                self.store.add_event(event_message)
+                result.fetched += 1
+        result.done = True
+
+    def _on_message(self, message_json, url):
+        message_type = message_json[0]
+        if message_type in (RelayMessageType.NEG_MSG, RelayMessageType.NEG_ERR):
+            self._answer(url, message_json[1], message_json)
+        elif message_type == RelayMessageType.NOTICE and url in self._negotiating:
+            # relays without NIP-77 usually answer NEG-OPEN with a NOTICE
+            expected_id, _ = self._waiters.get(url, (None, None))
+            self._answer(url, expected_id, message_json)
+        else:
+            super()._on_message(message_json, url)
@@ -0,0 +1,159 @@
+"""Per-message timings of the relay message hot path.
+
+A relay with a :class:`Tracer` creates a :class:`MessageTrace` for each
+received message and marks the end of every stage it passes::
+
+    receive -> parse -> validate -> verify -> match -> enqueue -> dequeue
+
+Relays without a tracer only check `tracer is None`.
+"""
+
+import random
+import time
+from threading import Lock
+from typing import Optional
+
+
+class Stage:
+    PARSE = "parse"
+    VALIDATE = "validate"
+    VERIFY = "verify"
+    MATCH = "match"
+    ENQUEUE = "enqueue"
+    DEQUEUE = "dequeue"
+
+
+class MessageTrace:
+    """Timestamps of the stages of one relay message.
+
+    :param tracer: tracer, which is called when the trace ends
+    :param url: relay url
+    """
+
+    __slots__ = (
+        "dropped",
+        "event_id",
+        "marks",
+        "message_type",
+        "start",
+        "tracer",
+        "url",
+    )
+
+    def __init__(self, tracer: "Tracer", url: str) -> None:
+        self.tracer = tracer
+        self.url = url
+        self.message_type: Optional[str] = None
+        self.event_id: Optional[str] = None
+        self.dropped = False
+        self.start = time.perf_counter()
+        self.marks: list[tuple[str, float]] = []
+
+    def mark(self, stage: str):
+        """Marks the end of stage."""
+        self.marks.append((stage, time.perf_counter()))
+
+    def durations(self) -> dict[str, float]:
+        """Returns the seconds spent in each stage."""
+        ret = {}
+        last = self.start
+        for stage, timestamp in self.marks:
+            ret[stage] = timestamp - last
+            last = timestamp
+        return ret
+
+    @property
+    def total(self) -> float:
+        if not self.marks:
+            return 0
+        return self.marks[-1][1] - self.start
+
+    def finish(self):
+        """Called by the relay after the message was processed."""
+        self.tracer.on_trace(self)
+
+    def dequeued(self):
+        """Called by the message pool, when a consumer got the event."""
+        self.mark(Stage.DEQUEUE)
+        self.tracer.on_dequeue(self)
+
+
+class Tracer:
+    """Base class of trace collectors.
+
+    Subclasses override :meth:`on_trace` and :meth:`on_dequeue`, e.g. to
+    export spans or to feed a profiler.
+
+    :param sample_rate: share of the messages, which are traced
+    """
+
+    def __init__(self, sample_rate: float = 1.0) -> None:
+        self.sample_rate = sample_rate
+        self.random = random.Random()
+
+    def start(self, url: str) -> Optional[MessageTrace]:
+        """Returns a trace for a received message or None, when not sampled."""
+        if self.sample_rate < 1 and self.random.random() >= self.sample_rate:
+            return None
+        return MessageTrace(self, url)
+
+    def on_trace(self, trace: MessageTrace):
+        """Called after the relay processed the message."""
+
+    def on_dequeue(self, trace: MessageTrace):
+        """Called when the event of the trace was taken from the message pool."""
+
+
+class TimingCollector(Tracer):
+    """Collects count, total and maximum seconds per relay and stage."""
+
+    def __init__(self, sample_rate: float = 1.0) -> None:
+        super().__init__(sample_rate)
+        self.timings: dict[tuple[str, str], list[float]] = {}
+        self.dropped: dict[str, int] = {}
+        self.lock = Lock()
+
+    def on_trace(self, trace: MessageTrace):
+        with self.lock:
+            if trace.dropped:
+                self.dropped[trace.url] = self.dropped.get(trace.url, 0) + 1
+            for stage, seconds in trace.durations().items():
+                if stage != Stage.DEQUEUE:
+                    self._add(trace.url, stage, seconds)
+
+    def on_dequeue(self, trace: MessageTrace):
+        stage, seconds = Stage.DEQUEUE, trace.durations()[Stage.DEQUEUE]
+        with self.lock:
+            self._add(trace.url, stage, seconds)
+
+    def _add(self, url: str, stage: str, seconds: float):
+        timing = self.timings.get((url, stage))
+        if timing is None:
+            self.timings[(url, stage)] = [1, seconds, seconds]
+        else:
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    def summary(self) -> dict[str, dict[str, dict]]:
+        """Returns count, mean and max seconds by url and stage."""
+        ret: dict[str, dict[str, dict]] = {}
+        with self.lock:
+            for (url, stage), (count, total, maximum) in self.timings.items():
+                ret.setdefault(url, {})[stage] = {
+                    "count": count,
+                    "mean": total / count,
+                    "max": maximum,
+                }
+        return ret
+
+    def slowest(self, stage: str) -> Optional[str]:
+        """Returns the url with the highest mean seconds in stage."""
+        means = {
+            url: stages[stage]["mean"]
+            for url, stages in self.summary().items()
+            if stage in stages
+        }
+        if not means:
+            return None
+        return max(means, key=means.get)
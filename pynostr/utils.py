@@ -1,28 +1,18 @@
-import binascii
 import datetime
 import logging
 
-import requests
-import tlv8
-
-from . import bech32
+from . import bech32_codec, nip19
 
 log = logging.getLogger(__name__)
 
 
 def bech32_decode(bech32_str: str):
     """Loads bytes from its bech32/nsec form."""
-    hrp, data, spec = bech32.bech32_decode(bech32_str)
-    raw_secret = bech32.convertbits(data, 5, 8)
-    if raw_secret[-1] != 0x0:
-        return bytes(raw_secret)
-    else:
-        return bytes(raw_secret[:-1])
+    return bech32_codec.decode(bech32_str)[1]
 
 
 def bech32_encode(raw_bytes: bytes, prefix: str) -> str:
-    converted_bits = bech32.convertbits(raw_bytes, 8, 5)
-    return bech32.bech32_encode(prefix, converted_bits, bech32.Encoding.BECH32)
+    return bech32_codec.encode(prefix, raw_bytes)
 
 
 def split_nip05(nip05):
@@ -39,6 +29,8 @@ def split_nip05(nip05):
 def get_nip05_response(name, url, timeout=1):
     if url is None:
         return {}
+    import requests
+
     request_url = f"https://{url}/.well-known/nostr.json?name={name}"
     try:
         response = requests.get(
@@ -104,6 +96,8 @@ def get_public_key(identity_str: str):
 
 
 def get_relay_information(url: str, timeout: float = 2, add_url: bool = True):
+    import requests
+
     headers = {"Accept": "application/nostr+json", "User-Agent": "pynostr"}
     if "wss" in url:
         metadata_uri = url.replace("wss", "https")
@@ -134,30 +128,14 @@ def get_relay_information(url: str, timeout: float = 2, add_url: bool = True):
 
 
 def nprofile_decode(nprofile: str):
-    decode = bytes(bech32_decode(nprofile))
-    pubkey = None
-    relays = []
-    for data in tlv8.deep_decode(decode):
-        if data.type_id == 0:
-            pubkey = binascii.hexlify(data.data).decode()
-        elif data.type_id == 1:
-            relays.append(data.data.decode())
-    return pubkey, relays
+    pointer = nip19.decode(nprofile)
+    if isinstance(pointer, nip19.ProfilePointer):
+        return pointer.pubkey, pointer.relays
+    raise ValueError(f"{nprofile} is not a nprofile")
 
 
 def nprofile_encode(pubkey: str, relays: [str]):
-    structure = [
-        tlv8.Entry(0, binascii.unhexlify(pubkey)),
-    ]
-    for relay in relays:
-        structure.append(tlv8.Entry(1, relay.encode()))
-
-    bytes_data = tlv8.encode(structure)
-
-    bytes_data = b""
-    for entry in structure:
-        bytes_data += entry.encode()
-    return bech32_encode(bytes_data, "nprofile")
+    return nip19.ProfilePointer(pubkey, list(relays)).encode()
 
 
 def get_timestamp(days=0, seconds=0, minutes=0, hours=0, weeks=0):
@@ -174,6 +152,8 @@ def get_relay_list(relay_type="online", nip=None, timeout=5):
     :param relay_type: can be online, public, paid, offline or nip
     :param nip: is used when relay_type is set to nip
     """
+    import requests
+
     headers = {"User-Agent": "pynostr"}
     url = f"https://api.nostr.watch/v1/{relay_type}"
     if nip is not None:
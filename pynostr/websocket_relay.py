@@ -1,7 +1,8 @@
 """Forked from https://github.com/jeffthibault/python-nostr.git."""
 
+import logging
 import time
-from threading import Thread
+from threading import Condition, Thread
 from typing import Optional, Union
 
 from websocket import WebSocketApp
@@ -9,8 +10,18 @@ from websocket import WebSocketApp
 from .base_relay import BaseRelay, RelayPolicy, RelayProxyConnectionConfig
 from .message_pool import MessagePool
 
+log = logging.getLogger(__name__)
+
 
 class WebSocketRelay(BaseRelay):
+    """websocket-client relay with a connection and a sender thread.
+
+    :param max_queue_size: maximum number of unsent messages, when the queue is
+        full the oldest message is dropped (0 disables the limit)
+    :param max_retry_interval: maximum seconds between two attempts to send a
+        message, which failed
+    """
+
     def __init__(
         self,
         url: str,
@@ -18,20 +29,30 @@ class WebSocketRelay(BaseRelay):
         policy: Optional[RelayPolicy] = None,
         ssl_options: Optional[dict] = None,
         proxy_config: Union[None, RelayProxyConnectionConfig] = None,
+        max_queue_size: int = 1000,
+        max_retry_interval: float = 30,
     ) -> None:
         if policy is None:
             policy = RelayPolicy()
         super().__init__(url, policy, message_pool)
         self.ssl_options = ssl_options
         self.proxy_config = proxy_config
+        self.max_queue_size = max_queue_size
+        self.max_retry_interval = max_retry_interval
+        self.dropped_messages: int = 0
+        self._outgoing_condition: Condition = Condition()
+        self._pending_message: Optional[str] = None
+        self._send_retries: int = 0
         self.ws: WebSocketApp = WebSocketApp(
             self.url,
             on_open=self._on_open,
-            on_message=self._on_message,
+            on_message=self._on_websocket_message,
             on_error=self._on_error,
             on_close=self._on_close,
         )
         self._connection_thread: Thread = None
+        self._outgoing_thread: Thread = None
+        self._connect_started: float = 0
 
     @property
     def is_connected(self) -> bool:
@@ -49,52 +70,110 @@ class WebSocketRelay(BaseRelay):
             self.ws.close()
 
     def connect(self, is_reconnect=False):
-        if not self.is_connected:
-            with self.lock:
-                self._connection_thread = Thread(
-                    target=self.ws.run_forever,
-                    kwargs={
-                        "sslopt": self.ssl_options,
-                        "http_proxy_host": self.proxy_config.host
-                        if self.proxy_config is not None
-                        else None,
-                        "http_proxy_port": self.proxy_config.port
-                        if self.proxy_config is not None
-                        else None,
-                        "proxy_type": self.proxy_config.type
-                        if self.proxy_config is not None
-                        else None,
-                    },
-                    name=f"{self.url}-connection",
-                )
-                self._connection_thread.start()
+        """Starts the connection thread and returns without waiting for it.
+
+        Use :meth:`wait_for_connection` to block until the socket is open.
+        """
+        with self.lock:
+            if (
+                self._connection_thread is not None
+                and self._connection_thread.is_alive()
+            ):
+                return
+            self._connect_started = time.monotonic()
+            self._connection_thread = Thread(
+                target=self.ws.run_forever,
+                kwargs={
+                    "sslopt": self.ssl_options,
+                    "http_proxy_host": self.proxy_config.host
+                    if self.proxy_config is not None
+                    else None,
+                    "http_proxy_port": self.proxy_config.port
+                    if self.proxy_config is not None
+                    else None,
+                    "proxy_type": self.proxy_config.type
+                    if self.proxy_config is not None
+                    else None,
+                },
+                name=f"{self.url}-connection",
+            )
+            self._connection_thread.start()
 
-            if not is_reconnect:
-                Thread(
+            if self._outgoing_thread is None:
+                self._outgoing_thread = Thread(
                     target=self.outgoing_messages_worker,
                     name=f"{self.url}-outgoing-messages-worker",
                     daemon=True,
-                ).start()
+                )
+                self._outgoing_thread.start()
+
+    def wait_for_connection(self, timeout: Optional[float] = None) -> bool:
+        """Waits until the websocket is open, returns False on timeout."""
+        with self._outgoing_condition:
+            return self._outgoing_condition.wait_for(lambda: self.connected, timeout)
 
-            time.sleep(1)
+    def publish(self, message: str):
+        with self._outgoing_condition:
+            if 0 < self.max_queue_size <= self.outgoing_messages.qsize():
+                self._drop_oldest()
+            super().publish(message)
+            self._outgoing_condition.notify_all()
+
+    def _drop_oldest(self):
+        self.outgoing_messages.get_nowait()
+        self.dropped_messages += 1
+        if self.metrics is not None:
+            self.metrics.dropped_messages.inc(self.url)
+        log.warning(f"Outgoing queue of {self.url} is full, dropped a message")
+
+    def _can_send(self) -> bool:
+        return self.connected and (
+            self._pending_message is not None or self.outgoing_messages.qsize() > 0
+        )
 
     def outgoing_messages_worker(self):
+        """Sends queued messages, waits while the relay is disconnected.
+
+        A message which could not be sent stays at the head of the queue, so the
+        order is kept, and is sent again until it succeeds.
+        """
         while True:
-            if self.is_connected:
-                message = self.outgoing_messages.get()
-                try:
-                    self.ws.send(message)
-                    self.num_sent_events += 1
-                except Exception:
-                    self.outgoing_messages.put(message)
+            with self._outgoing_condition:
+                self._outgoing_condition.wait_for(self._can_send)
+                if self._pending_message is None:
+                    self._pending_message = self.outgoing_messages.get_nowait()
+                message = self._pending_message
+            try:
+                self.ws.send(message)
+            except Exception as e:
+                log.info(f"Could not send message to {self.url}: {e}")
+                with self._outgoing_condition:
+                    self._send_retries += 1
+                    self._outgoing_condition.wait(
+                        min(self._send_retries, self.max_retry_interval)
+                    )
+                continue
+            with self._outgoing_condition:
+                self._pending_message = None
+                self._send_retries = 0
+            self._record_sent(message)
 
     def _on_open(self, class_obj):
-        pass
+        self._on_connected(time.monotonic() - self._connect_started)
+        with self._outgoing_condition:
+            self.connected = True
+            self._outgoing_condition.notify_all()
+
+    def _on_websocket_message(self, class_obj, message):
+        self._on_message(message)
 
     def _on_close(self, class_obj, status_code, message):
+        with self._outgoing_condition:
+            self.connected = False
         self.error_counter = 0
 
     def _on_error(self, class_obj, error):
+        self.health.record_error()
         self.error_counter += 1
         if self.error_counter > self.error_threshold:
             self.close()
@@ -12,6 +12,8 @@ from .event import Event
 from .exception import RelayException
 from .filters import FiltersList
 from .message_pool import MessagePool
+from .metrics import MetricsRegistry
+from .tracing import Tracer
 from .websocket_relay import WebSocketRelay
 
 
@@ -19,18 +21,34 @@ from .websocket_relay import WebSocketRelay
 class WebSocketRelayManager:
     error_threshold: int = 0
     connection_monitor_interval_secs: int = 5
+    metrics: Optional[MetricsRegistry] = None
+    tracer: Optional[Tracer] = None
 
     def __post_init__(self):
         self.relays: dict[str, WebSocketRelay] = {}
         self.message_pool: MessagePool = MessagePool()
         self.lock: Lock = Lock()
+        if self.metrics is not None:
+            self.message_pool.metrics = self.metrics
+            self.metrics.add_collector(self._collect_metrics)
+        self._start_connection_monitor()
 
+    def _start_connection_monitor(self):
         threading.Thread(
             target=self._relay_connection_monitor,
             name="relay-connection-monitor",
             daemon=True,
         ).start()
 
+    def _create_relay(
+        self,
+        url: str,
+        policy: RelayPolicy,
+        ssl_options: Optional[dict] = None,
+        proxy_config: Optional[RelayProxyConnectionConfig] = None,
+    ):
+        return WebSocketRelay(url, self.message_pool, policy, ssl_options, proxy_config)
+
     def add_relay(
         self,
         url: str,
@@ -40,31 +58,45 @@ class WebSocketRelayManager:
     ):
         if policy is None:
             policy = RelayPolicy()
-        relay = WebSocketRelay(
-            url, self.message_pool, policy, ssl_options, proxy_config
-        )
+        relay = self._create_relay(url, policy, ssl_options, proxy_config)
         if self.error_threshold:
             relay.error_threshold = self.error_threshold
+        relay.metrics = self.metrics
+        relay.tracer = self.tracer
 
         with self.lock:
             self.relays[url] = relay
-            relay.connect()
+        relay.connect()
 
     def remove_relay(self, url: str):
         with self.lock:
-            if url in self.relays:
-                relay = self.relays.pop(url)
-                relay.close()
+            relay = self.relays.pop(url, None)
+        if relay is not None:
+            relay.close()
+        self._remove_metrics(url)
+
+    def _collect_metrics(self):
+        with self.lock:
+            relays = list(self.relays.values())
+        self.metrics.record_queue_depths(self.message_pool, relays)
+
+    def _remove_metrics(self, url: str):
+        if self.metrics is not None:
+            self.metrics.outgoing_queue_depth.remove(url)
 
     def _relay_connection_monitor(self):
         while True:
-            with self.lock:
-                for relay in self.relays.values():
-                    if not relay.is_connected:
-                        relay.connect(True)
-
+            self._reconnect_relays()
             time.sleep(self.connection_monitor_interval_secs)
 
+    def _reconnect_relays(self):
+        """Reconnects all closed relays without holding the manager lock."""
+        with self.lock:
+            relays = list(self.relays.values())
+        for relay in relays:
+            if not relay.is_connected:
+                relay.connect(True)
+
     def remove_closed_relays(self):
         for url, connected in self.connection_statuses.items():
             if not connected:
@@ -81,7 +113,6 @@ class WebSocketRelayManager:
                         f"is not configured to read from"
                     )
                 relay.add_subscription(id, filters)
-                relay.publish(relay.request)
             else:
                 raise RelayException(f"Invalid relay url: no connection to {url}")
 
@@ -90,7 +121,6 @@ class WebSocketRelayManager:
             for relay in self.relays.values():
                 if relay.policy.should_read:
                     relay.add_subscription(id, filters)
-                    relay.publish(relay.request)
 
     def close_subscription_on_relay(self, url: str, id: str):
         with self.lock:
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from tornado.ioloop import IOLoop
+
+from pynostr.backfill import Backfill, BackfillCheckpoint, RelayBackfillState
+from pynostr.event import Event
+from pynostr.filters import Filters
+from pynostr.key import PrivateKey
+from pynostr.local_relay import LocalRelay
+from pynostr.message_pool import EventMessage, EventMessageStore
+
+
+class TestBackfill(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        pk = PrivateKey()
+        cls.events = []
+        for i in range(25):
+            # two events per second test the overlap at the page boundary
+            event = Event(f"note {i}", created_at=1000 + i // 2)
+            event.sign(pk.hex())
+            cls.events.append(event)
+
+    def setUp(self):
+        self.old_loop = asyncio.get_event_loop()
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        self.io_loop = IOLoop.current()
+        self.relay = LocalRelay().listen(self.io_loop)
+        for event in self.events:
+            self.relay.add_event(event)
+        self.url = self.relay.url
+
+    def tearDown(self):
+        self.relay.stop()
+        self.io_loop.close(all_fds=True)
+        asyncio.set_event_loop(self.old_loop)
+
+    def test_backfill_pages(self):
+        backfill = Backfill(
+            [self.url], Filters(kinds=[1]), page_size=5, io_loop=self.io_loop
+        )
+        backfill.run()
+        self.assertTrue(backfill.done)
+        stored = {e.event.id for e in backfill.store}
+        self.assertEqual(stored, {e.id for e in self.events})
+        self.assertGreater(len(self.relay.requests), 5)
+        self.assertEqual(self.relay.requests[0][0]["limit"], 5)
+        self.assertNotIn("until", self.relay.requests[0][0])
+
+    def test_full_page_with_one_created_at(self):
+        # each page holds only the two events of a second
+        backfill = Backfill([self.url], Filters(), page_size=2, io_loop=self.io_loop)
+        backfill.run()
+        self.assertTrue(backfill.done)
+        stored = {e.event.id for e in backfill.store}
+        self.assertEqual(stored, {e.id for e in self.events})
+
+    def test_since(self):
+        backfill = Backfill(
+            [self.url], Filters(), since=1010, page_size=4, io_loop=self.io_loop
+        )
+        backfill.run()
+        stored = {e.event.id for e in backfill.store}
+        self.assertEqual(stored, {e.id for e in self.events if e.created_at >= 1010})
+
+    def test_resume_from_checkpoint(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "backfill.json")
+            checkpoint = BackfillCheckpoint()
+            checkpoint.get(self.url).until = 1005
+            checkpoint.save(path)
+            backfill = Backfill(
+                [self.url],
+                Filters(),
+                page_size=10,
+                checkpoint_path=path,
+                io_loop=self.io_loop,
+            )
+            backfill.run()
+            self.assertEqual(self.relay.requests[0][0]["until"], 1005)
+            stored = {e.event.id for e in backfill.store}
+            self.assertEqual(
+                stored, {e.id for e in self.events if e.created_at <= 1005}
+            )
+            saved = BackfillCheckpoint.load(path).get(self.url)
+            self.assertTrue(saved.done)
+            self.assertEqual(saved.count, len(stored))
+
+    def test_unreachable_relay(self):
+        backfill = Backfill(
+            ["ws://127.0.0.1:9"], Filters(), timeout=1, io_loop=self.io_loop
+        )
+        backfill.run()
+        self.assertFalse(backfill.done)
+
+
+class TestBackfillPage(unittest.TestCase):
+    def test_process_page(self):
+        pk = PrivateKey()
+        events = []
+        for created_at in [10, 9, 9]:
+            event = Event(f"note {len(events)}", created_at=created_at)
+            event.sign(pk.hex())
+            events.append(EventMessage(event, "sub", "ws://relay.test"))
+        backfill = Backfill(["ws://relay.test"], Filters(), store=EventMessageStore())
+        state = RelayBackfillState()
+        seen = set()
+        backfill._process_page("ws://relay.test", state, events, seen)
+        self.assertEqual(state.until, 9)
+        self.assertEqual(
+            set(state.boundary_ids), {events[1].event.id, events[2].event.id}
+        )
+        self.assertEqual(state.count, 3)
+        self.assertFalse(state.done)
+        # the next page repeats the events at the boundary
+        backfill._process_page("ws://relay.test", state, events[1:], seen)
+        self.assertTrue(state.done)
+        self.assertEqual(len(backfill.store), 3)
+
+    def test_process_full_page_of_known_events(self):
+        pk = PrivateKey()
+        events = []
+        for i in range(2):
+            event = Event(f"note {i}", created_at=9)
+            event.sign(pk.hex())
+            events.append(EventMessage(event, "sub", "ws://relay.test"))
+        backfill = Backfill(["ws://relay.test"], Filters(), page_size=2)
+        state = RelayBackfillState()
+        seen = set()
+        backfill._process_page("ws://relay.test", state, events, seen)
+        self.assertEqual(state.until, 9)
+        backfill._process_page("ws://relay.test", state, events, seen)
+        self.assertFalse(state.done)
+        self.assertEqual(state.until, 8)
+        self.assertEqual(state.boundary_ids, [])
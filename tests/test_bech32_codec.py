@@ -0,0 +1,75 @@
+import random
+import unittest
+
+from pynostr import bech32, bech32_codec
+from pynostr.key import PrivateKey
+
+from .test_bech32 import (
+    INVALID_BECH32,
+    INVALID_BECH32M,
+    VALID_ADDRESS,
+    VALID_BECH32,
+    VALID_BECH32M,
+)
+
+
+class TestBech32Codec(unittest.TestCase):
+    def setUp(self):
+        self.random = random.Random(42)
+
+    def test_bech32_decode(self):
+        strings = VALID_BECH32 + VALID_BECH32M + INVALID_BECH32 + INVALID_BECH32M
+        strings += [address for address, _ in VALID_ADDRESS]
+        strings += ["", "1", "a1" + "q" * 6, "A1lqfN3a"]
+        for string in strings:
+            self.assertEqual(
+                bech32_codec.bech32_decode(string), bech32.bech32_decode(string)
+            )
+
+    def test_bech32_encode(self):
+        for spec in [bech32.Encoding.BECH32, bech32.Encoding.BECH32M]:
+            for length in range(0, 80, 7):
+                data = [self.random.randrange(32) for _ in range(length)]
+                self.assertEqual(
+                    bech32_codec.bech32_encode("nostr", data, spec),
+                    bech32.bech32_encode("nostr", data, spec),
+                )
+
+    def test_convertbits(self):
+        for frombits, tobits in [(8, 5), (5, 8), (8, 8), (3, 7)]:
+            for length in range(0, 70, 3):
+                data = [self.random.randrange(1 << frombits) for _ in range(length)]
+                for pad in [True, False]:
+                    self.assertEqual(
+                        bech32_codec.convertbits(data, frombits, tobits, pad),
+                        bech32.convertbits(data, frombits, tobits, pad),
+                    )
+        for data in [[256], [-1], [1, 32]]:
+            self.assertIsNone(bech32_codec.convertbits(data, 5 + 3 * (data[0] > 31), 8))
+
+    def test_encode_decode(self):
+        for length in range(0, 100, 3):
+            raw_bytes = self.random.randbytes(length)
+            expected = bech32.bech32_encode(
+                "nevent", bech32.convertbits(raw_bytes, 8, 5), bech32.Encoding.BECH32
+            )
+            encoded = bech32_codec.encode("nevent", raw_bytes)
+            self.assertEqual(encoded, expected)
+            hrp, decoded = bech32_codec.decode(encoded)
+            self.assertEqual(hrp, "nevent")
+            reference = bytes(
+                bech32.convertbits(bech32.bech32_decode(encoded)[1], 5, 8)
+            )
+            if reference and reference[-1] == 0:
+                reference = reference[:-1]
+            self.assertEqual(decoded, reference)
+        with self.assertRaises(ValueError):
+            bech32_codec.decode("npub1invalid")
+
+    def test_encode_many(self):
+        keys = [PrivateKey().public_key for _ in range(5)]
+        npubs = bech32_codec.encode_many("npub", [key.raw_bytes for key in keys])
+        self.assertEqual(npubs, [key.bech32() for key in keys])
+        self.assertEqual(
+            bech32_codec.decode_many(npubs), [key.raw_bytes for key in keys]
+        )
@@ -0,0 +1,57 @@
+import json
+import os
+import tempfile
+import unittest
+
+from typer.testing import CliRunner
+
+from pynostr.benchmark import (
+    BENCHMARKS,
+    BenchmarkResult,
+    compare,
+    load_report,
+    report,
+    run_benchmark,
+    run_benchmarks,
+)
+from pynostr.cli import app
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_all_benchmarks_run(self):
+        results = run_benchmarks(rounds=1, number=1)
+        self.assertEqual(list(results), list(BENCHMARKS))
+        self.assertEqual(results["relay_manager"].operations, 600)
+        for result in results.values():
+            self.assertEqual(len(result.rounds), 1)
+            self.assertGreater(result.ops_per_second, 0)
+
+    def test_calibration(self):
+        result = run_benchmark("event_id", rounds=3, min_time=0.01)
+        self.assertEqual(len(result.rounds), 3)
+        self.assertGreater(result.operations, 1)
+
+    def test_report_and_compare(self):
+        results = {"event_id": BenchmarkResult("event_id", 100, [0.01, 0.02])}
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.json")
+            with open(path, "w") as f:
+                json.dump(report(results), f)
+            baseline = load_report(path)
+        self.assertEqual(baseline["event_id"].ops_per_second, 10000)
+        slower = {"event_id": BenchmarkResult("event_id", 100, [0.02])}
+        self.assertEqual(compare(baseline, results), {})
+        self.assertAlmostEqual(compare(baseline, slower)["event_id"], -0.5)
+        self.assertEqual(compare(baseline, slower, threshold=0.6), {})
+
+    def test_cli(self):
+        runner = CliRunner()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.json")
+            args = ["bench", "--name", "event_id", "--rounds", "1", "--min-time", "0"]
+            result = runner.invoke(app, [*args, "--output", path])
+            self.assertEqual(result.exit_code, 0)
+            with open(path) as f:
+                self.assertIn("event_id", json.load(f)["benchmarks"])
+        result = runner.invoke(app, ["bench", "--name", "unknown"])
+        self.assertNotEqual(result.exit_code, 0)
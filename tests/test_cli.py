@@ -3,6 +3,8 @@ import unittest
 from typer.testing import CliRunner
 
 from pynostr.cli import app
+from pynostr.key import PublicKey
+from pynostr.nip19 import AddressPointer, EventPointer, ProfilePointer
 
 
 class TestEvent(unittest.TestCase):
@@ -21,3 +23,15 @@ class TestEvent(unittest.TestCase):
             ],
         )
         self.assertEqual(result.exit_code, 0)
+
+    def test_info_nip19(self):
+        runner = CliRunner()
+        pubkey = "3bf0c63fcb93463407af97a5e5ee64fa883d107ef9e558472c4eb9aaaefa459d"
+        for link in [
+            ProfilePointer(pubkey, ["wss://r.x.com"]).encode(),
+            EventPointer(pubkey, ["wss://r.x.com"], pubkey, 1).encode(),
+            AddressPointer("my-article", pubkey, 30023).encode(),
+        ]:
+            result = runner.invoke(app, ["info", link])
+            self.assertEqual(result.exit_code, 0)
+            self.assertIn(PublicKey.from_hex(pubkey).bech32(), result.output)
@@ -0,0 +1,90 @@
+import json
+import unittest
+
+from pynostr.conversation_index import ConversationIndex
+from pynostr.encrypted_dm import EncryptedDirectMessage, InboxDecryptor
+from pynostr.event import Event
+from pynostr.key import PrivateKey
+from pynostr.message_pool import MessagePool
+
+
+class TestConversationIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.me = PrivateKey()
+        cls.alice = PrivateKey()
+        cls.bob = PrivateKey()
+
+    def _dm(self, sender: PrivateKey, recipient: PrivateKey, text, created_at):
+        dm = EncryptedDirectMessage()
+        dm.encrypt(sender.hex(), text, recipient.public_key.hex())
+        event = dm.to_event()
+        event.created_at = created_at
+        event.sign(sender.hex())
+        return event
+
+    def test_timeline(self):
+        index = ConversationIndex(self.me.public_key.hex())
+        events = [
+            self._dm(self.alice, self.me, "hi", 10),
+            self._dm(self.me, self.alice, "hello", 30),
+            self._dm(self.alice, self.me, "how are you?", 20),
+            self._dm(self.bob, self.me, "hey", 15),
+        ]
+        index.add_events(events)
+        index.add_event(events[0])
+        index.add_event(Event("note", pubkey=self.alice.public_key.hex()))
+        self.assertEqual(len(index), 2)
+
+        alice = self.alice.public_key.hex()
+        timeline = index.timeline(alice)
+        self.assertEqual(
+            [dm.event for dm in timeline], [events[1], events[2], events[0]]
+        )
+        self.assertEqual(index.timeline(alice, limit=1)[0].event, events[1])
+        self.assertEqual(timeline[0].recipient_pubkey, alice)
+        self.assertIs(index.get(alice), index.get(self.me.public_key.hex(), alice))
+        self.assertEqual(index.peers(), [alice, self.bob.public_key.hex()])
+        self.assertEqual(index.timeline(PrivateKey().public_key.hex()), [])
+
+    def test_unread_counts(self):
+        index = ConversationIndex(self.me.public_key.hex())
+        alice = self.alice.public_key.hex()
+        bob = self.bob.public_key.hex()
+        index.add_events(
+            [
+                self._dm(self.alice, self.me, "1", 10),
+                self._dm(self.alice, self.me, "2", 20),
+                self._dm(self.me, self.alice, "3", 25),
+                self._dm(self.bob, self.me, "4", 15),
+            ]
+        )
+        self.assertEqual(index.unread_counts(), {alice: 2, bob: 1})
+        index.mark_read(alice, until=10)
+        self.assertEqual(index.unread_counts(), {alice: 1, bob: 1})
+        index.mark_read(bob)
+        self.assertEqual(index.unread_counts(), {alice: 1})
+        index.add_event(self._dm(self.bob, self.me, "5", 40))
+        self.assertEqual(index.unread_counts(), {alice: 1, bob: 1})
+
+    def test_message_pool(self):
+        index = ConversationIndex(self.me.public_key.hex())
+        message_pool = MessagePool()
+        index.listen(message_pool)
+        index.listen(message_pool)
+        event = self._dm(self.alice, self.me, "hi", 10)
+        message_pool.add_message(
+            json.dumps(["EVENT", "dms", event.to_dict()]), "ws://relay"
+        )
+        self.assertEqual(
+            index.timeline(self.alice.public_key.hex())[0].event.id, event.id
+        )
+
+    def test_decrypt(self):
+        index = ConversationIndex(self.me.public_key.hex())
+        conversation = index.add_event(self._dm(self.alice, self.me, "hi", 10))
+        index.add_event(self._dm(self.me, self.alice, "hello", 20))
+        conversation.decrypt(InboxDecryptor(self.me))
+        self.assertEqual(
+            [dm.cleartext_content for dm in conversation.timeline()], ["hello", "hi"]
+        )
@@ -1,9 +1,14 @@
 import unittest
+from unittest import mock
 
-from pynostr.encrypted_dm import EncryptedDirectMessage
-from pynostr.event import Event
+from pynostr.encrypted_dm import (
+    EncryptedDirectMessage,
+    InboxDecryptor,
+    get_counterparty,
+)
+from pynostr.event import Event, EventKind
 from pynostr.exception import NIPValidationException
-from pynostr.key import PrivateKey
+from pynostr.key import PrivateKey, SharedSecretCache
 
 
 class TestEncryptedDirectMessage(unittest.TestCase):
@@ -203,6 +208,26 @@ class TestEncryptedDirectMessage(unittest.TestCase):
         )
         self.assertEqual(shared_secret1, shared_secret2)
 
+    def test_shared_secret_cache(self):
+        cache = SharedSecretCache()
+        dm = EncryptedDirectMessage()
+        dm.encrypt(
+            self.sender_pk.hex(),
+            recipient_pubkey=self.recipient_pubkey,
+            cleartext_content="Secret message!",
+            cache=cache,
+        )
+        received = EncryptedDirectMessage.from_event(dm.to_event())
+        received.decrypt(
+            self.recipient_pk.hex(), public_key_hex=self.sender_pubkey, cache=cache
+        )
+        self.assertEqual(received.cleartext_content, "Secret message!")
+        received.decrypt(
+            self.recipient_pk.hex(), public_key_hex=self.sender_pubkey, cache=cache
+        )
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual(cache.hits, 1)
+
     def test_decrypt_event(self):
         dm1 = Event.from_dict(
             {
@@ -225,3 +250,58 @@ class TestEncryptedDirectMessage(unittest.TestCase):
             }
         )
         self.assertTrue(dm1.verify())
+
+    def _dm_events(self, n: int) -> list[Event]:
+        events = []
+        for i in range(n):
+            dm = EncryptedDirectMessage()
+            if i % 2:
+                dm.encrypt(self.sender_pk.hex(), f"message {i}", self.recipient_pubkey)
+            else:
+                dm.encrypt(self.recipient_pk.hex(), f"message {i}", self.sender_pubkey)
+            events.append(dm.to_event())
+        return events
+
+    def test_get_counterparty(self):
+        sent, received = self._dm_events(2)
+        self.assertEqual(
+            get_counterparty(sent, self.recipient_pubkey), self.sender_pubkey
+        )
+        self.assertEqual(
+            get_counterparty(received, self.recipient_pubkey), self.sender_pubkey
+        )
+        self.assertIsNone(
+            get_counterparty(Event(pubkey=self.sender_pubkey), self.sender_pubkey)
+        )
+
+    def test_inbox_decryptor(self):
+        events = self._dm_events(10)
+        broken = Event(
+            kind=EventKind.ENCRYPTED_DIRECT_MESSAGE,
+            pubkey=self.sender_pubkey,
+            content="broken",
+        )
+        events.insert(3, broken)
+        events.append(Event("note", pubkey=self.sender_pubkey))
+        compute = PrivateKey.compute_shared_secret
+        for workers in [1, 2]:
+            ecdh = mock.Mock(side_effect=compute)
+            decryptor = InboxDecryptor(
+                self.recipient_pk.hex(),
+                cache=SharedSecretCache(),
+                workers=workers,
+                chunk_size=4,
+            )
+            with mock.patch.object(
+                PrivateKey,
+                "compute_shared_secret",
+                lambda sk, pubkey, ecdh=ecdh: ecdh(sk, pubkey),
+            ):
+                results = list(decryptor.decrypt(iter(events)))
+            self.assertEqual([event for event, _ in results], events)
+            cleartexts = [c for _, c in results if isinstance(c, str)]
+            self.assertEqual(cleartexts, [f"message {i}" for i in range(10)])
+            self.assertIsInstance(results[3][1], Exception)
+            self.assertIsInstance(results[-1][1], NIPValidationException)
+            self.assertEqual(decryptor.cache.misses, 1)
+            self.assertEqual(ecdh.call_count, 1)
@@ -0,0 +1,62 @@
+import json
+import subprocess
+import sys
+import unittest
+
+OPTIONAL_MODULES = ["tornado", "requests", "rich", "cryptography"]
+
+
+def run_python(code: str, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def loaded_modules(code: str) -> list[str]:
+    code += "\nimport json, sys\n"
+    code += f"print(json.dumps([m for m in {OPTIONAL_MODULES} if m in sys.modules]))"
+    return json.loads(run_python(code).stdout.strip().splitlines()[-1])
+
+
+def import_time(module: str) -> float:
+    """Cumulative import time of module in seconds, see python -X importtime."""
+    stderr = run_python(f"import {module}", "-X", "importtime").stderr
+    for line in stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1e6
+    raise ValueError(f"{module} not found")
+
+
+class TestImportTime(unittest.TestCase):
+    def test_lazy_imports(self):
+        for module in [
+            "pynostr.cli",
+            "pynostr.key",
+            "pynostr.event",
+            "pynostr.metadata",
+            "pynostr.base_relay",
+            "pynostr.encrypted_dm",
+            "pynostr.metrics",
+        ]:
+            self.assertEqual(loaded_modules(f"import {module}"), [], module)
+
+    def test_imports_on_use(self):
+        code = "from pynostr.metrics_handler import MetricsHandler"
+        self.assertEqual(loaded_modules(code), ["tornado"])
+        code = "import pynostr.relay"
+        self.assertEqual(loaded_modules(code), ["tornado"])
+        code = (
+            "from pynostr.key import PrivateKey\n"
+            "sk = PrivateKey()\n"
+            "sk.encrypt_message('hi', sk.public_key.hex())"
+        )
+        self.assertEqual(loaded_modules(code), ["cryptography"])
+
+    def test_cli_import_time(self):
+        # generous bound, the import takes about 0.1 s without the optional
+        # dependencies and 0.25 s with them
+        self.assertLess(import_time("pynostr.cli"), 1.0)
@@ -1,7 +1,9 @@
+import threading
 import unittest
 from os import urandom
+from unittest import mock
 
-from pynostr.key import PrivateKey, PublicKey
+from pynostr.key import PrivateKey, PublicKey, SharedSecretCache
 
 
 class TestPrivateKey(unittest.TestCase):
@@ -139,3 +141,76 @@ class TestPrivateKey(unittest.TestCase):
             shared_secret2.hex(),
             "646570d4716e0c7e4106788f113a410d5b647225dca3b47ef98bedb64c8044e1",
         )
+
+    def test_shared_secret_cache(self):
+        sender, recipient = PrivateKey(), PrivateKey()
+        cache = SharedSecretCache()
+        message = sender.encrypt_message("hello", recipient.public_key.hex(), cache)
+        self.assertEqual(
+            recipient.decrypt_message(message, sender.public_key.hex()), "hello"
+        )
+        for _ in range(3):
+            message = sender.encrypt_message("hi", recipient.public_key.hex(), cache)
+            self.assertEqual(
+                recipient.decrypt_message(message, sender.public_key.hex(), cache),
+                "hi",
+            )
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual(cache.hits, 5)
+        self.assertEqual(len(cache), 2)
+
+    def test_shared_secret_cache_eviction(self):
+        sender = PrivateKey()
+        peers = [PrivateKey().public_key.hex() for _ in range(3)]
+        cache = SharedSecretCache(maxsize=2)
+        encryptor = cache.encryptor(sender, peers[0], bytes(16))
+        key = cache._secrets[(sender.public_key.raw_bytes, peers[0])].key
+        cache.encryptor(sender, peers[1], bytes(16))
+        cache.encryptor(sender, peers[2], bytes(16))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(key, bytes(32))
+        # contexts created before the eviction keep their key
+        encrypted = encryptor.update(bytes(16)) + encryptor.finalize()
+        expected = cache.encryptor(sender, peers[0], bytes(16))
+        self.assertEqual(encrypted, expected.update(bytes(16)) + expected.finalize())
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_shared_secret_cache_concurrent_miss(self):
+        sender, peer = PrivateKey(), PrivateKey().public_key.hex()
+        cache = SharedSecretCache()
+        barrier = threading.Barrier(4)
+        compute = PrivateKey.compute_shared_secret
+
+        def compute_together(self, public_key_hex):
+            # all threads miss, before the first one stores the secret
+            barrier.wait(timeout=5)
+            return compute(self, public_key_hex)
+
+        contexts = []
+        with mock.patch.object(PrivateKey, "compute_shared_secret", compute_together):
+            threads = [
+                threading.Thread(
+                    target=lambda: contexts.append(
+                        cache.encryptor(sender, peer, bytes(16))
+                    )
+                )
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(cache.hits, 3)
+        self.assertEqual(len(cache), 1)
+        encrypted = {c.update(bytes(16)) + c.finalize() for c in contexts}
+        self.assertEqual(len(encrypted), 1)
+
+    def test_shared_secret_cache_prepare(self):
+        sender, peer = PrivateKey(), PrivateKey().public_key.hex()
+        cache = SharedSecretCache()
+        cache.prepare(sender, peer)
+        cache.prepare(sender, peer)
+        cache.decryptor(sender, peer, bytes(16))
+        self.assertEqual((cache.misses, cache.hits, len(cache)), (1, 2, 1))
@@ -0,0 +1,117 @@
+import json
+import time
+import unittest
+import uuid
+
+import websocket
+
+from pynostr.event import Event
+from pynostr.filters import Filters, FiltersList
+from pynostr.key import PrivateKey
+from pynostr.local_relay import LocalRelay
+from pynostr.websocket_relay_manager import WebSocketRelayManager
+
+
+def wait_for(condition, timeout=5):
+    start = time.monotonic()
+    while not condition() and time.monotonic() - start < timeout:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestLocalRelay(unittest.TestCase):
+    def setUp(self):
+        self.pk = PrivateKey()
+        self.events = []
+        for i in range(5):
+            event = Event(f"note {i}", created_at=1000 + i)
+            event.sign(self.pk.hex())
+            self.events.append(event)
+
+    def _connect(self, relay):
+        return websocket.create_connection(relay.url, timeout=5)
+
+    def _recv(self, ws):
+        return json.loads(ws.recv())
+
+    def test_request_and_publish(self):
+        with LocalRelay() as relay:
+            for event in self.events[:4]:
+                relay.add_event(event)
+            ws = self._connect(relay)
+            ws.send(json.dumps(["REQ", "sub", {"limit": 2}]))
+            answers = [self._recv(ws) for _ in range(3)]
+            self.assertEqual(
+                [a[2]["id"] for a in answers[:2]],
+                [self.events[3].id, self.events[2].id],
+            )
+            self.assertEqual(answers[2], ["EOSE", "sub"])
+
+            ws.send(self.events[4].to_message())
+            self.assertEqual(self._recv(ws)[:2], ["EVENT", "sub"])
+            self.assertEqual(self._recv(ws), ["OK", self.events[4].id, True, ""])
+            ws.send(self.events[4].to_message())
+            self.assertTrue(self._recv(ws)[3].startswith("duplicate:"))
+
+            ws.send(json.dumps(["CLOSE", "sub"]))
+            ws.send(json.dumps(["COUNT", "count", {"kinds": [1]}]))
+            self.assertEqual(self._recv(ws), ["COUNT", "count", {"count": 5}])
+            ws.send(json.dumps(["UNKNOWN"]))
+            self.assertEqual(self._recv(ws)[0], "NOTICE")
+            ws.close()
+            self.assertEqual(relay.received["REQ"], 1)
+
+    def test_invalid_signature(self):
+        with LocalRelay() as relay:
+            event = self.events[0].to_dict()
+            event["content"] = "changed"
+            ws = self._connect(relay)
+            ws.send(json.dumps(["EVENT", event]))
+            self.assertFalse(self._recv(ws)[2])
+            ws.close()
+
+    def test_latency_and_throttle(self):
+        with LocalRelay(latency=0.2, max_messages_per_second=20) as relay:
+            for event in self.events:
+                relay.add_event(event)
+            ws = self._connect(relay)
+            start = time.monotonic()
+            ws.send(json.dumps(["REQ", "sub", {}]))
+            self._recv(ws)
+            self.assertGreaterEqual(time.monotonic() - start, 0.2)
+            for _ in range(5):
+                self._recv(ws)
+            # 6 messages at 20 per second
+            self.assertGreaterEqual(time.monotonic() - start, 0.45)
+            ws.close()
+
+    def test_drop_rate(self):
+        with LocalRelay(drop_rate=1) as relay:
+            ws = self._connect(relay)
+            ws.send(json.dumps(["REQ", "sub", {}]))
+            self.assertTrue(wait_for(lambda: relay.dropped == 1))
+            ws.close()
+
+    def test_websocket_relay_manager_reconnects(self):
+        with LocalRelay() as relay:
+            relay.add_event(self.events[0])
+            relay_manager = WebSocketRelayManager(connection_monitor_interval_secs=0.1)
+            urls = [f"{relay.url}/?{i}" for i in range(20)]
+            for url in urls:
+                relay_manager.add_relay(url)
+            self.assertTrue(wait_for(lambda: len(relay.connections) == 20))
+            relay.disconnect_all()
+            relays = relay_manager.relays.values()
+            self.assertTrue(
+                wait_for(lambda: all(r.health.connects >= 2 for r in relays))
+            )
+            self.assertTrue(
+                wait_for(lambda: all(relay_manager.connection_statuses.values()))
+            )
+            subscription_id = uuid.uuid1().hex
+            filters = FiltersList([Filters(authors=[self.pk.public_key.hex()])])
+            relay_manager.add_subscription_on_all_relays(subscription_id, filters)
+            message_pool = relay_manager.message_pool
+            self.assertTrue(wait_for(lambda: message_pool.eose_notices.qsize() == 20))
+            self.assertEqual(len(message_pool.get_all_events()), 20)
+            relay_manager.close_all_relay_connections()
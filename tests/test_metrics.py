@@ -0,0 +1,123 @@
+import asyncio
+import unittest
+import uuid
+
+from tornado.ioloop import IOLoop
+
+from pynostr.event import Event
+from pynostr.filters import Filters, FiltersList
+from pynostr.key import PrivateKey
+from pynostr.local_relay import LocalRelay
+from pynostr.metrics import MetricsRegistry, frame_size, frame_type
+from pynostr.relay_manager import RelayManager
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_counter_and_histogram(self):
+        registry = MetricsRegistry(buckets=(0.001, 0.01))
+        registry.received_bytes.inc("ws://r1", amount=10)
+        registry.received_bytes.inc("ws://r1", amount=5)
+        self.assertEqual(registry.received_bytes.get("ws://r1"), 15)
+        self.assertEqual(registry.received_bytes.get("ws://r2"), 0)
+        for value in [0.0005, 0.005, 0.5]:
+            registry.parse_seconds.observe(value, "ws://r1")
+        self.assertEqual(registry.parse_seconds.get("ws://r1"), 3)
+        self.assertAlmostEqual(registry.parse_seconds.mean("ws://r1"), 0.5055 / 3)
+        data = registry.to_dict()
+        self.assertEqual(
+            data["pynostr_relay_received_bytes"],
+            [{"labels": {"url": "ws://r1"}, "value": 15}],
+        )
+        self.assertEqual(
+            list(data["pynostr_relay_parse_seconds"][0]["buckets"].values()),
+            [1, 1, 1],
+        )
+        self.assertEqual(data["dedup_ratio"], 0)
+
+    def test_prometheus(self):
+        registry = MetricsRegistry(buckets=(0.001, 0.01))
+        registry.received_frames.inc('ws://"r1"', "EVENT")
+        registry.verify_seconds.observe(0.005, "ws://r1")
+        text = registry.to_prometheus()
+        self.assertIn("# TYPE pynostr_relay_received_frames_total counter", text)
+        self.assertIn(
+            'pynostr_relay_received_frames_total{url="ws://\\"r1\\"",type="EVENT"} 1',
+            text,
+        )
+        self.assertIn(
+            'pynostr_relay_verify_seconds_bucket{url="ws://r1",le="0.001"} 0', text
+        )
+        self.assertIn(
+            'pynostr_relay_verify_seconds_bucket{url="ws://r1",le="+Inf"} 1', text
+        )
+        self.assertIn('pynostr_relay_verify_seconds_count{url="ws://r1"} 1', text)
+
+    def test_frame_type(self):
+        self.assertEqual(frame_type('["EOSE","sub"]'), "EOSE")
+        self.assertEqual(frame_type("hello"), "invalid")
+
+    def test_frame_size(self):
+        self.assertEqual(frame_size('["EOSE","sub"]'), 14)
+        self.assertEqual(frame_size('["EVENT","sub","ü€"]'), 23)
+        self.assertEqual(frame_size(b"\x00\x01"), 2)
+
+
+class TestRelayManagerMetrics(unittest.TestCase):
+    def setUp(self):
+        self.old_loop = asyncio.get_event_loop()
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        self.io_loop = IOLoop.current()
+        self.relays = [LocalRelay().listen(self.io_loop) for _ in range(2)]
+        pk = PrivateKey()
+        for i in range(5):
+            event = Event(f"note {i}")
+            event.sign(pk.hex())
+            for relay in self.relays:
+                relay.add_event(event)
+
+    def tearDown(self):
+        for relay in self.relays:
+            relay.stop()
+        self.io_loop.close(all_fds=True)
+        asyncio.set_event_loop(self.old_loop)
+
+    def test_relay_metrics(self):
+        metrics = MetricsRegistry()
+        relay_manager = RelayManager(metrics=metrics)
+        for relay in self.relays:
+            relay_manager.add_relay(relay.url)
+        relay_manager.add_subscription_on_all_relays(
+            uuid.uuid4().hex, FiltersList([Filters(limit=10)])
+        )
+        relay_manager.run_sync()
+
+        url = self.relays[0].url
+        self.assertEqual(metrics.received_frames.get(url, "EVENT"), 5)
+        self.assertEqual(metrics.received_frames.get(url, "EOSE"), 1)
+        self.assertEqual(metrics.sent_frames.get(url, "REQ"), 1)
+        self.assertGreater(metrics.received_bytes.get(url), 0)
+        self.assertGreater(metrics.sent_bytes.get(url), 0)
+        self.assertEqual(metrics.parse_seconds.get(url), 6)
+        self.assertEqual(metrics.verify_seconds.get(url), 5)
+        self.assertEqual(metrics.connects.get(url), 1)
+        self.assertEqual(metrics.reconnects.get(url), 0)
+        # both relays sent the same five events
+        self.assertEqual(metrics.pool_events.get(), 10)
+        self.assertEqual(metrics.dedup_ratio, 0.5)
+        metrics.collect()
+        self.assertEqual(metrics.queue_depth.get("events"), 10)
+        self.assertEqual(metrics.queue_depth.get("eose_notices"), 2)
+        self.assertEqual(metrics.outgoing_queue_depth.get(url), 0)
+        relay_manager.remove_relay(url)
+        self.assertNotIn(
+            {"labels": {"url": url}, "value": 0},
+            metrics.to_dict()["pynostr_relay_outgoing_queue_depth"],
+        )
+
+    def test_disabled(self):
+        relay_manager = RelayManager()
+        relay_manager.add_relay(self.relays[0].url)
+        relay_manager.add_subscription_on_all_relays("sub", FiltersList([Filters()]))
+        relay_manager.run_sync()
+        self.assertIsNone(relay_manager.relays[self.relays[0].url].metrics)
+        self.assertEqual(relay_manager.message_pool.events.qsize(), 5)
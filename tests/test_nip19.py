@@ -0,0 +1,96 @@
+import struct
+import unittest
+
+from pynostr import bech32_codec, nip19
+from pynostr.nip19 import (
+    AddressPointer,
+    EventPointer,
+    ProfilePointer,
+    RelayPointer,
+    TLVType,
+    encode_tlv,
+    iter_tlv,
+)
+
+PUBKEY = "3bf0c63fcb93463407af97a5e5ee64fa883d107ef9e558472c4eb9aaaefa459d"
+NPROFILE = (
+    "nprofile1qqsrhuxx8l9ex335q7he0f09aej04zpazpl0ne2cgukyaw"
+    + "d24mayt8gpp4mhxue69uhhytnc9e3k7mgpz4mhxue69uhkg6nzv9e"
+    + "juumpv34kytnrdaksjlyr9p"
+)
+EVENT_ID = "b9f5441e45ca39179320e0031cfb18e34078673dcc3d3e3a3b3a981760aa5696"
+
+
+class TestNip19(unittest.TestCase):
+    def test_nprofile(self):
+        pointer = nip19.decode(NPROFILE)
+        self.assertEqual(
+            pointer,
+            ProfilePointer(PUBKEY, ["wss://r.x.com", "wss://djbas.sadkb.com"]),
+        )
+        self.assertEqual(pointer.encode(), NPROFILE)
+
+    def test_nevent(self):
+        pointer = EventPointer(EVENT_ID, ["wss://relay.damus.io"], PUBKEY, 1)
+        nevent = pointer.encode()
+        self.assertTrue(nevent.startswith("nevent1"))
+        self.assertEqual(nip19.decode(nevent), pointer)
+        _, raw = bech32_codec.decode(nevent)
+        self.assertEqual(
+            [(t, bytes(v)) for t, v in iter_tlv(raw)],
+            [
+                (TLVType.SPECIAL, bytes.fromhex(EVENT_ID)),
+                (TLVType.RELAY, b"wss://relay.damus.io"),
+                (TLVType.AUTHOR, bytes.fromhex(PUBKEY)),
+                (TLVType.KIND, struct.pack(">I", 1)),
+            ],
+        )
+        pointer = EventPointer(EVENT_ID)
+        self.assertEqual(nip19.decode(pointer.encode()), pointer)
+
+    def test_naddr(self):
+        pointer = AddressPointer("my-article", PUBKEY, 30023, ["wss://r.x.com"])
+        naddr = pointer.encode()
+        self.assertTrue(naddr.startswith("naddr1"))
+        self.assertEqual(nip19.decode(naddr), pointer)
+        pointer = AddressPointer("", PUBKEY, 0)
+        self.assertEqual(nip19.decode(pointer.encode()), pointer)
+
+    def test_nrelay(self):
+        pointer = RelayPointer("wss://relay.damus.io")
+        self.assertEqual(nip19.decode(pointer.encode()), pointer)
+
+    def test_unknown_types_are_ignored(self):
+        raw = encode_tlv(
+            [(9, b"unknown"), (TLVType.SPECIAL, bytes.fromhex(PUBKEY)), (1, b"wss://a")]
+        )
+        pointer = nip19.decode(bech32_codec.encode("nprofile", raw))
+        self.assertEqual(pointer, ProfilePointer(PUBKEY, ["wss://a"]))
+
+    def test_invalid(self):
+        naddr = bech32_codec.encode("naddr", encode_tlv([(0, b"d")]))
+        truncated = bech32_codec.encode("nevent", bytes.fromhex(EVENT_ID)[:10])
+        short_key = bech32_codec.encode("nprofile", encode_tlv([(0, b"\x01")]))
+        npub = bech32_codec.encode("npub", bytes.fromhex(PUBKEY))
+        for bech in [naddr, truncated, short_key, npub, NPROFILE[:-1] + "q"]:
+            with self.assertRaises(ValueError):
+                nip19.decode(bech)
+        with self.assertRaises(ValueError):
+            RelayPointer("wss://" + "a" * 250).encode()
+        with self.assertRaises(ValueError):
+            EventPointer(EVENT_ID[:-2]).encode()
+
+    def test_iter_tlv_is_zero_copy(self):
+        raw = encode_tlv([(0, b"abc"), (1, b"de")])
+        view = memoryview(raw)
+        values = list(iter_tlv(view))
+        self.assertEqual([bytes(v) for _, v in values], [b"abc", b"de"])
+        self.assertIs(values[0][1].obj, raw)
+
+    def test_many(self):
+        pointers = [EventPointer(EVENT_ID, kind=i) for i in range(5)] + [
+            ProfilePointer(PUBKEY)
+        ]
+        links = nip19.encode_many(pointers)
+        self.assertEqual(links[-1], nip19.encode(pointers[-1]))
+        self.assertEqual(nip19.decode_many(links), pointers)
@@ -0,0 +1,125 @@
+import unittest
+
+from pynostr.base_relay import RelayPolicy
+from pynostr.contact_list import Contact, ContactList
+from pynostr.filters import Filters, FiltersList
+from pynostr.key import PrivateKey
+from pynostr.outbox import OutboxRouter
+from pynostr.relay_list import RelayList
+from pynostr.relay_manager import RelayManager
+
+
+def relay_list_event(pubkey, write_urls, read_urls=None, created_at=None):
+    rl = RelayList()
+    for url in write_urls:
+        rl.append(url, RelayPolicy(should_read=False, should_write=True))
+    for url in read_urls or []:
+        rl.append(url, RelayPolicy(should_read=True, should_write=False))
+    event = rl.to_event()
+    event.pubkey = pubkey
+    if created_at is not None:
+        event.created_at = created_at
+    return event
+
+
+class TestOutboxRouter(unittest.TestCase):
+    def setUp(self):
+        self.authors = [PrivateKey().public_key.hex() for _ in range(4)]
+
+    def test_relay_list_roundtrip(self):
+        event = relay_list_event(
+            self.authors[0], ["wss://write.relay"], ["wss://read.relay"]
+        )
+        rl = RelayList.from_event(event)
+        self.assertEqual(rl.get_write_url_list(), ["wss://write.relay"])
+        self.assertEqual(rl.get_read_url_list(), ["wss://read.relay"])
+
+    def test_greedy_cover(self):
+        a, b, c, d = self.authors
+        router = OutboxRouter(relays_per_author=1)
+        router.add_event(relay_list_event(a, ["wss://big.relay", "wss://a.relay"]))
+        router.add_event(relay_list_event(b, ["wss://big.relay/"]))
+        router.add_event(relay_list_event(c, ["wss://big.relay", "wss://c.relay"]))
+        router.add_event(relay_list_event(d, ["wss://d.relay"], ["wss://big.relay"]))
+        routes = router.route(self.authors)
+        self.assertEqual(set(routes), {"wss://big.relay", "wss://d.relay"})
+        self.assertEqual(set(routes["wss://big.relay"]), {a, b, c})
+
+    def test_budget_and_fallback(self):
+        a, b, c, d = self.authors
+        router = OutboxRouter(
+            max_relays=1, relays_per_author=2, fallback_relays=["wss://fallback.relay"]
+        )
+        router.add_event(relay_list_event(a, ["wss://r1.relay", "wss://r2.relay"]))
+        router.add_event(relay_list_event(b, ["wss://r1.relay"]))
+        router.add_event(relay_list_event(c, ["wss://r3.relay"]))
+        routes = router.route([a, b, c, d])
+        self.assertEqual(set(routes["wss://r1.relay"]), {a, b})
+        self.assertEqual(set(routes["wss://fallback.relay"]), {c, d})
+
+    def test_newest_relay_list_wins(self):
+        a = self.authors[0]
+        router = OutboxRouter()
+        router.add_event(relay_list_event(a, ["wss://new.relay"], created_at=20))
+        router.add_event(relay_list_event(a, ["wss://old.relay"], created_at=10))
+        self.assertEqual(router.get_write_relays(a), ["wss://new.relay"])
+
+    def test_contact_list_hints(self):
+        a, b = self.authors[:2]
+        contact_list = ContactList(pubkey=a)
+        contact_list.contacts.append(Contact(b, "wss://hint.relay/"))
+        contact_list.add("wss://owner.relay", RelayPolicy())
+        router = OutboxRouter()
+        router.add_contact_list(contact_list)
+        self.assertEqual(router.get_write_relays(a), ["wss://owner.relay"])
+        self.assertEqual(router.get_write_relays(b), ["wss://hint.relay"])
+        router.add_event(relay_list_event(b, ["wss://b.relay"]))
+        self.assertEqual(router.get_write_relays(b), ["wss://b.relay"])
+
+    def test_add_subscription(self):
+        a, b = self.authors[:2]
+        router = OutboxRouter(relays_per_author=1)
+        router.add_event(relay_list_event(a, ["wss://a.relay"]))
+        router.add_event(relay_list_event(b, ["wss://b.relay"]))
+        relay_manager = RelayManager()
+        filters = FiltersList([Filters(authors=[a, b], kinds=[1], limit=10)])
+        router.add_subscription(relay_manager, "outbox", filters)
+        self.assertEqual(set(relay_manager.relays), {"wss://a.relay", "wss://b.relay"})
+        relay = relay_manager.relays["wss://a.relay"]
+        self.assertFalse(relay.policy.should_write)
+        shard = relay.subscriptions["outbox"].filtersList
+        self.assertEqual(
+            shard.to_json_array(), [{"authors": [a], "kinds": [1], "limit": 10}]
+        )
+        self.assertEqual(filters[0].authors, [a, b])
+
+    def test_add_subscription_skips_write_only_relays(self):
+        a, b, c = self.authors[:3]
+        router = OutboxRouter(
+            relays_per_author=1,
+            fallback_relays=["wss://fallback.relay", "wss://write.relay"],
+        )
+        router.add_event(relay_list_event(a, ["wss://a.relay"]))
+        router.add_event(relay_list_event(b, ["wss://b.relay"]))
+        router.add_event(relay_list_event(c, ["wss://a.relay", "wss://c.relay"]))
+        relay_manager = RelayManager()
+        relay_manager.add_relay("wss://a.relay", RelayPolicy(False, True))
+        relay_manager.add_relay("wss://write.relay", RelayPolicy(False, True))
+        filters = FiltersList([Filters(authors=[a, b, c], kinds=[1])])
+        routes = router.add_subscription(relay_manager, "outbox", filters)
+        # a is routed to the fallback relay, c to its other write relay
+        self.assertEqual(
+            routes,
+            {
+                "wss://b.relay": [b],
+                "wss://c.relay": [c],
+                "wss://fallback.relay": [a],
+            },
+        )
+        self.assertNotIn("outbox", relay_manager.relays["wss://a.relay"].subscriptions)
+        self.assertNotIn(
+            "outbox", relay_manager.relays["wss://write.relay"].subscriptions
+        )
+        self.assertIn(
+            "outbox", relay_manager.relays["wss://fallback.relay"].subscriptions
+        )
@@ -1,16 +1,63 @@
+import hashlib
+import os
+import time
 import unittest
 
 from pynostr import pow
 from pynostr.event import Event, EventKind
+from pynostr.exception import MiningException
 from pynostr.key import PrivateKey
 from pynostr.pow import Pow, PowEvent, PowKey, PowVanityKey
 
 
+def _exit_search(index, stop):
+    if index == 0:
+        os._exit(1)
+    stop.wait(30)
+    return index
+
+
+def _raise_search(stop):
+    raise ValueError("search failed")
+
+
 class TestPow(unittest.TestCase):
     def test_count_leading_zero(self):
         self.assertEqual(pow.count_leading_zero_bits("048d"), 5)
         self.assertEqual(pow.count_leading_zero_bits("ffff"), 0)
 
+    def test_leading_zero_bits(self):
+        self.assertEqual(pow.leading_zero_bits(bytes.fromhex("048d")), 5)
+        self.assertEqual(pow.leading_zero_bits(bytes(32)), 256)
+        self.assertEqual(pow.leading_zero_bits(b"\xff" * 32), 0)
+
+    def test_nonce_template(self):
+        public_key = PrivateKey().public_key.hex()
+        for tags, tag_pos in [
+            ([["nonce", "1", "20"]], 0),
+            ([["e", "a"], ["nonce", "1"], ["p", "b", 'q"\u00fc']], 1),
+        ]:
+            event = Event('multi\nline "content"', pubkey=public_key, tags=tags)
+            prefix, suffix = pow.nonce_template(event, tag_pos)
+            event.tags[tag_pos][1] = pow.format_nonce(42)
+            self.assertEqual(
+                prefix + pow.format_nonce(42).encode() + suffix, event.serialize()
+            )
+
+    def test_search_nonces(self):
+        prefix, suffix = b'[0,null,1,1,[["nonce","', b'","12"]],""]'
+        count, bits, nonce = pow.search_nonces(prefix, suffix, 12, first=995)
+        digest = hashlib.sha256(
+            prefix + pow.format_nonce(nonce).encode() + suffix
+        ).digest()
+        self.assertGreaterEqual(bits, 12)
+        self.assertEqual(pow.leading_zero_bits(digest), bits)
+        self.assertEqual(count, nonce - 995 + 1)
+        # two interleaved searches cover different nonce blocks
+        count, _, nonce = pow.search_nonces(prefix, suffix, 64, 995, 1, 2, 1500)
+        self.assertEqual(count, 1500)
+        self.assertIn(nonce // pow.NONCE_BLOCK, [1, 3])
+
     def test_mine_event(self):
         """Test mining an event with specific difficulty."""
         public_key = PrivateKey().public_key.hex()
@@ -22,6 +69,21 @@ class TestPow(unittest.TestCase):
         self.assertTrue(p.calc_difficulty(event) >= difficulty)
         self.assertTrue(p.check_difficulty(event))
 
+    def test_mine_event_parallel(self):
+        public_key = PrivateKey().public_key.hex()
+        event = Event(content="test", pubkey=public_key, kind=EventKind.TEXT_NOTE)
+        p = PowEvent(8, workers=2)
+        event = p.mine(event)
+        self.assertTrue(p.check_difficulty(event))
+        self.assertEqual(p.results[-1][1].id, event.id)
+        self.assertGreater(p.get_hashrate(), 0)
+
+        event = Event(content="test", pubkey=public_key, kind=EventKind.TEXT_NOTE)
+        p = PowEvent(64, workers=2)
+        event = p.mine(event, max_count=100)
+        self.assertEqual(p.count, 101)
+        self.assertEqual(p.results[-1][0], p.calc_difficulty(event))
+
     def test_check_difficulty_event(self):
         pow_e = Event.from_dict(
             {
@@ -47,6 +109,47 @@ class TestPow(unittest.TestCase):
         sk = p.mine()
         self.assertTrue(pow.count_leading_zero_bits(sk.public_key.hex()) >= difficulty)
 
+    def test_next_nonce(self):
+        self.assertEqual(pow.next_nonce(5, [100]), 105)
+        self.assertEqual(pow.next_nonce(0, [2000, 1000]), 3000)
+        self.assertEqual(pow.next_nonce(1500, [500, 500]), 2500)
+        p = PowEvent(64)
+        event = p.mine(Event("test"), max_count=3000, nonce=10)
+        self.assertEqual(p.next_nonce, 3010)
+        self.assertGreaterEqual(int(event.tags[0][1]), 10)
+
+    def test_key_walker(self):
+        sk = PrivateKey()
+        walker = pow.KeyWalker(sk.raw_secret)
+        self.assertEqual(walker.xonly(), sk.public_key.raw_bytes)
+        for _ in range(3):
+            xonly = walker.step()
+        self.assertEqual(walker.steps, 3)
+        self.assertEqual(PrivateKey(walker.secret).public_key.raw_bytes, xonly)
+
+    def test_search_keys(self):
+        progress = []
+        count, bits, secret = pow.search_keys(
+            8, on_progress=lambda *best: progress.append(best)
+        )
+        self.assertGreaterEqual(bits, 8)
+        self.assertEqual(progress[-1], (bits, secret))
+        self.assertEqual([b for b, _ in progress], sorted({b for b, _ in progress}))
+        public_key = PrivateKey(secret).public_key.raw_bytes
+        self.assertEqual(pow.leading_zero_bits(public_key), bits)
+
+        count, bits, secret = pow.search_keys(64, 63, max_count=100)
+        self.assertEqual(count, 100)
+        self.assertIsNone(secret)
+
+    def test_mine_key_workers(self):
+        p = PowKey(8, workers=2)
+        sk = p.mine()
+        self.assertTrue(pow.count_leading_zero_bits(sk.public_key.hex()) >= 8)
+        self.assertEqual(p.results[-1], (p.num_leading_zero_bits, sk))
+        bits = [b for b, _ in p.results]
+        self.assertEqual(bits, sorted(set(bits)))
+
     def test_time_estimates(self):
         """Test functions to estimate POW time."""
         public_key = PrivateKey().public_key.hex()
@@ -79,6 +182,29 @@ class TestPow(unittest.TestCase):
         with self.assertRaisesRegex(ValueError, "not in valid list of bech32 chars"):
             p = PowVanityKey(pattern)
 
+    def test_vanity_pattern(self):
+        sk = PrivateKey()
+        npub = sk.public_key.bech32()
+        xonly = sk.public_key.raw_bytes
+        self.assertTrue(pow.VanityPattern(npub[5:9]).matches(xonly))
+        self.assertTrue(pow.VanityPattern(suffix=npub[-3:]).matches(xonly))
+        self.assertTrue(pow.VanityPattern(suffix=npub[-10:]).matches(xonly))
+        self.assertTrue(pow.VanityPattern(npub[5:57], npub[-58:]).matches(xonly))
+        other = "q" if npub[-1] != "q" else "p"
+        self.assertFalse(pow.VanityPattern(suffix=other).matches(xonly))
+
+    def test_mine_vanity_key_limit(self):
+        p = PowVanityKey("zzzzzz")
+        self.assertIsNone(p.mine(max_count=100))
+        self.assertEqual(p.count, 100)
+        self.assertEqual(p.results, [])
+
+    def test_mine_vanity_key_workers(self):
+        p = PowVanityKey(suffix="a", workers=2)
+        sk = p.mine()
+        self.assertTrue(sk.public_key.bech32().endswith("a"))
+        self.assertEqual(p.results[-1], (p.vk, sk))
+
     def test_expected_pow_guesses(self):
         p = Pow()
         p.n_pattern = 32
@@ -89,3 +215,12 @@ class TestPow(unittest.TestCase):
         p.n_options = 16
         e2 = p.get_expected_guesses()
         self.assertEqual(e1, e2)
+
+    def test_run_workers_exit(self):
+        miner = PowKey(workers=2)
+        start = time.monotonic()
+        with self.assertRaises(MiningException):
+            miner._run_workers(_exit_search, [(0,), (1,)])
+        with self.assertRaises(MiningException):
+            miner._run_workers(_raise_search, [()])
+        self.assertLess(time.monotonic() - start, 10)
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from pynostr.event import Event
+from pynostr.pow import (
+    PowEvent,
+    PowKey,
+    PowVanityKey,
+    count_leading_zero_bits,
+    leading_zero_bits,
+)
+from pynostr.pow_job import MiningJob
+
+
+class TestMiningJob(unittest.TestCase):
+    def test_mine_event(self):
+        event = Event("test")
+        job = MiningJob(PowEvent(8), event, interval=0.05)
+        self.assertIs(asyncio.run(job.run()), event)
+        self.assertTrue(job.done)
+        self.assertTrue(count_leading_zero_bits(event.id) >= 8)
+
+    def test_event_keeps_best_nonce(self):
+        event = Event("test")
+        job = MiningJob(PowEvent(64), event, interval=0.01)
+        for _ in range(5):
+            job._mine_chunk()
+            checkpoint = job.checkpoint()
+            self.assertEqual(int(checkpoint["event"]["tags"][0][1]), job.best)
+            bits = leading_zero_bits(bytes.fromhex(event.id))
+            self.assertEqual(bits, job.best_bits)
+
+    def test_checkpoint_during_chunk(self):
+        job = MiningJob(PowEvent(64), Event("test"), interval=0.01)
+        job._mine_chunk()
+        mine = job.miner.mine
+        checkpoints = []
+
+        def mine_and_checkpoint(*args, **kwargs):
+            event = mine(*args, **kwargs)
+            checkpoints.append(job.checkpoint())
+            return event
+
+        with mock.patch.object(job.miner, "mine", mine_and_checkpoint):
+            for _ in range(3):
+                job._mine_chunk()
+        for checkpoint in checkpoints:
+            event = Event.from_dict(checkpoint["event"])
+            self.assertEqual(event.id, checkpoint["event"]["id"])
+            self.assertEqual(int(event.tags[0][1]), checkpoint["best"])
+
+    def test_progress(self):
+        async def mine():
+            job = MiningJob(PowKey(256), interval=0.02)
+            progress = []
+            async for p in job.progress():
+                progress.append(p)
+                if len(progress) == 2:
+                    await job.cancel()
+            return job, progress
+
+        job, progress = asyncio.run(mine())
+        self.assertTrue(job.task.cancelled())
+        self.assertEqual(len(progress), 2)
+        self.assertGreater(progress[1].count, progress[0].count)
+        self.assertGreater(progress[1].hashrate, 0)
+        self.assertGreater(progress[1].expected_time, 0)
+        self.assertGreaterEqual(progress[1].best_bits, progress[0].best_bits)
+        self.assertFalse(progress[1].done)
+
+    def test_event_loop_is_not_blocked(self):
+        async def mine():
+            job = MiningJob(PowEvent(64), Event("test"), interval=0.2)
+            job.start()
+            ticks = 0
+            for _ in range(5):
+                await asyncio.sleep(0.01)
+                ticks += 1
+            await job.cancel()
+            return ticks
+
+        self.assertEqual(asyncio.run(mine()), 5)
+
+    def test_resume_event(self):
+        async def mine():
+            job = MiningJob(PowEvent(64), Event("test"), interval=0.05)
+            job.start()
+            await asyncio.sleep(0.1)
+            await job.cancel()
+            return job
+
+        job = asyncio.run(mine())
+        checkpoint = job.checkpoint()
+        self.assertGreater(checkpoint["nonce"], 0)
+        self.assertEqual(checkpoint["count"], job.miner.count)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "job.json")
+            job.save(path)
+            resumed = MiningJob.load(path, interval=0.05)
+        self.assertEqual(resumed.nonce, checkpoint["nonce"])
+        self.assertEqual(resumed.best, checkpoint["best"])
+        self.assertEqual(resumed.miner.count, checkpoint["count"])
+        self.assertEqual(resumed.event.tags, job.event.tags)
+
+        resumed.miner.set_difficulty(4)
+        event = asyncio.run(resumed.run())
+        # the search continued after the checkpoint, the event has the best
+        # nonce of before and after it
+        self.assertGreater(resumed.nonce, checkpoint["nonce"])
+        self.assertEqual(int(event.tags[0][1]), resumed.best)
+        self.assertGreaterEqual(resumed.best_bits, checkpoint["best_bits"])
+
+    def test_resume_key(self):
+        job = MiningJob(PowKey(8), interval=0.05)
+        sk = asyncio.run(job.run())
+        resumed = MiningJob.resume(job.checkpoint())
+        self.assertTrue(resumed.done)
+        self.assertEqual(resumed.result, sk)
+        self.assertEqual(resumed.miner.sk, sk)
+
+    def test_mine_vanity_key(self):
+        job = MiningJob(PowVanityKey(suffix="a"), interval=0.05)
+        sk = asyncio.run(job.run())
+        self.assertTrue(sk.public_key.bech32().endswith("a"))
+        resumed = MiningJob.resume(job.checkpoint())
+        self.assertEqual(resumed.result, sk)
+
+    def test_event_job_needs_event(self):
+        with self.assertRaises(ValueError):
+            MiningJob(PowEvent(8))
@@ -0,0 +1,157 @@
+import json
+import unittest
+
+from pynostr.event import Event
+from pynostr.key import PrivateKey
+from pynostr.message_pool import OKMessage
+from pynostr.publish import PublishHandle
+from pynostr.relay_manager import RelayManager
+
+
+class TestPublishHandle(unittest.TestCase):
+    def setUp(self):
+        self.sent = []
+        self.scheduled = []
+
+    def _publish(self, url, message):
+        self.sent.append(url)
+
+    def _schedule(self, delay, callback):
+        self.scheduled.append(callback)
+
+    def _handle(self, urls, **kwargs):
+        return PublishHandle(
+            "abc", "message", self._publish, urls, schedule=self._schedule, **kwargs
+        )
+
+    def test_k_of_n(self):
+        handle = self._handle(["ws://r1", "ws://r2", "ws://r3"], min_acks=2)
+        self.assertEqual(self.sent, ["ws://r1", "ws://r2", "ws://r3"])
+        handle.on_ok(OKMessage("abc", True, "", "ws://r1"))
+        self.assertFalse(handle.done())
+        handle.on_ok(OKMessage("other", True, "", "ws://r2"))
+        self.assertFalse(handle.done())
+        handle.on_ok(OKMessage("abc", "true", "", "ws://r2"))
+        self.assertTrue(handle.done())
+        self.assertTrue(handle.wait(0))
+        self.assertEqual(handle.accepted, ["ws://r1", "ws://r2"])
+        self.assertEqual(handle.pending, ["ws://r3"])
+        self.assertEqual(set(handle.latencies), {"ws://r1", "ws://r2"})
+        self.assertTrue(handle.statuses["ws://r1"].future.result(0).accepted)
+
+    def test_rejected(self):
+        handle = self._handle(["ws://r1", "ws://r2"], min_acks=2)
+        handle.on_ok(OKMessage("abc", False, "blocked: not on white-list", "ws://r1"))
+        self.assertTrue(handle.done())
+        self.assertFalse(handle.wait(0))
+        self.assertEqual(handle.rejected, ["ws://r1"])
+
+    def test_retry_transient_failure(self):
+        handle = self._handle(["ws://r1"], max_retries=1)
+        handle.on_ok(OKMessage("abc", False, "rate-limited: slow down", "ws://r1"))
+        self.assertEqual(self.sent, ["ws://r1", "ws://r1"])
+        self.assertFalse(handle.done())
+        handle.on_ok(OKMessage("abc", False, "rate-limited: slow down", "ws://r1"))
+        self.assertTrue(handle.done())
+        self.assertFalse(handle.wait(0))
+        self.assertEqual(handle.statuses["ws://r1"].attempts, 2)
+
+    def test_timeout(self):
+        handle = self._handle(["ws://r1"], max_retries=1)
+        self.assertEqual(len(self.scheduled), 1)
+        self.scheduled[0]()
+        self.assertEqual(self.sent, ["ws://r1", "ws://r1"])
+        # the timer of the first attempt must not finish the second one
+        self.scheduled[0]()
+        self.assertFalse(handle.done())
+        self.scheduled[1]()
+        self.assertTrue(handle.done())
+        self.assertTrue(handle.statuses["ws://r1"].timed_out)
+
+    def test_no_relays(self):
+        handle = self._handle([])
+        self.assertTrue(handle.done())
+        self.assertFalse(handle.wait(0))
+
+
+class TestRelayManagerPublish(unittest.TestCase):
+    def test_publish_event_handle(self):
+        pk = PrivateKey()
+        event = Event("Hello, world!")
+        event.sign(pk.hex())
+
+        relay_manager = RelayManager()
+        relay_manager.add_relay("ws://fake-relay1")
+        relay_manager.add_relay("ws://fake-relay2")
+        handle = relay_manager.publish_event(event, min_acks=2, timeout=0)
+        for relay in relay_manager.relays.values():
+            self.assertEqual(relay.outgoing_messages.get(), event.to_message())
+
+        relay = relay_manager.relays["ws://fake-relay1"]
+        relay._on_message(json.dumps(["OK", event.id, True, ""]))
+        self.assertFalse(handle.done())
+        relay = relay_manager.relays["ws://fake-relay2"]
+        relay._on_message(json.dumps(["OK", event.id, True, "duplicate:"]))
+        self.assertTrue(handle.wait(0))
+        self.assertNotIn(event.id, relay_manager.publish_handles)
+        # OK messages are still available in the message pool
+        self.assertEqual(len(relay_manager.message_pool.get_all_ok()), 2)
+
+    def test_relay_statuses_after_quorum(self):
+        pk = PrivateKey()
+        event = Event("Hello, world!")
+        event.sign(pk.hex())
+
+        relay_manager = RelayManager()
+        urls = ["ws://fake-relay1", "ws://fake-relay2", "ws://fake-relay3"]
+        for url in urls:
+            relay_manager.add_relay(url)
+        handle = relay_manager.publish_event(event, min_acks=1, timeout=0)
+        relay_manager.relays[urls[0]]._on_message(
+            json.dumps(["OK", event.id, True, ""])
+        )
+        self.assertTrue(handle.wait(0))
+        # the handle still receives the OKs of the other relays
+        self.assertIn(event.id, relay_manager.publish_handles)
+        relay_manager.relays[urls[1]]._on_message(
+            json.dumps(["OK", event.id, True, ""])
+        )
+        status = handle.statuses[urls[1]]
+        self.assertTrue(status.future.done())
+        self.assertTrue(status.accepted)
+        self.assertIsNotNone(status.latency)
+        relay_manager._expire_publish_handles()
+        status = handle.statuses[urls[2]]
+        self.assertTrue(status.future.done())
+        self.assertTrue(status.timed_out)
+        self.assertEqual(relay_manager.publish_handles, {})
+
+    def test_run_sync_expires_pending_relays(self):
+        pk = PrivateKey()
+        event = Event("Hello, world!")
+        event.sign(pk.hex())
+
+        relay_manager = RelayManager(timeout=0.1)
+        relay_manager.add_relay("ws://127.0.0.1:1")
+        handle = relay_manager.publish_event(event, timeout=10)
+        relay_manager.run_sync()
+        self.assertFalse(handle.wait(0))
+        self.assertTrue(handle.statuses["ws://127.0.0.1:1"].timed_out)
+        self.assertEqual(relay_manager.publish_handles, {})
+
+    def test_publish_event_twice(self):
+        pk = PrivateKey()
+        event = Event("Hello, world!")
+        event.sign(pk.hex())
+
+        relay_manager = RelayManager()
+        relay_manager.add_relay("ws://fake-relay1")
+        first = relay_manager.publish_event(event, timeout=0)
+        second = relay_manager.publish_event(event, timeout=0)
+        self.assertEqual(len(relay_manager.publish_handles[event.id]), 2)
+        relay = relay_manager.relays["ws://fake-relay1"]
+        relay._on_message(json.dumps(["OK", event.id, True, ""]))
+        # the OK reaches both handles
+        self.assertTrue(first.wait(0))
+        self.assertTrue(second.wait(0))
+        self.assertEqual(relay_manager.publish_handles, {})
@@ -0,0 +1,118 @@
+import asyncio
+import time
+import unittest
+
+from tornado.ioloop import IOLoop
+
+from pynostr.event import Event
+from pynostr.filters import Filters, FiltersList
+from pynostr.key import PrivateKey
+from pynostr.local_relay import LocalRelay
+from pynostr.message_pool import EndOfStoredEventsMessage, EventMessage
+from pynostr.query import Query
+from pynostr.relay_manager import RelayManager
+
+
+class TestQuery(unittest.TestCase):
+    def setUp(self):
+        self.closed = []
+        self.pk = PrivateKey()
+
+    def _event_message(self, url, created_at=1000, sub="sub"):
+        event = Event(f"note {created_at}", created_at=created_at)
+        event.sign(self.pk.hex())
+        return EventMessage(event, sub, url)
+
+    def test_limit(self):
+        query = Query("sub", ["ws://r1", "ws://r2"], self.closed.append, limit=1)
+        query.on_event(self._event_message("ws://r1", sub="other"))
+        self.assertFalse(query.done())
+        event_message = self._event_message("ws://r2")
+        query.on_event(event_message)
+        self.assertTrue(query.done())
+        self.assertEqual(query.wait(0), [event_message.event])
+        self.assertEqual(self.closed, ["ws://r1", "ws://r2"])
+
+    def test_eose_quorum(self):
+        query = Query(
+            "sub", ["ws://r1", "ws://r2", "ws://r3"], self.closed.append, eose_quorum=2
+        )
+        old = self._event_message("ws://r1", 1000)
+        new = self._event_message("ws://r2", 2000)
+        query.on_event(old)
+        query.on_eose(EndOfStoredEventsMessage("sub", "ws://r1"))
+        query.on_event(new)
+        query.on_event(self._event_message("ws://r2", 1000))
+        self.assertFalse(query.done())
+        query.on_eose(EndOfStoredEventsMessage("sub", "ws://r2"))
+        self.assertTrue(query.done())
+        self.assertEqual(query.newest(), new.event)
+        self.assertEqual(len(query.events), 2)
+        self.assertEqual(query.sources[old.event.id], ["ws://r1", "ws://r2"])
+
+    def test_stop_failed_and_timeout(self):
+        query = Query(
+            "sub", ["ws://r1"], self.closed.append, stop=lambda e: e.created_at > 1500
+        )
+        query.on_event(self._event_message("ws://r1", 1000))
+        self.assertFalse(query.done())
+        query.on_event(self._event_message("ws://r1", 2000))
+        self.assertTrue(query.done())
+
+        query = Query("sub", ["ws://r1", "ws://r2"], self.closed.append)
+        query.on_relay_failed("ws://r1")
+        query.on_eose(EndOfStoredEventsMessage("sub", "ws://r2"))
+        self.assertTrue(query.done())
+
+        scheduled = []
+        query = Query(
+            "sub",
+            ["ws://r1"],
+            self.closed.append,
+            schedule=lambda delay, callback: scheduled.append(callback),
+        )
+        scheduled[0]()
+        self.assertTrue(query.done())
+        self.assertTrue(query.timed_out)
+
+
+class TestRelayManagerQuery(unittest.TestCase):
+    def setUp(self):
+        self.old_loop = asyncio.get_event_loop()
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        self.io_loop = IOLoop.current()
+        pk = PrivateKey()
+        self.event = Event("Hello query")
+        self.event.sign(pk.hex())
+        self.fast_relay = LocalRelay().listen(self.io_loop)
+        self.slow_relay = LocalRelay(latency=5).listen(self.io_loop)
+        for relay in [self.fast_relay, self.slow_relay]:
+            relay.add_event(self.event)
+
+    def tearDown(self):
+        self.fast_relay.stop()
+        self.slow_relay.stop()
+        self.io_loop.close(all_fds=True)
+        asyncio.set_event_loop(self.old_loop)
+
+    def test_first_result(self):
+        relay_manager = RelayManager()
+        relay_manager.add_relay(self.fast_relay.url)
+        relay_manager.add_relay(self.slow_relay.url)
+        filters = FiltersList([Filters(ids=[self.event.id])])
+        start = time.monotonic()
+        events = relay_manager.run_query(filters, limit=1)
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual([e.id for e in events], [self.event.id])
+        self.assertEqual(relay_manager.queries, {})
+        for relay in relay_manager.relays.values():
+            self.assertEqual(relay.subscriptions, {})
+
+    def test_unreachable_relay(self):
+        relay_manager = RelayManager(error_threshold=0)
+        relay_manager.add_relay(self.fast_relay.url)
+        relay_manager.add_relay("ws://127.0.0.1:9")
+        start = time.monotonic()
+        events = relay_manager.run_query(FiltersList([Filters()]))
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(len(events), 1)
@@ -0,0 +1,79 @@
+import json
+import unittest
+import uuid
+
+from pynostr.event import Event
+from pynostr.filters import FiltersList
+from pynostr.key import PrivateKey
+from pynostr.relay_health import RelayHealth, RelayHealthTracker
+from pynostr.relay_manager import RelayManager
+
+
+class TestRelayHealth(unittest.TestCase):
+    def test_counters(self):
+        health = RelayHealth("ws://relay")
+        self.assertEqual(health.reliability, 0.5)
+        health.record_connect(0.2)
+        health.record_connect(0.4)
+        self.assertAlmostEqual(health.connect_latency, 0.26)
+        health.record_event()
+        health.record_event(duplicate=True)
+        self.assertEqual(health.duplicate_ratio, 0.5)
+        self.assertEqual(health.unique_events, 1)
+        health.record_ok(True)
+        health.record_ok(False)
+        self.assertEqual(health.ok_rejection_rate, 0.5)
+
+    def test_rank(self):
+        tracker = RelayHealthTracker()
+        tracker["ws://slow"].record_connect(2)
+        tracker["ws://slow"].record_eose(3)
+        tracker["ws://fast"].record_connect(0.1)
+        tracker["ws://fast"].record_eose(0.2)
+        tracker["ws://dead"].record_error()
+        tracker["ws://dead"].record_timeout()
+        tracker["ws://new"]
+        urls = ["ws://dead", "ws://slow", "ws://new", "ws://fast"]
+        self.assertEqual(
+            tracker.rank(urls), ["ws://fast", "ws://slow", "ws://new", "ws://dead"]
+        )
+        self.assertEqual(tracker.best(urls, 1, write=True), ["ws://fast"])
+
+    def test_dict_roundtrip(self):
+        tracker = RelayHealthTracker()
+        tracker["ws://relay"].record_connect(0.5)
+        got = RelayHealthTracker.from_dict(json.loads(json.dumps(tracker.to_dict())))
+        self.assertEqual(got, tracker)
+
+
+class TestRelayManagerHealth(unittest.TestCase):
+    def test_health_from_messages(self):
+        pk = PrivateKey()
+        event = Event("Hello, world!")
+        event.sign(pk.hex())
+        relay_manager = RelayManager()
+        for url in ["ws://relay1", "ws://relay2", "ws://relay3"]:
+            relay_manager.add_relay(url)
+        subscription_id = uuid.uuid1().hex
+        relay_manager.add_subscription_on_all_relays(subscription_id, FiltersList())
+
+        for url in ["ws://relay2", "ws://relay3"]:
+            relay = relay_manager.relays[url]
+            relay._on_connected(0.1)
+            relay._on_message(json.dumps(["EVENT", subscription_id, event.to_dict()]))
+            relay._on_message(json.dumps(["EOSE", subscription_id]))
+            relay._on_message(json.dumps(["OK", event.id, url == "ws://relay3", ""]))
+
+        health = relay_manager.health_tracker
+        self.assertEqual(health["ws://relay2"].unique_events, 1)
+        self.assertEqual(health["ws://relay3"].duplicates, 1)
+        self.assertEqual(health["ws://relay3"].eose_count, 1)
+        self.assertEqual(health["ws://relay2"].ok_rejected, 1)
+        self.assertEqual(relay_manager.get_best_relays(1), ["ws://relay2"])
+        self.assertEqual(relay_manager.get_best_relays(1, write=True), ["ws://relay3"])
+
+        relay_manager.add_subscription_on_best_relays("best", FiltersList(), 2)
+        self.assertNotIn("best", relay_manager.relays["ws://relay1"].subscriptions)
+
+        handle = relay_manager.publish_event(event, timeout=0, max_relays=1)
+        self.assertEqual(list(handle.statuses), ["ws://relay3"])
@@ -0,0 +1,137 @@
+import json
+import socket
+import threading
+import time
+import unittest
+import uuid
+from unittest import mock
+
+from websocket import ABNF, WebSocket
+
+from pynostr.event import Event
+from pynostr.filters import Filters, FiltersList
+from pynostr.key import PrivateKey
+from pynostr.local_relay import LocalRelay
+from pynostr.message_pool import MessagePool
+from pynostr.selector_relay import RelaySelector, SelectorRelay, parse_frames
+from pynostr.selector_relay_manager import SelectorRelayManager
+
+
+def wait_for(condition, timeout=5):
+    start = time.monotonic()
+    while not condition() and time.monotonic() - start < timeout:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestSelectorRelayManager(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.relay = LocalRelay().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.relay.stop()
+
+    def test_subscription_and_publish(self):
+        pk = PrivateKey()
+        event = Event("Hello selector")
+        event.sign(pk.hex())
+        self.relay.add_event(event)
+
+        relay_manager = SelectorRelayManager()
+        urls = [f"{self.relay.url}/?{i}" for i in range(5)]
+        for url in urls:
+            relay_manager.add_relay(url)
+        self.assertTrue(
+            wait_for(lambda: all(relay_manager.connection_statuses.values()))
+        )
+
+        subscription_id = uuid.uuid1().hex
+        filters = FiltersList([Filters(authors=[pk.public_key.hex()])])
+        relay_manager.add_subscription_on_all_relays(subscription_id, filters)
+        relay_manager.publish_event(event)
+        message_pool = relay_manager.message_pool
+        self.assertTrue(wait_for(lambda: message_pool.eose_notices.qsize() == 5))
+        self.assertTrue(wait_for(lambda: message_pool.ok_notices.qsize() == 5))
+        events = message_pool.get_all_events()
+        self.assertEqual(len(events), 5)
+        self.assertEqual({e.url for e in events}, set(urls))
+        self.assertTrue(all(e.event.id == event.id for e in events))
+
+        relay_manager.remove_relay(urls[0])
+        self.assertNotIn(urls[0], relay_manager.connection_statuses)
+        relay_manager.stop()
+
+    def test_thread_count_is_constant(self):
+        threads_before = threading.active_count()
+        relay_manager = SelectorRelayManager(max_workers=2, max_connect_workers=2)
+        for i in range(50):
+            # nothing is listening on port 9 (discard)
+            relay_manager.add_relay(f"ws://127.0.0.1:9/?{i}")
+        relay_manager.publish_message(json.dumps(["CLOSE", "test"]))
+        time.sleep(0.5)
+        self.assertLessEqual(threading.active_count() - threads_before, 5)
+        self.assertFalse(any(relay_manager.connection_statuses.values()))
+        relay_manager.stop()
+
+
+def frame(data: bytes, opcode=ABNF.OPCODE_TEXT, fin=1) -> bytes:
+    return ABNF(fin, 0, 0, 0, opcode, 0, data).format()
+
+
+class TestSelectorRelay(unittest.TestCase):
+    def setUp(self):
+        self.selector = RelaySelector(max_workers=1, max_connect_workers=1)
+        self.relay = SelectorRelay("ws://relay", MessagePool(), self.selector)
+
+    def tearDown(self):
+        self.selector.stop()
+
+    def test_parse_frames(self):
+        data = (
+            frame(b"a" * 200) + ABNF.create_frame("masked", ABNF.OPCODE_TEXT).format()
+        )
+        frames, used = parse_frames(data + frame(b"partial")[:4])
+        self.assertEqual(used, len(data))
+        self.assertEqual(
+            frames,
+            [(True, ABNF.OPCODE_TEXT, b"a" * 200), (True, ABNF.OPCODE_TEXT, b"masked")],
+        )
+
+    def test_partial_frame_does_not_block(self):
+        local, remote = socket.socketpair()
+        self.addCleanup(remote.close)
+        local.settimeout(2)
+        ws = WebSocket()
+        ws.sock = local
+        self.relay.ws = ws
+        self.relay.connected = True
+        data = frame(b'["NOTICE", "hello"]')
+        remote.sendall(data[:5])
+        start = time.monotonic()
+        self.assertEqual(self.relay._read_messages(), ([], True))
+        self.assertLess(time.monotonic() - start, 1)
+        remote.sendall(data[5:] + frame(b'["NOTICE", ', fin=0))
+        remote.sendall(frame(b'"world"]', ABNF.OPCODE_CONT))
+        messages, alive = self.relay._read_messages()
+        self.assertEqual(messages, ['["NOTICE", "hello"]', '["NOTICE", "world"]'])
+        self.assertTrue(alive)
+        self.assertEqual(local.gettimeout(), 2)
+        remote.close()
+        self.assertEqual(self.relay._read_messages(), ([], False))
+
+    def test_handshake_after_remove(self):
+        self.selector.running = True
+        ws = mock.Mock()
+        self.selector.remove_relay(self.relay)
+        self.assertFalse(self.selector._accept(self.relay, ws))
+        self.assertIsNone(self.relay.ws)
+
+    def test_stop_closes_late_handshakes(self):
+        self.selector.running = True
+        ws = mock.Mock()
+        self.assertTrue(self.selector._accept(self.relay, ws))
+        self.selector.stop()
+        ws.close.assert_called_once()
+        self.assertIsNone(self.relay.ws)
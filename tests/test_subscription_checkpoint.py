@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+import unittest
+
+from pynostr.event import Event
+from pynostr.filters import Filters, FiltersList
+from pynostr.key import PrivateKey
+from pynostr.relay_manager import RelayManager
+from pynostr.subscription_checkpoint import HighWaterMark, SubscriptionCheckpoint
+
+
+class TestSubscriptionCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.pk = PrivateKey()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "checkpoint.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _event(self, created_at):
+        event = Event(f"note {created_at} {os.urandom(4).hex()}", created_at=created_at)
+        event.sign(self.pk.hex())
+        return event
+
+    def _message(self, subscription_id, event):
+        return json.dumps(["EVENT", subscription_id, event.to_dict()])
+
+    def test_high_water_mark(self):
+        mark = HighWaterMark()
+        old, new, same = self._event(10), self._event(20), self._event(20)
+        for event in [new, old, same]:
+            mark.add(event)
+        self.assertEqual(mark.created_at, 20)
+        self.assertEqual(mark.ids, [new.id, same.id])
+        self.assertFalse(mark.contains(old))
+        self.assertTrue(mark.contains(new))
+        self.assertFalse(mark.contains(self._event(20)))
+
+    def test_mark_advances_after_eose(self):
+        checkpoint = SubscriptionCheckpoint(self.path, save_interval=0)
+        checkpoint.record_event("sub", "ws://relay", self._event(20))
+        self.assertIsNone(checkpoint.get("sub", "ws://relay"))
+        checkpoint.record_eose("sub", "ws://relay")
+        self.assertEqual(checkpoint.get("sub", "ws://relay").created_at, 20)
+        live = self._event(30)
+        checkpoint.record_event("sub", "ws://relay", live)
+        self.assertEqual(checkpoint.get("sub", "ws://relay").ids, [live.id])
+        self.assertFalse(checkpoint.is_new("sub", "ws://relay", live))
+        self.assertTrue(checkpoint.is_new("sub", "ws://other", live))
+        # a live event can arrive late or with a skewed clock
+        late = self._event(25)
+        self.assertTrue(checkpoint.is_new("sub", "ws://relay", late))
+        checkpoint.record_event("sub", "ws://relay", late)
+        self.assertEqual(checkpoint.get("sub", "ws://relay").created_at, 30)
+
+        loaded = SubscriptionCheckpoint(self.path)
+        self.assertEqual(loaded.marks, checkpoint.marks)
+
+    def test_resume(self):
+        url = "ws://fake.relay"
+        first = self._event(100)
+        checkpoint = SubscriptionCheckpoint(self.path)
+        relay_manager = RelayManager()
+        relay_manager.add_relay(url)
+        filters = FiltersList([Filters(kinds=[1], since=50)])
+        checkpoint.add_subscription(relay_manager, "mentions", filters)
+        relay = relay_manager.relays[url]
+        relay._on_message(self._message("mentions", first))
+        relay._on_message(json.dumps(["EOSE", "mentions"]))
+        checkpoint.save()
+
+        # restart
+        checkpoint = SubscriptionCheckpoint(self.path)
+        relay_manager = RelayManager()
+        relay_manager.add_relay(url)
+        checkpoint.add_subscription(relay_manager, "mentions", filters)
+        relay = relay_manager.relays[url]
+        request = json.loads(relay.outgoing_messages.get())
+        self.assertEqual(request[2]["since"], 100)
+        self.assertEqual(filters[0].since, 50)
+        self.assertFalse(checkpoint.is_new("mentions", url, first))
+        self.assertTrue(checkpoint.is_new("mentions", url, self._event(100)))
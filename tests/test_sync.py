@@ -0,0 +1,125 @@
+import asyncio
+import os
+import unittest
+
+from tornado.ioloop import IOLoop
+
+from pynostr.event import Event
+from pynostr.filters import Filters
+from pynostr.key import PrivateKey
+from pynostr.local_relay import LocalRelay
+from pynostr.message_pool import EventMessage, EventMessageStore
+from pynostr.negentropy import (
+    Negentropy,
+    NegentropyStorage,
+    _Reader,
+    encode_varint,
+)
+from pynostr.sync import Sync
+
+
+def reconcile(client_items, relay_items, frame_size_limit=0):
+    client, relay = NegentropyStorage(), NegentropyStorage()
+    for created_at, event_id in client_items:
+        client.insert(created_at, event_id)
+    for created_at, event_id in relay_items:
+        relay.insert(created_at, event_id)
+    client = Negentropy(client, frame_size_limit)
+    relay = Negentropy(relay, frame_size_limit)
+    message = client.initiate()
+    rounds = 0
+    while message is not None:
+        message = client.reconcile(relay.reconcile(message))
+        rounds += 1
+    return client, rounds
+
+
+class TestNegentropy(unittest.TestCase):
+    def test_varint(self):
+        for n in [0, 1, 127, 128, 300, 2**32, 2**64 - 1]:
+            self.assertEqual(_Reader(encode_varint(n)).read_varint(), n)
+        self.assertEqual(encode_varint(128), b"\x81\x00")
+
+    def test_reconcile(self):
+        common = [(1000 + i // 3, os.urandom(32).hex()) for i in range(2000)]
+        have = [(1000 + i, os.urandom(32).hex()) for i in range(20)]
+        need = [(990 + i, os.urandom(32).hex()) for i in range(30)]
+        for frame_size_limit in [0, 4096]:
+            client, _ = reconcile(common + have, common + need, frame_size_limit)
+            self.assertEqual(set(client.have_ids), {i for _, i in have})
+            self.assertEqual(set(client.need_ids), {i for _, i in need})
+
+    def test_equal_and_empty(self):
+        items = [(1000 + i, os.urandom(32).hex()) for i in range(100)]
+        client, rounds = reconcile(items, items)
+        self.assertEqual(rounds, 1)
+        self.assertEqual(client.need_ids, [])
+        client, _ = reconcile([], items)
+        self.assertEqual(len(client.need_ids), 100)
+
+
+class TestSync(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        pk = PrivateKey()
+        cls.events = []
+        for i in range(120):
+            event = Event(f"note {i}", created_at=1000 + i // 4)
+            event.sign(pk.hex())
+            cls.events.append(event)
+
+    def setUp(self):
+        self.old_loop = asyncio.get_event_loop()
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        self.io_loop = IOLoop.current()
+        self.relays = []
+        # the local store has 90 of the relay events and 20 unknown to it
+        self.store = EventMessageStore(
+            [EventMessage(e, "", "") for e in self.events[10:]]
+        )
+
+    def local_relay(self, negentropy):
+        relay = LocalRelay(negentropy=negentropy).listen(self.io_loop)
+        for event in self.events[:100]:
+            relay.add_event(event)
+        self.relays.append(relay)
+        return relay
+
+    def tearDown(self):
+        for relay in self.relays:
+            relay.stop()
+        self.io_loop.close(all_fds=True)
+        asyncio.set_event_loop(self.old_loop)
+
+    def test_negentropy_sync(self):
+        relay = self.local_relay(negentropy=True)
+        url = relay.url
+        sync = Sync(
+            [url], Filters(), store=self.store, ids_batch_size=4, io_loop=self.io_loop
+        )
+        sync.run()
+        result = sync.results[url]
+        self.assertTrue(sync.done)
+        self.assertTrue(result.negentropy)
+        self.assertEqual(set(result.need_ids), {e.id for e in self.events[:10]})
+        self.assertEqual(set(result.have_ids), {e.id for e in self.events[100:]})
+        self.assertEqual(result.fetched, 10)
+        self.assertEqual(len(self.store), 120)
+        # only the missing events are downloaded
+        requested_ids = [
+            i for filters in relay.requests for f in filters for i in f.get("ids", [])
+        ]
+        self.assertEqual(sorted(requested_ids), sorted(result.need_ids))
+
+    def test_fallback_to_backfill(self):
+        relay = self.local_relay(negentropy=False)
+        url = relay.url
+        sync = Sync(
+            [url], Filters(), store=self.store, page_size=30, io_loop=self.io_loop
+        )
+        sync.run()
+        result = sync.results[url]
+        self.assertFalse(result.negentropy)
+        self.assertTrue(sync.done)
+        self.assertEqual(len(self.store), 120)
+        self.assertEqual({e.event.id for e in self.store}, {e.id for e in self.events})
@@ -0,0 +1,77 @@
+import json
+import unittest
+
+from pynostr.base_relay import BaseRelay, RelayPolicy
+from pynostr.event import Event
+from pynostr.filters import Filters, FiltersList
+from pynostr.key import PrivateKey
+from pynostr.message_pool import MessagePool
+from pynostr.relay_manager import RelayManager
+from pynostr.tracing import Stage, TimingCollector, Tracer
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        self.url = "wss://test.test"
+        self.message_pool = MessagePool()
+        self.relay = BaseRelay(self.url, RelayPolicy(), self.message_pool)
+        self.relay.add_subscription("sub", FiltersList([Filters(kinds=[1])]))
+        self.pk = PrivateKey()
+
+    def _event_message(self, content="note", kind=1):
+        event = Event(content, kind=kind)
+        event.sign(self.pk.hex())
+        return json.dumps(["EVENT", "sub", event.to_dict()])
+
+    def test_stages(self):
+        tracer = TimingCollector()
+        self.relay.tracer = tracer
+        self.relay._on_message(self._event_message())
+        self.relay._on_message(json.dumps(["EOSE", "sub"]))
+        summary = tracer.summary()[self.url]
+        for stage in [Stage.VALIDATE, Stage.VERIFY, Stage.MATCH, Stage.ENQUEUE]:
+            self.assertEqual(summary[stage]["count"], 1)
+        # the EOSE is parsed as well
+        self.assertEqual(summary[Stage.PARSE]["count"], 2)
+        self.assertNotIn(Stage.DEQUEUE, summary)
+
+        event_message = self.message_pool.get_event()
+        self.assertIsNotNone(event_message.trace)
+        self.assertEqual(event_message.trace.message_type, "EVENT")
+        self.assertEqual(event_message.trace.event_id, event_message.event.id)
+        self.assertEqual(tracer.summary()[self.url][Stage.DEQUEUE]["count"], 1)
+        self.assertEqual(tracer.slowest(Stage.VERIFY), self.url)
+        self.assertIsNone(tracer.slowest("unknown"))
+
+    def test_dropped(self):
+        traces = []
+
+        class ListTracer(Tracer):
+            def on_trace(self, trace):
+                traces.append(trace)
+
+        self.relay.tracer = ListTracer()
+        # filtered out by kinds
+        self.relay._on_message(self._event_message(kind=7))
+        self.relay._on_message("not json")
+        self.assertEqual([t.dropped for t in traces], [True, True])
+        self.assertEqual(
+            list(traces[0].durations()), [Stage.PARSE, Stage.VALIDATE, Stage.VERIFY]
+        )
+        self.assertEqual(traces[1].durations(), {})
+        self.assertFalse(self.message_pool.has_events())
+
+    def test_sampling_and_disabled(self):
+        tracer = TimingCollector(sample_rate=0)
+        self.relay.tracer = tracer
+        self.relay._on_message(self._event_message("sampled"))
+        self.assertEqual(tracer.summary(), {})
+        self.relay.tracer = None
+        self.relay._on_message(self._event_message("untraced"))
+        self.assertIsNone(self.message_pool.get_event().trace)
+
+    def test_relay_manager(self):
+        tracer = TimingCollector()
+        relay_manager = RelayManager(tracer=tracer)
+        relay_manager.add_relay("wss://relay.test")
+        self.assertIs(relay_manager.relays["wss://relay.test"].tracer, tracer)
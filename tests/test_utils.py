@@ -1,8 +1,7 @@
 import binascii
 import unittest
 
-import tlv8
-
+from pynostr.nip19 import encode_tlv, iter_tlv
 from pynostr.utils import (
     bech32_decode,
     bech32_encode,
@@ -38,15 +37,15 @@ class TestUtils(unittest.TestCase):
         relay2 = "wss://djbas.sadkb.com"
         decode = bytes(bech32_decode(nprofile))
 
-        data = tlv8.deep_decode(decode)
-        self.assertEqual(data[0].type_id, 0)
-        self.assertEqual(binascii.hexlify(data[0].data).decode(), pub_key)
+        data = list(iter_tlv(decode))
+        self.assertEqual(data[0][0], 0)
+        self.assertEqual(data[0][1].hex(), pub_key)
 
-        self.assertEqual(data[1].type_id, 1)
-        self.assertEqual(data[1].data.decode(), relay1)
+        self.assertEqual(data[1][0], 1)
+        self.assertEqual(str(data[1][1], "utf-8"), relay1)
 
-        self.assertEqual(data[2].type_id, 1)
-        self.assertEqual(data[2].data.decode(), relay2)
+        self.assertEqual(data[2][0], 1)
+        self.assertEqual(str(data[2][1], "utf-8"), relay2)
 
         pubkey, relays = nprofile_decode(nprofile)
         self.assertEqual(pubkey, pub_key)
@@ -55,15 +54,11 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(relays[1], relay2)
 
         structure = [
-            tlv8.Entry(0, binascii.unhexlify(pub_key)),
-            tlv8.Entry(1, relay1.encode()),
-            tlv8.Entry(1, relay2.encode()),
+            (0, binascii.unhexlify(pub_key)),
+            (1, relay1.encode()),
+            (1, relay2.encode()),
         ]
-        bytes_data = tlv8.encode(structure)
-
-        bytes_data = b""
-        for entry in structure:
-            bytes_data += entry.encode()
+        bytes_data = encode_tlv(structure)
 
         self.assertEqual(bech32_encode(bytes_data, "nprofile"), nprofile)
         self.assertEqual(nprofile_encode(pub_key, [relay1, relay2]), nprofile)
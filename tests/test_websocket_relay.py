@@ -0,0 +1,52 @@
+import time
+import unittest
+from threading import Thread
+from unittest import mock
+
+from pynostr.message_pool import MessagePool
+from pynostr.metrics import MetricsRegistry
+from pynostr.websocket_relay import WebSocketRelay
+
+
+class TestWebSocketRelay(unittest.TestCase):
+    def test_disconnected_workers_are_idle(self):
+        message_pool = MessagePool()
+        relays = [
+            WebSocketRelay(f"ws://fake-relay{i}", message_pool) for i in range(100)
+        ]
+        for relay in relays:
+            Thread(target=relay.outgoing_messages_worker, daemon=True).start()
+            relay.publish('["CLOSE", "test"]')
+
+        start = time.process_time()
+        time.sleep(1)
+        cpu_time = time.process_time() - start
+        self.assertLess(cpu_time, 0.1)
+        self.assertTrue(all(relay.num_sent_events == 0 for relay in relays))
+
+    def test_failed_message_keeps_order(self):
+        relay = WebSocketRelay(
+            "ws://fake-relay", MessagePool(), max_retry_interval=0.01
+        )
+        relay.ws = mock.Mock()
+        relay.ws.send.side_effect = [Exception("broken pipe")] * 5 + [None, None]
+        relay.publish("first")
+        relay.publish("second")
+        Thread(target=relay.outgoing_messages_worker, daemon=True).start()
+        relay._on_open(relay.ws)
+
+        start = time.monotonic()
+        while relay.num_sent_events < 2 and time.monotonic() - start < 5:
+            time.sleep(0.01)
+        sent = [call.args[0] for call in relay.ws.send.call_args_list]
+        # the message is kept until it is sent
+        self.assertEqual(sent, ["first"] * 6 + ["second"])
+
+    def test_full_queue_drops_oldest_message(self):
+        relay = WebSocketRelay("ws://fake-relay", MessagePool(), max_queue_size=2)
+        relay.metrics = MetricsRegistry()
+        for message in ["first", "second", "third"]:
+            relay.publish(message)
+        self.assertEqual(relay.dropped_messages, 1)
+        self.assertEqual(relay.metrics.dropped_messages.get("ws://fake-relay"), 1)
+        self.assertEqual(relay.outgoing_messages.get_nowait(), "second")
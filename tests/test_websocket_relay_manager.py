@@ -0,0 +1,39 @@
+import json
+import time
+import unittest
+from threading import Thread
+from unittest import mock
+
+from pynostr.websocket_relay import WebSocketRelay
+from pynostr.websocket_relay_manager import WebSocketRelayManager
+
+
+class TestWebSocketRelayManager(unittest.TestCase):
+    def test_add_dead_relays_does_not_block(self):
+        relay_manager = WebSocketRelayManager(connection_monitor_interval_secs=60)
+        start = time.monotonic()
+        for i in range(20):
+            # nothing is listening on port 9 (discard)
+            relay_manager.add_relay(f"ws://127.0.0.1:9/?{i}")
+        self.assertLess(time.monotonic() - start, 1)
+        relay_manager.publish_message(json.dumps(["CLOSE", "test"]))
+        relay_manager.close_all_relay_connections()
+
+    def test_reconnect_does_not_hold_lock(self):
+        def slow_connect(relay, is_reconnect=False):
+            if is_reconnect:
+                time.sleep(0.2)
+
+        with mock.patch.object(WebSocketRelay, "connect", slow_connect):
+            relay_manager = WebSocketRelayManager(connection_monitor_interval_secs=60)
+            for i in range(10):
+                relay_manager.add_relay(f"ws://fake-relay{i}")
+            monitor = Thread(target=relay_manager._reconnect_relays)
+            monitor.start()
+            time.sleep(0.05)
+            start = time.monotonic()
+            relay_manager.publish_message(json.dumps(["CLOSE", "test"]))
+            relay_manager.remove_relay("ws://fake-relay9")
+            self.assertLess(time.monotonic() - start, 0.1)
+            monitor.join()
+        self.assertEqual(len(relay_manager.relays), 9)